@@ -1,22 +1,28 @@
 import os
 
 import pandas as pd
-import pydub
 import streamlit as st
-from joblib import load
-from streamlit_webrtc import RTCConfiguration, WebRtcMode, webrtc_streamer
-from sklearn.metrics import plot_confusion_matrix
 
-from src.Classifier import *
-from src.FeatureExtractor import FeatureExtractor
-from src.Recorder import Recorder
 from src.ResultsManager import ResultsManager
 
-RTC_CONFIGURATION = RTCConfiguration(
-    {"iceServers": [{"urls": ["stun:stun.l.google.com:19302"]}]}
-)
+# Heavy modules are imported by the pages that use them, so a view never loads another view's dependencies:
+# the patient views load the audio analysis stack (parselmouth, scipy) and the doctor view loads scikit-learn,
+# and only once a prediction is requested. benchmarks/import_time.py reports what each page imports
+
+RESULTS_DB = 'results/results.db'
+RESULTS_CSV = 'results/results.csv'
+# Longest recording, if the voice measures never settle
+MAX_RECORDING_SECONDS = 10
+MODEL_ERROR = "The prediction model could not be loaded. Check that the model file exists in models/."
+
+RTC_CONFIGURATION = {"iceServers": [{"urls": ["stun:stun.l.google.com:19302"]}]}
 
 def patient_page(results_manager):
+    from src.FeatureCache import feature_cache
+    from src.Recorder import Recorder
+    from src.StreamingAnalyser import StreamingAnalyser
+    from src.VoiceActivityDetector import VoiceActivityDetector
+
     # st.subheader("NOTE: This will not work on Stremlit Cloud. Please use WebRTC.")
 
     st.markdown("""
@@ -31,12 +37,13 @@ def patient_page(results_manager):
 
     if st.button("Record"):
         recorder = Recorder()
-        with st.spinner(f"Say 'aaahhh' for 5 seconds..."):
-            audio = recorder.record(5)
-        
+        analyser = StreamingAnalyser(recorder.SAMPLERATE, max_seconds=MAX_RECORDING_SECONDS, cache=feature_cache, voice_activity_detector=VoiceActivityDetector())
+
         try:
-            feature_extractor = FeatureExtractor(audio.T)
-            uid = results_manager.add_results(feature_extractor.get_features())
+            # Recording stops as soon as the voice measures have settled
+            with st.spinner(f"Say 'aaahhh' until the recording stops..."):
+                features = analyser.run(recorder.stream(max_seconds=MAX_RECORDING_SECONDS), ResultsManager.feature_names)
+            uid = results_manager.add_results(features)
             results_manager.save()
             st.success(f"Thank you for your recording. Your UID is: {uid}. Please report to your doctor for further information.")
         except Exception as e:
@@ -53,6 +60,11 @@ def status_message(status, search):
     elif status == -1:
         return st.error(f"Patient {search} does not yet have a prediction.")
 
+# Loads the prediction model, importing scikit-learn the first time. Returns None if it cannot be loaded
+def get_model():
+    from src.ModelRegistry import registry
+    return registry.get('SVM')
+
 def doctor_page(results_manager: ResultsManager):
     search = st.text_input("Search UID")
     dataframe_holder = st.empty()
@@ -77,8 +89,10 @@ def doctor_page(results_manager: ResultsManager):
 
         if status == -1:
             if st.button(f"Generate results for patient {search}"):
-                    model = load('models/SVM')
-                    # model = Classifiers.SVM()
+                    model = get_model()
+                    if model is None:
+                        st.error(MODEL_ERROR)
+                        return
                     features = results_manager.get_features(search)
                     features = {k: v for k, v in features.items() if not pd.isnull(v)}
                     features_dataframe = results_manager.to_dataframe(features)
@@ -108,22 +122,29 @@ def doctor_page(results_manager: ResultsManager):
         dataframe_holder.dataframe(results_manager.to_dataframe())
 
         if st.button("Generate predictions"):
-            model = load('models/SVM')
-            # model = Classifiers.SVM()
-            unpredicted = results_manager.get_unpredicted()
-            for uid in unpredicted:
-                features = results_manager.get_features(uid)
-                features = {k: v for k, v in features.items() if not pd.isnull(v)}
-                features_dataframe = results_manager.to_dataframe(features)
-                prediction = model.predict(features_dataframe)
-                results_manager.set_status(uid, prediction[0])
+            model = get_model()
+            if model is None:
+                st.error(MODEL_ERROR)
+                return
+            features, skipped = results_manager.get_unpredicted_features(model.feature_names(), return_skipped=True)
+            predictions = model.predict(features)
+            results_manager.set_statuses(features.index, predictions)
             results_manager.save()
             dataframe_holder.dataframe(results_manager.to_dataframe())
-            st.write("Predictions have been updated.")
+            st.write(f"Predictions have been updated for {len(features)} patients.")
+            if skipped:
+                st.warning(f"{len(skipped)} patients could not be predicted as their results are missing features: {', '.join(skipped)}")
 
 def rtc_poc(results_manager):
-    if "audio_buffer" not in st.session_state:
-        st.session_state["audio_buffer"] = pydub.AudioSegment.empty()
+    from streamlit_webrtc import RTCConfiguration, WebRtcMode, webrtc_streamer
+
+    from src.FeatureCache import feature_cache
+    from src.StreamingAnalyser import StreamingAnalyser
+    from src.VoiceActivityDetector import VoiceActivityDetector
+
+    if "analyser" not in st.session_state:
+        st.session_state["analyser"] = StreamingAnalyser(max_seconds=MAX_RECORDING_SECONDS, cache=feature_cache, voice_activity_detector=VoiceActivityDetector())
+    analyser = st.session_state["analyser"]
     
     st.write(f"Press Start to begin recording.")
 
@@ -132,30 +153,30 @@ def rtc_poc(results_manager):
         mode=WebRtcMode.SENDONLY,
         audio_receiver_size=1024,
         # desired_playing_state=st.session_state["recording"],
-        rtc_configuration=RTC_CONFIGURATION,
+        rtc_configuration=RTCConfiguration(RTC_CONFIGURATION),
         media_stream_constraints={"audio": True},
     )
 
+    # Each press of Start begins a new recording, which is submitted at most once
+    playing = webrtc_ctx.state.playing
+    if playing and not st.session_state.get("rtc_playing", False):
+        analyser.clear()
+        st.session_state["submitted_uid"] = None
+    st.session_state["rtc_playing"] = playing
+    uid = st.session_state.get("submitted_uid")
+
     status_indicator = st.empty()
 
-    while True:
+    while uid is None and not analyser.is_done():
         if webrtc_ctx.audio_receiver:
             audio_frames = webrtc_ctx.audio_receiver.get_frames(timeout=1)
 
             status_indicator.write("Please make a sustained 'aaahhh' sound for around 5 seconds.")
 
-            sound_chunk = pydub.AudioSegment.empty()
             for audio_frame in audio_frames:
-                sound = pydub.AudioSegment(
-                    data=audio_frame.to_ndarray().tobytes(),
-                    sample_width=audio_frame.format.bytes,
-                    frame_rate=audio_frame.sample_rate,
-                    channels=len(audio_frame.layout.channels),
-                )
-                sound_chunk += sound
-
-            if len(sound_chunk) > 0:
-                st.session_state["audio_buffer"] += sound_chunk
+                analyser.write_frame(audio_frame)
+                if analyser.is_done():
+                    break
 
             # if len(st.session_state["audio_buffer"]) == 5000:
             #     st.session_state["recording"] = False
@@ -163,20 +184,65 @@ def rtc_poc(results_manager):
         else:
             break
 
-    audio_buffer = st.session_state["audio_buffer"]
-    st.session_state["audio_buffer"] = pydub.AudioSegment.empty()
-
-    if not webrtc_ctx.state.playing and len(audio_buffer) > 0:
-        audio_buffer.export("temp.wav", format="wav")
-        feature_extractor = FeatureExtractor('temp.wav')
-        uid = results_manager.add_results(feature_extractor.get_features())
+    if uid is None and (analyser.is_done() or not playing) and len(analyser.audio_buffer) > 0:
+        uid = results_manager.add_results(analyser.get_features(ResultsManager.feature_names))
         results_manager.save()
-        os.remove('temp.wav')
-    
+        st.session_state["submitted_uid"] = uid
+
+    if uid is not None:
+        if playing:
+            status_indicator.write("Recording complete. You can press Stop.")
         st.success(f"Thank you for your recording. Your UID is: {uid}. Please report to your doctor with your UID number for further information.")
 
+# Timings of each stage of the pipeline, recorded in this process while timing is on
 def dev_page(results_manager):
-    None
+    import numpy as np
+
+    from src.Instrumentation import instrumentation
+
+    timing = st.checkbox("Time pipeline stages", value=instrumentation.enabled)
+    metrics_file = st.text_input("Append every timing to a metrics file (optional)", value=instrumentation.metrics_file or "", placeholder="results/metrics.jsonl")
+    if timing:
+        try:
+            instrumentation.enable(metrics_file or None)
+        except OSError as e:
+            st.error(f"Could not open metrics file '{metrics_file}': {e}")
+            instrumentation.enable()
+    else:
+        instrumentation.disable()
+    if instrumentation.metrics_error:
+        st.warning(instrumentation.metrics_error)
+
+    stats = instrumentation.get_stats()
+    if not stats:
+        st.write("No timings recorded yet. Turn timing on, then record or generate predictions in the other views.")
+        return
+
+    table = pd.DataFrame.from_dict(stats, orient='index')
+    seconds_columns = [column for column in table.columns if column.endswith('_seconds')]
+    table[seconds_columns] *= 1000
+    table.columns = [column.replace('_seconds', ' (ms)') for column in table.columns]
+    st.dataframe(table)
+    st.bar_chart(table[['p50 (ms)', 'p95 (ms)', 'p99 (ms)']])
+
+    stage = st.selectbox("Stage", list(stats))
+    counts, edges = np.histogram(instrumentation.get_samples(stage) * 1000, bins=20)
+    st.bar_chart(pd.DataFrame({'runs': counts}, index=pd.Index(edges[:-1].round(2), name='ms')))
+
+    if st.button("Clear timings"):
+        instrumentation.clear()
+
+# Results live in SQLite, seeded once from the .csv table the first time the app runs
+# The manager is created once per process and shared by every session, rather than reopening the database and
+# reloading the table on every rerun. Seeding only happens if the table is still empty when the import transaction
+# starts, so processes starting together import the .csv table once
+@st.cache_resource
+def get_results_manager() -> ResultsManager:
+    first_run = not os.path.exists(RESULTS_DB)
+    results_manager = ResultsManager(RESULTS_DB)
+    if first_run and os.path.exists(RESULTS_CSV):
+        results_manager.seed_csv(RESULTS_CSV)
+    return results_manager
 
 def main():
     st.title("Parkinson's Diagnostic Tool")
@@ -197,7 +263,8 @@ def main():
 
     st.subheader(page_title)
 
-    results_manager = ResultsManager('results/results.csv')
+    results_manager = get_results_manager()
+
     page_func = pages[page_title]
     page_func(results_manager)
 
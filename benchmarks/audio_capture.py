@@ -0,0 +1,68 @@
+# Compares capturing WebRTC frames by concatenating pydub segments, as the WebRTC page used to,
+# with writing them into a preallocated AudioBuffer
+# Run from the repository root: python -m benchmarks.audio_capture
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pydub
+
+from benchmarks.timing import format_seconds
+from src.AudioBuffer import AudioBuffer
+
+# 20 ms of packed stereo int16 at 48 kHz, as sent by browsers
+SAMPLE_RATE = 48000
+FRAME_SAMPLES = 960
+
+
+def make_frame(rng) -> SimpleNamespace:
+    samples = rng.integers(-3000, 3000, size=(1, FRAME_SAMPLES * 2), dtype=np.int16)
+    return SimpleNamespace(
+        to_ndarray=lambda: samples,
+        sample_rate=SAMPLE_RATE,
+        layout=SimpleNamespace(channels=[None, None]),
+        format=SimpleNamespace(is_planar=False, bytes=2),
+    )
+
+
+# Returns the total time, and the time of the last second of frames, to capture a recording
+def capture(write, n_frames, frame) -> tuple:
+    frames_per_second = SAMPLE_RATE // FRAME_SAMPLES
+    start = time.perf_counter()
+    for i in range(n_frames):
+        if i == n_frames - frames_per_second:
+            last_second = time.perf_counter()
+        write(frame)
+    end = time.perf_counter()
+    return end - start, end - last_second
+
+
+def run(lengths=(5, 30, 60)) -> dict:
+    frame = make_frame(np.random.default_rng(0))
+    results = {}
+    for seconds in lengths:
+        n_frames = seconds * SAMPLE_RATE // FRAME_SAMPLES
+
+        state = {'segment': pydub.AudioSegment.empty()}
+        def pydub_write(audio_frame):
+            state['segment'] += pydub.AudioSegment(
+                data=audio_frame.to_ndarray().tobytes(),
+                sample_width=audio_frame.format.bytes,
+                frame_rate=audio_frame.sample_rate,
+                channels=len(audio_frame.layout.channels),
+            )
+        pydub_total, pydub_last = capture(pydub_write, n_frames, frame)
+
+        audio_buffer = AudioBuffer(seconds)
+        buffer_total, buffer_last = capture(audio_buffer.write_frame, n_frames, frame)
+
+        results[seconds] = {'pydub_seconds': pydub_total, 'buffer_seconds': buffer_total,
+            'pydub_last_second': pydub_last, 'buffer_last_second': buffer_last, 'buffer_bytes': audio_buffer.samples.nbytes}
+        print(f"{seconds:>3} s recording: pydub {format_seconds(pydub_total):>10} (last second {format_seconds(pydub_last):>10}) | "
+              f"AudioBuffer {format_seconds(buffer_total):>10} (last second {format_seconds(buffer_last):>10}, "
+              f"{audio_buffer.samples.nbytes / 2**20:.1f} MiB, resampled to mono {audio_buffer.sample_rate} Hz)")
+    return results
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,36 @@
+# Measures batch feature extraction throughput for different numbers of worker processes
+# Run from the repository root: python -m benchmarks.batch_extraction [files]
+import os
+import shutil
+import sys
+import tempfile
+
+from src.BatchExtractor import BatchExtractor, find_recordings
+from src.ResultsManager import ResultsManager
+
+
+def run(files=32, worker_counts=None) -> dict:
+    if worker_counts is None:
+        worker_counts = sorted({1, 4, os.cpu_count()})
+    directory = tempfile.mkdtemp()
+    try:
+        recordings = os.path.join(directory, 'recordings')
+        os.mkdir(recordings)
+        for i in range(files):
+            shutil.copy('tests/test.wav', os.path.join(recordings, f'{i}.wav'))
+        paths = find_recordings(recordings)
+
+        results = {}
+        for workers in worker_counts:
+            results_manager = ResultsManager(os.path.join(directory, f'results_{workers}.db'))
+            summary = BatchExtractor(results_manager, workers=workers, labels=ResultsManager.feature_names).run(paths)
+            results[workers] = files / summary['seconds']
+            print(f"{workers:>3} workers: {results[workers]:6.2f} files/s ({results[workers] / results[worker_counts[0]]:.2f}x)")
+    finally:
+        shutil.rmtree(directory)
+    print(f"({os.cpu_count()} cores available)")
+    return results
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 32)
@@ -0,0 +1,64 @@
+# Compares the per-row prediction loop previously used by the doctor view with batched prediction
+# Run from the repository root: python -m benchmarks.batch_predict [rows ...]
+import shutil
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.data import synthetic_results_manager
+from benchmarks.timing import format_seconds
+from src.Classifier import SVM
+
+PER_ROW_LIMIT = 2000
+
+
+# The original doctor view loop: one DataFrame and one predict call per UID
+def predict_per_row(model, results_manager, uids) -> None:
+    for uid in uids:
+        features = results_manager.get_features(uid)
+        features = {k: v for k, v in features.items() if not pd.isnull(v)}
+        features_dataframe = results_manager.to_dataframe(features)
+        prediction = model.clf.predict(features_dataframe)
+        results_manager.set_status(uid, prediction[0])
+
+
+# Scores all unpredicted rows with a single predict call
+def predict_batch(model, results_manager) -> None:
+    features = results_manager.get_unpredicted_features(model.feature_names())
+    predictions = model.predict(features)
+    results_manager.set_statuses(features.index, predictions)
+
+
+def run(sizes=(1000, 100000)) -> dict:
+    model = SVM()
+    model.load('models/SVM')
+    results = {}
+    for n in sizes:
+        directory = tempfile.mkdtemp()
+        try:
+            # Per-row throughput is measured on a sample as the full loop takes minutes at large sizes
+            results_manager = synthetic_results_manager(n, directory)
+            uids = results_manager.get_unpredicted()[:PER_ROW_LIMIT]
+            start = time.perf_counter()
+            predict_per_row(model, results_manager, uids)
+            per_row = len(uids) / (time.perf_counter() - start)
+
+            results_manager = synthetic_results_manager(n, directory)
+            start = time.perf_counter()
+            predict_batch(model, results_manager)
+            elapsed = time.perf_counter() - start
+            batch = n / elapsed
+        finally:
+            shutil.rmtree(directory)
+
+        results[n] = {'per_row_rows_per_s': per_row, 'batch_rows_per_s': batch, 'batch_seconds': elapsed}
+        print(f"{n:>8} rows: per-row {per_row:>10.0f} rows/s | batch {batch:>10.0f} rows/s "
+              f"({format_seconds(elapsed)} total, {batch / per_row:.0f}x)")
+    return results
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 100000]
+    run(sizes)
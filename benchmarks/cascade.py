@@ -0,0 +1,56 @@
+# Compares cascade inference against the full Voting ensemble: held-out accuracy, the fraction of rows that exit
+# after the first member, and mean latency per prediction for single rows and for the whole test set
+# The ensemble is trained on a stratified split, the threshold calibrated on out-of-fold predictions over the
+# training rows, and both are scored on the held-out rows, over several splits
+# Run from the repository root: python -m benchmarks.cascade [splits]
+import sys
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+from benchmarks.timing import best_of, format_seconds
+from src.Cascade import Cascade
+from src.Classifier import SVM, AdaBoost, RandomForest, Voting
+
+
+def run(splits=5, repeat=5) -> dict:
+    df = pd.read_csv('data/parkinsons.data')
+    y = df['status']
+    X = df.drop(['name', 'status', 'RPDE', 'DFA', 'spread1', 'spread2', 'D2', 'PPE'], axis=1)
+    rows = []
+    for seed in range(splits):
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=seed, stratify=y)
+        voting = Voting(SVM({'random_state': 0}), RandomForest({'random_state': 0}), AdaBoost({'random_state': 0}))
+        voting.train(X_train, y_train)
+        cascade = Cascade(voting)
+        cascade.calibrate(X_train, y_train)
+        single = [X_test.iloc[[i]] for i in range(len(X_test))]
+
+        row = {
+            'threshold': cascade.threshold,
+            'ensemble_accuracy': float(np.mean(voting.predict(X_test) == y_test)),
+            'cascade_accuracy': float(np.mean(cascade.predict(X_test) == y_test)),
+            'early_exit_rate': float(np.mean(cascade.voting.clf.estimators_[cascade.first].predict_proba(X_test).max(axis=1) > cascade.threshold)),
+            'row_ensemble_seconds': best_of(lambda: [voting.predict(features) for features in single], repeat) / len(single),
+            'row_cascade_seconds': best_of(lambda: [cascade.predict(features) for features in single], repeat) / len(single),
+            'batch_ensemble_seconds': best_of(lambda: voting.predict(X_test), repeat) / len(X_test),
+            'batch_cascade_seconds': best_of(lambda: cascade.predict(X_test), repeat) / len(X_test),
+        }
+        rows.append(row)
+        print(f"Split {seed}: threshold {row['threshold']:.3f}, early exits {row['early_exit_rate']:.0%}, "
+              f"accuracy ensemble {row['ensemble_accuracy']:.3f} | cascade {row['cascade_accuracy']:.3f}")
+
+    results = {key: float(np.mean([row[key] for row in rows])) for key in rows[0]}
+    results['splits'] = rows
+    print(f"Mean over {splits} splits: early exits {results['early_exit_rate']:.0%}, "
+          f"accuracy ensemble {results['ensemble_accuracy']:.3f} | cascade {results['cascade_accuracy']:.3f}")
+    for label, key in [('single row', 'row'), ('batch, per row', 'batch')]:
+        ensemble_seconds, cascade_seconds = results[f'{key}_ensemble_seconds'], results[f'{key}_cascade_seconds']
+        print(f"  {label:>14}: ensemble {format_seconds(ensemble_seconds):>10} | cascade {format_seconds(cascade_seconds):>10} "
+              f"({ensemble_seconds / cascade_seconds:.1f}x)")
+    return results
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
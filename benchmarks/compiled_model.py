@@ -0,0 +1,81 @@
+# Compares prediction with the pickled scikit-learn models against their compiled NumPy artifacts:
+# cold start (a fresh interpreter loading the model and predicting one row), single-row latency and batch throughput
+# Run from the repository root: python -m benchmarks.compiled_model [batch rows]
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from joblib import dump
+
+from benchmarks.data import synthetic_features
+from benchmarks.timing import best_of, format_seconds
+from src.Classifier import SVM, AdaBoost, RandomForest, Voting
+from src.CompiledModel import CompiledModel
+
+COLD_START_JOBLIB = "from joblib import load; import pandas as pd; load({path!r}).predict(pd.DataFrame([[1.0] * 16], columns={columns!r}))"
+COLD_START_COMPILED = "from src.CompiledModel import CompiledModel; CompiledModel.load({path!r}).predict([[1.0] * 16])"
+
+
+# Wall-clock time of a fresh interpreter running code, best of repeat
+def cold_start(code: str, repeat=3) -> float:
+    return best_of(lambda: subprocess.run([sys.executable, '-c', code], check=True, capture_output=True), repeat)
+
+
+def trained_classifiers() -> dict:
+    import pandas as pd
+    df = pd.read_csv('data/parkinsons.data')
+    y = df['status']
+    X = df.drop(['name', 'status', 'RPDE', 'DFA', 'spread1', 'spread2', 'D2', 'PPE'], axis=1)
+    svm = SVM()
+    svm.load('models/SVM')
+    rf = RandomForest({'random_state': 0})
+    ada = AdaBoost({'random_state': 0})
+    for classifier in (rf, ada):
+        classifier.train(X, y)
+    vc = Voting(svm, rf, ada)
+    vc.train(X, y)
+    return {'SVM': svm, 'RandomForest': rf, 'AdaBoost': ada, 'Voting': vc}
+
+
+def run(batch_rows=10000, repeat=20) -> dict:
+    directory = tempfile.mkdtemp()
+    batch = synthetic_features(batch_rows)
+    row = batch.iloc[:1]
+    interpreter = cold_start("pass")
+    print(f"(Interpreter start-up alone: {format_seconds(interpreter)})")
+    results = {}
+    try:
+        for name, classifier in trained_classifiers().items():
+            pickled = os.path.join(directory, name)
+            dump(classifier.clf, pickled)
+            compiled_file = os.path.join(directory, name + '.npz')
+            classifier.export(compiled_file)
+            compiled = CompiledModel.load(compiled_file)
+            columns = classifier.feature_names()
+
+            result = {
+                'cold_start_joblib_seconds': cold_start(COLD_START_JOBLIB.format(path=pickled, columns=columns)),
+                'cold_start_compiled_seconds': cold_start(COLD_START_COMPILED.format(path=compiled_file)),
+                'row_joblib_seconds': best_of(lambda: classifier.predict(row), repeat),
+                'row_compiled_seconds': best_of(lambda: compiled.predict(row), repeat),
+                'batch_joblib_seconds': best_of(lambda: classifier.predict(batch), 3),
+                'batch_compiled_seconds': best_of(lambda: compiled.predict(batch), 3),
+                'pickle_bytes': os.path.getsize(pickled),
+                'compiled_bytes': os.path.getsize(compiled_file),
+            }
+            results[name] = result
+            print(f"{name}:")
+            for label, key in [('cold start', 'cold_start'), ('single row', 'row'), (f'{batch_rows} rows', 'batch')]:
+                joblib_seconds, compiled_seconds = result[f'{key}_joblib_seconds'], result[f'{key}_compiled_seconds']
+                print(f"  {label:>12}: joblib {format_seconds(joblib_seconds):>10} | compiled {format_seconds(compiled_seconds):>10} "
+                      f"({joblib_seconds / compiled_seconds:.1f}x)")
+            print(f"  {'size':>12}: pickle {result['pickle_bytes']} bytes | compiled {result['compiled_bytes']} bytes")
+    finally:
+        shutil.rmtree(directory)
+    return results
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
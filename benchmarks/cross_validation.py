@@ -0,0 +1,53 @@
+# Compares cross_val_score with the cached, parallel cross-validation, for an SVM sweep over C and for each classifier
+# Run from the repository root: python -m benchmarks.cross_validation
+import os
+import time
+
+import pandas as pd
+from sklearn.model_selection import cross_val_score
+from sklearn.svm import SVC
+
+from benchmarks.data import DATASET
+from benchmarks.timing import best_of, format_seconds
+from src.Classifier import SVM, AdaBoost, RandomForest, Voting
+from src.CrossValidation import CrossValidationCache, cross_validate
+
+
+def run(C_values=(0.1, 1, 10, 100, 1000), repeat=3) -> dict:
+    df = pd.read_csv(DATASET)
+    y = df['status']
+    X = df.drop(['name', 'status', 'RPDE', 'DFA', 'spread1', 'spread2', 'D2', 'PPE'], axis=1)
+    results = {}
+
+    for gamma in ['scale', 1e-3]:
+        estimators = [SVC(C=C, gamma=gamma, probability=True) for C in C_values]
+        baseline = best_of(lambda: [cross_val_score(estimator, X.values, y.values, cv=10) for estimator in estimators], repeat)
+        # A fresh cache each time, so the sweep pays for computing its kernels once
+        cached = best_of(lambda: [cross_validate(estimator, X, y, cache=cache) for cache in [CrossValidationCache()] for estimator in estimators], repeat)
+        results[f'svm_sweep_gamma_{gamma}'] = {'cross_val_score_seconds': baseline, 'cached_seconds': cached}
+        print(f"SVM sweep over {len(C_values)} values of C, gamma={gamma}: cross_val_score {format_seconds(baseline)}, "
+              f"cached {format_seconds(cached)} ({baseline / cached:.1f}x faster)")
+
+    classifiers = {
+        'SVM': SVM({'random_state': 0}),
+        'RandomForest': RandomForest({'random_state': 0}),
+        'AdaBoost': AdaBoost({'random_state': 0}),
+    }
+    classifiers['Voting'] = Voting(*classifiers.values())
+    for name, classifier in classifiers.items():
+        start = time.perf_counter()
+        cross_val_score(classifier.clf, X.values, y.values, cv=10)
+        baseline = time.perf_counter() - start
+        serial = classifier.cross_validate(X, y, details=True, workers=1)
+        parallel = classifier.cross_validate(X, y, details=True)
+        results[name] = {'cross_val_score_seconds': baseline, 'serial_seconds': serial['seconds'], 'parallel_seconds': parallel['seconds'],
+                'fit_seconds': sum(parallel['fit_seconds']), 'score_seconds': sum(parallel['score_seconds'])}
+        print(f"{name:>12}: cross_val_score {format_seconds(baseline)}, 1 worker {format_seconds(serial['seconds'])}, "
+              f"{min(os.cpu_count(), 10)} workers {format_seconds(parallel['seconds'])} "
+              f"(fit {format_seconds(sum(parallel['fit_seconds']))}, score {format_seconds(sum(parallel['score_seconds']))})")
+    print(f"({os.cpu_count()} cores available)")
+    return results
+
+
+if __name__ == '__main__':
+    run()
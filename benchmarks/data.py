@@ -0,0 +1,46 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.ResultsManager import ResultsManager
+
+DATASET = 'data/parkinsons.data'
+
+
+# Returns n rows of plausible feature values, resampled from the dataset with a little noise
+def synthetic_features(n: int, seed=0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dataset = pd.read_csv(DATASET)[ResultsManager.feature_names]
+    rows = dataset.values[rng.integers(0, len(dataset), n)]
+    rows = rows * rng.normal(1, 0.01, rows.shape)
+    return pd.DataFrame(rows, columns=ResultsManager.feature_names)
+
+
+# Writes n unpredicted results to a results file in directory and returns its path
+def synthetic_results_file(n: int, directory: str, seed=0) -> str:
+    features = synthetic_features(n, seed)
+    results = pd.DataFrame(columns=ResultsManager.col_names, index=[str(uid) for uid in range(1, n + 1)], dtype=float)
+    results[ResultsManager.feature_names] = features.values
+    path = os.path.join(directory, f'results_{n}.csv')
+    results.to_csv(path, index_label='name')
+    return path
+
+
+# Returns a ResultsManager holding n unpredicted results, backed by a file in directory, which the caller removes
+def synthetic_results_manager(n: int, directory: str, seed=0) -> ResultsManager:
+    return ResultsManager(synthetic_results_file(n, directory, seed))
+
+
+# Returns a sustained vowel as samples in [-1, 1]: a harmonic series at f0 with small period-to-period changes in
+# frequency and amplitude, like the jitter and shimmer of a real voice, and a little breath noise
+def synthetic_vowel(seconds: float, f0=120.0, sample_rate=44100, jitter=0.005, shimmer=0.03, seed=0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    n = int(seconds * sample_rate)
+    periods = int(seconds * f0) + 1
+    period_samples = int(np.ceil(sample_rate / f0))
+    frequency = np.repeat(f0 * rng.normal(1, jitter, periods), period_samples)[:n]
+    amplitude = np.repeat(rng.normal(1, shimmer, periods), period_samples)[:n]
+    phase = 2 * np.pi * np.cumsum(frequency) / sample_rate
+    signal = amplitude * sum(np.sin(k * phase) / k for k in range(1, 21)) + rng.normal(0, 0.01, n)
+    return 0.8 * signal / np.abs(signal).max()
@@ -0,0 +1,33 @@
+# Compares extracting every feature of a recording with reading them back from the feature cache
+# Run from the repository root: python -m benchmarks.feature_cache [wav file]
+import shutil
+import sys
+import tempfile
+
+from benchmarks.timing import best_of, format_seconds
+from src.FeatureCache import FeatureCache
+from src.FeatureExtractor import FeatureExtractor
+
+
+def run(sound_file='tests/test.wav', repeat=3) -> dict:
+    directory = tempfile.mkdtemp()
+    try:
+        cold = best_of(lambda: FeatureExtractor(sound_file), repeat)
+
+        cache = FeatureCache(directory)
+        FeatureExtractor(sound_file, cache=cache)
+        warm = best_of(lambda: FeatureExtractor(sound_file, cache=cache), repeat)
+        key = best_of(lambda: cache.key(FeatureExtractor(sound_file, lazy=True)), repeat)
+        stats = cache.get_stats()
+    finally:
+        shutil.rmtree(directory)
+
+    print(f"Extraction without cache: {format_seconds(cold)}")
+    print(f"Extraction from cache: {format_seconds(warm)} ({cold / warm:.0f}x faster), "
+          f"of which loading and hashing the recording: {format_seconds(key)}")
+    print(f"{stats['hits']} hits, {stats['misses']} misses, {stats['bytes']} bytes on disk")
+    return {'uncached_seconds': cold, 'cached_seconds': warm, 'key_seconds': key, **stats}
+
+
+if __name__ == '__main__':
+    run(*sys.argv[1:2])
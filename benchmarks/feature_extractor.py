@@ -0,0 +1,142 @@
+# Times the nonlinear feature calculations and compares their values with the reference dataset
+# Run from the repository root: python -m benchmarks.feature_extractor [wav file]
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pydub
+
+from benchmarks.timing import best_of, format_seconds
+from src.FeatureExtractor import FeatureExtractor
+from src.ResultsManager import ResultsManager
+
+DATASET = 'data/parkinsons.data'
+
+# Dataset column -> FeatureExtractor method
+nonlinear_features = {
+    'RPDE': 'calculate_rpde',
+    'DFA': 'calculate_dfa',
+    'D2': 'calculate_d2',
+    'PPE': 'calculate_ppe',
+    'spread1': 'calculate_spread1',
+    'spread2': 'calculate_spread2',
+}
+
+
+def run(sound_file='tests/test.wav', repeat=3) -> dict:
+    dataset = pd.read_csv(DATASET)
+    feature_extractor = FeatureExtractor(sound_file)
+    print(f"{sound_file}: {feature_extractor.sound.duration:.1f} s at {feature_extractor.sound.sampling_frequency:.0f} Hz")
+
+    results = {}
+    for feature, method in nonlinear_features.items():
+        calculate = getattr(feature_extractor, method)
+        seconds = best_of(calculate, repeat)
+        value = calculate()
+        reference = dataset[feature]
+        in_range = value is not None and reference.min() <= value <= reference.max()
+        results[feature] = {'seconds': seconds, 'value': value}
+        print(f"{feature:>8}: {format_seconds(seconds):>10} | value {value:.4f} | "
+              f"dataset min {reference.min():.4f} mean {reference.mean():.4f} max {reference.max():.4f}"
+              f"{'' if in_range else ' (OUT OF RANGE)'}")
+    return results
+
+
+# Times the features on a long recording, made by repeating the given one
+def run_long(sound_file='tests/test.wav', seconds=60, repeat=3) -> dict:
+    samples = FeatureExtractor(sound_file).get_samples()
+    feature_extractor = FeatureExtractor(np.resize(samples, int(seconds * 44100)))
+    results = {}
+    for feature, method in nonlinear_features.items():
+        results[feature] = best_of(getattr(feature_extractor, method), repeat)
+        print(f"{feature:>8}: {format_seconds(results[feature]):>10} on a {seconds} s signal")
+    return results
+
+
+# Cost added by the pitch-based features, on top of the pitch analysis already done for the voice report
+def run_pitch_profile(sound_file='tests/test.wav', repeat=5) -> dict:
+    feature_extractor = FeatureExtractor(sound_file)
+    results = {
+        'to_pitch': best_of(feature_extractor.sound.to_pitch, repeat),
+        'extract_pitch_contour': best_of(feature_extractor.extract_pitch_contour, repeat),
+        'extract_periods': best_of(feature_extractor.extract_periods, repeat),
+    }
+    for feature in ('PPE', 'spread1', 'spread2'):
+        results[feature] = best_of(getattr(feature_extractor, nonlinear_features[feature]), repeat)
+    added = sum(seconds for step, seconds in results.items() if step != 'to_pitch')
+    for step, seconds in results.items():
+        print(f"{step:>22}: {format_seconds(seconds):>10}")
+    print(f"{'added by PPE/spread':>22}: {format_seconds(added):>10} (pitch is not recomputed)")
+    return results
+
+
+# Extraction time for the features the bundled models use, eagerly and lazily
+def run_lazy(sound_file='tests/test.wav', repeat=3) -> dict:
+    model_features = ResultsManager.feature_names
+    eager = best_of(lambda: FeatureExtractor(sound_file).get_dataset_features(model_features), repeat)
+    lazy = best_of(lambda: FeatureExtractor(sound_file, lazy=True).get_dataset_features(model_features), repeat)
+    print(f"{len(model_features)} model features: eager {format_seconds(eager)} | lazy {format_seconds(lazy)}")
+    return {'eager_seconds': eager, 'lazy_seconds': lazy}
+
+
+# Generating and parsing the voice report text compared with querying each measure directly
+# Pitch and pulses are analysed once beforehand, so only the measures themselves are timed
+def run_voice_measures(sound_file='tests/test.wav', repeat=5) -> dict:
+    feature_extractor = FeatureExtractor(sound_file, lazy=True)
+    feature_extractor.analyse('pulses')
+    report = best_of(feature_extractor.extract_voice_report, repeat)
+    measures = best_of(feature_extractor.extract_voice_measures, repeat)
+    print(f"Voice report text: {format_seconds(report)} | structured queries: {format_seconds(measures)} "
+          f"(speedup {report / measures:.2f}x)")
+    return {'voice_report_seconds': report, 'voice_measures_seconds': measures}
+
+
+# Handing a recorded PCM buffer to the extractor through a temporary .wav file, as the WebRTC page used to,
+# compared with passing the samples in memory
+def run_pcm_handoff(sound_file='tests/test.wav', repeat=5) -> dict:
+    segment = pydub.AudioSegment.from_wav(sound_file)
+
+    def through_file():
+        segment.export('temp.wav', format='wav')
+        FeatureExtractor('temp.wav', lazy=True)
+        os.remove('temp.wav')
+
+    def in_memory():
+        samples = np.frombuffer(segment.raw_data, dtype=f'<i{segment.sample_width}').reshape(-1, segment.channels)
+        FeatureExtractor(samples, lazy=True, sample_rate=segment.frame_rate, sample_width=segment.sample_width)
+
+    file_seconds = best_of(through_file, repeat)
+    memory_seconds = best_of(in_memory, repeat)
+    print(f"PCM handoff of {segment.duration_seconds:.1f} s: through temp.wav {format_seconds(file_seconds)} | "
+          f"in memory {format_seconds(memory_seconds)}")
+    return {'temp_file_seconds': file_seconds, 'in_memory_seconds': memory_seconds}
+
+
+# Runtime, peak memory and value of D2 for different numbers of sampled and reference points
+def run_d2_tradeoff(sound_file='tests/test.wav', settings=((5000, 250), (20000, 1000), (50000, 2000), (100000, 5000))) -> dict:
+    feature_extractor = FeatureExtractor(sound_file)
+    results = {}
+    for max_points, n_references in settings:
+        tracemalloc.start()
+        start = time.perf_counter()
+        value = feature_extractor.calculate_d2(max_points=max_points, n_references=n_references)
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results[(max_points, n_references)] = {'seconds': seconds, 'peak_bytes': peak, 'value': value}
+        print(f"D2 max_points={max_points:>6} n_references={n_references:>5}: {format_seconds(seconds):>10} | "
+              f"peak {peak / 2**20:6.1f} MiB | value {value:.4f}")
+    return results
+
+
+if __name__ == '__main__':
+    run(*sys.argv[1:2])
+    run_long(*sys.argv[1:2])
+    run_d2_tradeoff(*sys.argv[1:2])
+    run_pitch_profile(*sys.argv[1:2])
+    run_lazy(*sys.argv[1:2])
+    run_voice_measures(*sys.argv[1:2])
+    run_pcm_handoff(*sys.argv[1:2])
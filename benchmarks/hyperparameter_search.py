@@ -0,0 +1,43 @@
+# Measures hyperparameter search wall-clock time for different numbers of worker processes, and the time saved by pruning
+# Run from the repository root: python -m benchmarks.hyperparameter_search [classifier]
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.data import DATASET
+from src.HyperparameterSearch import HyperparameterSearch
+
+
+def run(classifier_name='SVM', worker_counts=None) -> dict:
+    if worker_counts is None:
+        worker_counts = sorted({1, 2, 4, os.cpu_count()})
+    df = pd.read_csv(DATASET)
+    y = df['status']
+    X = df.drop(['name', 'status', 'RPDE', 'DFA', 'spread1', 'spread2', 'D2', 'PPE'], axis=1)
+    directory = tempfile.mkdtemp()
+
+    def timed_search(workers, prune=True) -> float:
+        search = HyperparameterSearch(classifier_name, X, y, workers=workers, prune=prune,
+                leaderboard_file=os.path.join(directory, 'leaderboard.csv'))
+        start = time.perf_counter()
+        search.grid()
+        return time.perf_counter() - start
+
+    try:
+        results = {'unpruned': timed_search(1, prune=False)}
+        for workers in worker_counts:
+            results[workers] = timed_search(workers)
+            print(f"{workers:>3} workers: {results[workers]:6.2f} s ({results[worker_counts[0]] / results[workers]:.2f}x)")
+    finally:
+        shutil.rmtree(directory)
+    print(f"1 worker without pruning: {results['unpruned']:.2f} s")
+    print(f"({os.cpu_count()} cores available)")
+    return results
+
+
+if __name__ == '__main__':
+    run(*sys.argv[1:2])
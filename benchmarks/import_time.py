@@ -0,0 +1,106 @@
+# Reports the import cost of each page of app.py, by top-level package, and checks no page imports another view's
+# heavy dependencies. Each page's imports are read from app.py (its own, those of the helpers it calls, and the
+# module-level ones) and timed in a fresh interpreter with -X importtime
+# Run from the repository root: python -m benchmarks.import_time [app file]
+import ast
+import subprocess
+import sys
+from collections import defaultdict
+
+from benchmarks.timing import format_seconds
+
+# Packages each page must never import
+FORBIDDEN = {
+    'Doctor view': ['parselmouth', 'sounddevice'],
+    'Patient view (SoundDevice)': ['sklearn', 'joblib'],
+    'Patient view (WebRTC)': ['sklearn', 'joblib'],
+}
+
+# Imports each statement separately, so packages that are not installed (e.g. streamlit) are skipped and reported
+IMPORTER = """
+import sys, time
+missing = []
+start = time.perf_counter()
+for statement in sys.argv[1:]:
+    try:
+        exec(statement)
+    except ImportError as e:
+        missing.append(e.name or statement)
+print(time.perf_counter() - start)
+print(','.join(missing))
+print(','.join(sorted(sys.modules)))
+"""
+
+
+# Returns the import statements of each page of the app, keyed by page title
+def page_imports(app_file='app.py') -> dict:
+    with open(app_file) as f:
+        tree = ast.parse(f.read())
+    module_imports = [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    functions = {node.name: node for node in tree.body if isinstance(node, ast.FunctionDef)}
+
+    # Imports inside a function and the app's functions it calls
+    def imports(name: str, seen: set) -> list:
+        seen.add(name)
+        statements = []
+        for node in ast.walk(functions[name]):
+            if isinstance(node, (ast.Import, ast.ImportFrom)):
+                statements.append(ast.unparse(node))
+            elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in functions and node.func.id not in seen:
+                statements += imports(node.func.id, seen)
+        return statements
+
+    pages = {}
+    for node in ast.walk(functions['main']):
+        if isinstance(node, ast.Dict) and all(isinstance(value, ast.Name) and value.id in functions for value in node.values):
+            for key, value in zip(node.keys, node.values):
+                pages[key.value] = module_imports + imports(value.id, {'main'})
+    return pages
+
+
+# Imports statements in a fresh interpreter, returning the total time, the missing packages, the modules loaded
+# and the self time of each top-level package
+def measure(statements: list) -> dict:
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', IMPORTER, *statements],
+            capture_output=True, text=True, check=True)
+    seconds, missing, modules = process.stdout.splitlines()[-3:]
+    packages = defaultdict(float)
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        packages[name.strip().split('.')[0]] += int(self_us) / 1e6
+    return {
+        'seconds': float(seconds),
+        'missing': [name for name in missing.split(',') if name],
+        'modules': modules.split(','),
+        'packages': dict(packages),
+    }
+
+
+def run(app_file='app.py', top=8) -> dict:
+    pages = page_imports(app_file)
+    results = {}
+    everything = sorted({statement for statements in pages.values() for statement in statements})
+    # Every page's imports together, i.e. what a process that has served every page has loaded
+    for title, statements in [*pages.items(), ('All pages combined', everything)]:
+        result = measure(statements)
+        loaded = {module.split('.')[0] for module in result['modules']}
+        result['violations'] = [package for package in FORBIDDEN.get(title, []) if package in loaded]
+        results[title] = result
+
+        print(f"{title}: {format_seconds(result['seconds'])}")
+        ranked = sorted(result['packages'].items(), key=lambda item: item[1], reverse=True)[:top]
+        print('  ' + ', '.join(f"{package} {format_seconds(seconds)}" for package, seconds in ranked))
+        if result['missing']:
+            print(f"  not installed, so not timed: {', '.join(result['missing'])}")
+        if title in FORBIDDEN:
+            print(f"  imports {', '.join(result['violations'])}, which it should not" if result['violations']
+                  else f"  does not import {', '.join(FORBIDDEN[title])}")
+    for result in results.values():
+        del result['modules']
+    return results
+
+
+if __name__ == '__main__':
+    run(*sys.argv[1:2])
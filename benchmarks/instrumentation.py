@@ -0,0 +1,47 @@
+# Measures the overhead of the stage timers, per call and on a whole feature extraction, with timing off and on
+# Run from the repository root: python -m benchmarks.instrumentation [wav file]
+import sys
+
+from benchmarks.timing import best_of, format_seconds
+from src.FeatureExtractor import FeatureExtractor
+from src.Instrumentation import Instrumentation, instrumentation
+from src.ResultsManager import ResultsManager
+
+CALLS = 100000
+
+
+def run(sound_file='tests/test.wav', repeat=5) -> dict:
+    timings = Instrumentation()
+
+    def plain():
+        pass
+
+    decorated = timings.timed('decorated')(plain)
+
+    def block():
+        with timings.timer('block'):
+            pass
+
+    results = {}
+    plain_seconds = best_of(lambda: [plain() for _ in range(CALLS)], repeat) / CALLS
+    for enabled in (False, True):
+        timings.enabled = enabled
+        state = 'on' if enabled else 'off'
+        results[f'decorator_{state}_seconds'] = best_of(lambda: [decorated() for _ in range(CALLS)], repeat) / CALLS - plain_seconds
+        results[f'context_manager_{state}_seconds'] = best_of(lambda: [block() for _ in range(CALLS)], repeat) / CALLS - plain_seconds
+        print(f"Timing {state}: decorator adds {format_seconds(results[f'decorator_{state}_seconds'])} per call | "
+              f"context manager adds {format_seconds(results[f'context_manager_{state}_seconds'])} per call")
+
+    extract = lambda: FeatureExtractor(sound_file, lazy=True).get_dataset_features(ResultsManager.feature_names)
+    for enabled in (False, True):
+        instrumentation.enabled = enabled
+        results[f'extraction_{"on" if enabled else "off"}_seconds'] = best_of(extract, repeat)
+    instrumentation.disable()
+    instrumentation.clear()
+    print(f"Model feature extraction: timing off {format_seconds(results['extraction_off_seconds'])} | "
+          f"timing on {format_seconds(results['extraction_on_seconds'])}")
+    return results
+
+
+if __name__ == '__main__':
+    run(*sys.argv[1:2])
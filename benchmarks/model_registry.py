@@ -0,0 +1,32 @@
+# Compares loading the SVM from disk on every request with fetching it from the model registry
+# Run from the repository root: python -m benchmarks.model_registry [requests]
+import sys
+import time
+
+from joblib import load
+
+from benchmarks.timing import format_seconds
+from src.ModelRegistry import ModelRegistry
+
+
+def run(requests=200) -> dict:
+    start = time.perf_counter()
+    for _ in range(requests):
+        load('models/SVM')
+    per_request_load = (time.perf_counter() - start) / requests
+
+    registry = ModelRegistry()
+    start = time.perf_counter()
+    for _ in range(requests):
+        registry.get('SVM')
+    per_request_registry = (time.perf_counter() - start) / requests
+
+    stats = registry.get_stats()['SVM']
+    print(f"joblib.load per request: {format_seconds(per_request_load)}")
+    print(f"registry.get per request: {format_seconds(per_request_registry)} "
+          f"({stats['loads']} load, {stats['hits']} hits, load took {format_seconds(stats['last_load_seconds'])})")
+    return {'joblib_load_seconds': per_request_load, 'registry_get_seconds': per_request_registry, **stats}
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
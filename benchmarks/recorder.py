@@ -0,0 +1,53 @@
+# Compares normalising a recording by dividing by its maximum, as Recorder.record used to, with scaling it in place,
+# and measures how long after capture a streamed chunk reaches the consumer, using a synthetic real-time source
+# Run from the repository root: python -m benchmarks.recorder [seconds]
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.timing import format_seconds
+from src.Recorder import Recorder, SyntheticBackend
+
+
+def old_normalise(audio: np.ndarray) -> np.ndarray:
+    audio = audio / audio.max() * np.iinfo(np.int16).max
+    return audio.astype(np.int16)
+
+
+def measure(fn) -> tuple:
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def run(seconds=60) -> dict:
+    rng = np.random.default_rng(0)
+    # sounddevice's default float32 recording for the old path, int16 for the new one
+    float_audio = rng.uniform(-0.5, 0.5, (seconds * 44100, 1)).astype(np.float32)
+    recorder = Recorder()
+    recorder.audio_data = (float_audio * 32767).astype(np.int16)
+
+    old_seconds, old_peak = measure(lambda: old_normalise(float_audio))
+    new_seconds, new_peak = measure(recorder.normalise)
+    print(f"Normalising {seconds} s: divide by max {format_seconds(old_seconds)}, peak {old_peak / 2**20:.1f} MiB | "
+          f"in place {format_seconds(new_seconds)}, peak {new_peak / 2**20:.2f} MiB")
+
+    # Delay between a chunk being complete and the consumer receiving it
+    recorder = Recorder(SyntheticBackend(np.zeros(44100 * 2, dtype=np.int16), blocksize=441, realtime=True))
+    delays = []
+    start = time.perf_counter()
+    for i, chunk in enumerate(recorder.stream(chunk_seconds=0.1, max_seconds=2)):
+        delays.append(time.perf_counter() - start - (i + 1) * 0.1)
+    print(f"Streamed 0.1 s chunks arrive {format_seconds(np.median(delays))} (median) after they are complete")
+    return {'old_normalise_seconds': old_seconds, 'old_normalise_peak_bytes': old_peak,
+        'normalise_seconds': new_seconds, 'normalise_peak_bytes': new_peak, 'median_chunk_delay_seconds': float(np.median(delays))}
+
+
+if __name__ == '__main__':
+    run(*map(int, sys.argv[1:2]))
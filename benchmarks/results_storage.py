@@ -0,0 +1,48 @@
+# Measures the latency of a single status update followed by save for the .csv and SQLite backends
+# Run from the repository root: python -m benchmarks.results_storage [rows ...]
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks.data import synthetic_results_file
+from benchmarks.timing import format_seconds
+from src.ResultsManager import ResultsManager
+
+
+# Mean latency of set_status + save over a number of writes
+def write_latency(results_manager, writes: int) -> float:
+    uids = list(results_manager.results)[:writes]
+    start = time.perf_counter()
+    for uid in uids:
+        results_manager.set_status(uid, 1)
+        results_manager.save()
+    return (time.perf_counter() - start) / len(uids)
+
+
+def run(sizes=(10000, 100000, 1000000), csv_writes=3, sqlite_writes=200) -> dict:
+    results = {}
+    for n in sizes:
+        directory = tempfile.mkdtemp()
+        try:
+            csv_file = synthetic_results_file(n, directory)
+            csv_manager = ResultsManager(csv_file)
+            csv_latency = write_latency(csv_manager, csv_writes)
+
+            sqlite_manager = ResultsManager(os.path.join(directory, 'results.db'))
+            sqlite_manager.import_csv(csv_file)
+            sqlite_manager.save()
+            sqlite_latency = write_latency(sqlite_manager, sqlite_writes)
+            sqlite_manager.storage.close()
+        finally:
+            shutil.rmtree(directory)
+
+        results[n] = {'csv_write_seconds': csv_latency, 'sqlite_write_seconds': sqlite_latency}
+        print(f"{n:>8} rows: csv {format_seconds(csv_latency):>10} per write | sqlite {format_seconds(sqlite_latency):>10} per write")
+    return results
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000]
+    run(sizes)
@@ -0,0 +1,47 @@
+# Compares memory use and to_dataframe latency of the columnar results table with the previous dict-of-dicts layout
+# Run from the repository root: python -m benchmarks.results_table [rows]
+import shutil
+import sys
+import tempfile
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.data import synthetic_results_file
+from benchmarks.timing import best_of, format_seconds
+from src.ResultsManager import ResultsManager
+from src.ResultsTable import ResultsTable
+
+
+# Peak memory allocated while building the structure returned by build
+def allocated_bytes(build) -> tuple:
+    tracemalloc.start()
+    structure = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return structure, size
+
+
+def run(n=100000) -> dict:
+    directory = tempfile.mkdtemp()
+    try:
+        frame = pd.read_csv(synthetic_results_file(n, directory), index_col=0)
+    finally:
+        shutil.rmtree(directory)
+    frame.index = frame.index.astype(str)
+
+    results_dict, dict_bytes = allocated_bytes(lambda: frame.to_dict(orient='index'))
+    table, table_bytes = allocated_bytes(lambda: ResultsTable(ResultsManager.col_names, frame))
+
+    dict_seconds = best_of(lambda: pd.DataFrame.from_dict(results_dict, orient='index').sort_index())
+    table_seconds = best_of(table.to_dataframe)
+
+    print(f"{n} rows")
+    print(f"dict of dicts: {dict_bytes / 2**20:8.1f} MiB | to_dataframe {format_seconds(dict_seconds)}")
+    print(f"columnar:      {table_bytes / 2**20:8.1f} MiB | to_dataframe {format_seconds(table_seconds)}")
+    return {'rows': n, 'dict_bytes': dict_bytes, 'dict_to_dataframe_seconds': dict_seconds,
+            'columnar_bytes': table_bytes, 'columnar_to_dataframe_seconds': table_seconds}
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
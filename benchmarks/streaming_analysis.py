@@ -0,0 +1,52 @@
+# Compares the time from starting a recording to having its features, for a fixed 5 s recording analysed afterwards
+# and for streaming analysis that stops once the voice measures settle. Capture time is the length of audio needed,
+# as it would be recorded in real time, and analysis time is measured
+# Run from the repository root: python -m benchmarks.streaming_analysis [wav file]
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.timing import format_seconds
+from src.FeatureExtractor import FeatureExtractor
+from src.ResultsManager import ResultsManager
+from src.StreamingAnalyser import StreamingAnalyser
+
+CHUNK_SECONDS = 0.25
+
+
+def run(sound_file='tests/test.wav', fixed_seconds=5) -> dict:
+    samples = FeatureExtractor(sound_file, lazy=True).get_samples()
+    sample_rate = 44100
+    labels = ResultsManager.feature_names
+
+    start = time.perf_counter()
+    FeatureExtractor(samples[:int(fixed_seconds * sample_rate)], lazy=True, sample_rate=sample_rate).get_dataset_features(labels)
+    fixed_analysis = time.perf_counter() - start
+
+    analyser = StreamingAnalyser(sample_rate)
+    chunk = int(CHUNK_SECONDS * sample_rate)
+    slowest_chunk = 0
+    for offset in range(0, len(samples), chunk):
+        start = time.perf_counter()
+        analyser.write(samples[np.newaxis, offset:offset + chunk])
+        slowest_chunk = max(slowest_chunk, time.perf_counter() - start)
+        if analyser.is_done():
+            break
+    start = time.perf_counter()
+    analyser.get_features(labels)
+    streaming_analysis = time.perf_counter() - start
+    captured = analyser.audio_buffer.duration()
+
+    fixed_total = fixed_seconds + fixed_analysis
+    streaming_total = captured + streaming_analysis
+    print(f"Fixed {fixed_seconds} s recording: {fixed_seconds:.2f} s capture + {format_seconds(fixed_analysis)} analysis = {fixed_total:.2f} s")
+    print(f"Streaming: {captured:.2f} s capture ({'converged' if analyser.is_converged() else 'did not converge'}, "
+          f"{len(analyser.history)} windows, slowest {CHUNK_SECONDS} s chunk analysed in {format_seconds(slowest_chunk)}) "
+          f"+ {format_seconds(streaming_analysis)} analysis = {streaming_total:.2f} s")
+    return {'fixed_seconds': fixed_total, 'streaming_seconds': streaming_total, 'captured_seconds': captured,
+        'slowest_chunk_seconds': slowest_chunk, 'converged': analyser.is_converged()}
+
+
+if __name__ == '__main__':
+    run(*sys.argv[1:2])
@@ -0,0 +1,245 @@
+# End-to-end benchmark suite covering the whole pipeline: feature extraction on short, long and synthetic vowels,
+# results storage at 1k to 1M rows on both backends, training and inference for every classifier, and the import
+# time of each page of the app
+# Every measurement is a duration in seconds under a flat name such as 'storage/sqlite/100000/load', so a run can be
+# saved as JSON and compared with a saved baseline, flagging measurements that got slower than a tolerance allows
+# Run from the repository root:
+#   python -m benchmarks.suite --output baseline.json
+#   python -m benchmarks.suite --baseline baseline.json [--output current.json]
+#   python -m benchmarks.suite --results current.json --baseline baseline.json (compares without running)
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.data import synthetic_features, synthetic_results_file, synthetic_vowel
+from benchmarks.timing import best_of, format_seconds
+
+PARTS = ('extraction', 'storage', 'inference', 'imports')
+SIZES = (1000, 10000, 100000, 1000000)
+# Rows added to each table when timing add_results
+ADDS = 100
+# Rows predicted at once when timing batch inference
+BATCH_ROWS = 10000
+# Slower ratios than 1 + tolerance are regressions, unless the difference is below the timer noise
+# Shared or virtual machines can vary by more than this between runs of the same code, so compare runs from a quiet
+# machine or raise --tolerance
+TOLERANCE = 0.2
+MIN_DIFFERENCE = 50e-6
+SINGLE_RUN_SECONDS = 5
+
+
+# Best time of repeat calls, or of one call when that already takes over SINGLE_RUN_SECONDS (e.g. saving a 1M row
+# table), where run-to-run noise is small relative to the measurement
+def measure(fn, repeat=3) -> float:
+    seconds = best_of(fn, 1)
+    if seconds > SINGLE_RUN_SECONDS or repeat == 1:
+        return seconds
+    return min(seconds, best_of(fn, repeat - 1))
+
+
+# Full extraction and the extraction of the features the models use, per recording
+def run_extraction(sound_file='tests/test.wav', repeat=3) -> dict:
+    from src.FeatureExtractor import FeatureExtractor
+    from src.ResultsManager import ResultsManager
+
+    samples = FeatureExtractor(sound_file, lazy=True).get_samples()
+    recordings = {
+        'short': sound_file,
+        'long': np.resize(samples, 60 * 44100),
+        'synthetic': synthetic_vowel(5),
+    }
+    results = {}
+    for name, recording in recordings.items():
+        results[f'extraction/{name}/all_features'] = measure(lambda: FeatureExtractor(recording), repeat)
+        results[f'extraction/{name}/model_features'] = measure(
+                lambda: FeatureExtractor(recording, lazy=True).get_dataset_features(ResultsManager.feature_names), repeat)
+    return results
+
+
+# Loading, adding to, saving and converting a table of n results, for the .csv and SQLite backends
+def run_storage(sizes=SIZES, repeat=3) -> dict:
+    from src.ResultsManager import ResultsManager
+
+    row = dict(synthetic_features(1, seed=1).iloc[0])
+    results = {}
+    for n in sizes:
+        directory = tempfile.mkdtemp()
+        try:
+            csv_file = synthetic_results_file(n, directory)
+            sqlite_file = os.path.join(directory, 'results.db')
+            seeding = ResultsManager(sqlite_file)
+            seeding.import_csv(csv_file)
+            seeding.save()
+            seeding.storage.close()
+
+            for backend, path in (('csv', csv_file), ('sqlite', sqlite_file)):
+                prefix = f'storage/{backend}/{n}'
+                results[f'{prefix}/load'] = measure(lambda: ResultsManager(path).storage.close(), repeat)
+                results_manager = ResultsManager(path)
+                start = time.perf_counter()
+                for _ in range(ADDS):
+                    results_manager.add_results(row)
+                results[f'{prefix}/add'] = (time.perf_counter() - start) / ADDS
+                results[f'{prefix}/save'] = measure(results_manager.save, repeat)
+                results[f'{prefix}/to_dataframe'] = measure(results_manager.to_dataframe, repeat)
+                results_manager.storage.close()
+        finally:
+            shutil.rmtree(directory)
+    return results
+
+
+# Training, single-row and batch prediction and 10-fold cross-validation of every classifier on the dataset
+def run_inference(repeat=3) -> dict:
+    from src.Classifier import SVM, AdaBoost, RandomForest, Voting
+    from src.CrossValidation import cross_validation_cache
+
+    df = pd.read_csv('data/parkinsons.data')
+    y = df['status']
+    X = df.drop(['name', 'status', 'RPDE', 'DFA', 'spread1', 'spread2', 'D2', 'PPE'], axis=1)
+    batch = synthetic_features(BATCH_ROWS)[X.columns]
+    row = batch.iloc[:1]
+    classifiers = {
+        'SVM': lambda: SVM({'random_state': 0}),
+        'RandomForest': lambda: RandomForest({'random_state': 0}),
+        'AdaBoost': lambda: AdaBoost({'random_state': 0}),
+        'Voting': lambda: Voting(SVM({'random_state': 0}), RandomForest({'random_state': 0}), AdaBoost({'random_state': 0})),
+    }
+    results = {}
+    for name, make in classifiers.items():
+        classifier = make()
+        results[f'inference/{name}/train'] = measure(lambda: classifier.train(X, y), repeat)
+        results[f'inference/{name}/predict_row'] = best_of(lambda: classifier.predict(row), 10 * repeat)
+        results[f'inference/{name}/predict_batch'] = measure(lambda: classifier.predict(batch), repeat)
+
+        # The cache is cleared each time, so every run computes its folds and kernels
+        def cross_validate():
+            cross_validation_cache.clear()
+            make().cross_validate(X, y)
+        results[f'inference/{name}/cross_validate'] = measure(cross_validate, repeat)
+    return results
+
+
+# Import time of each page of app.py in a fresh interpreter, as reported by benchmarks/import_time.py
+def run_imports(app_file='app.py') -> dict:
+    from benchmarks import import_time
+
+    return {f'imports/{title}': result['seconds'] for title, result in import_time.run(app_file).items()}
+
+
+def run(parts=PARTS, sizes=SIZES, repeat=3) -> dict:
+    results = {}
+    if 'extraction' in parts:
+        results.update(run_extraction(repeat=repeat))
+    if 'storage' in parts:
+        results.update(run_storage(sizes, repeat))
+    if 'inference' in parts:
+        results.update(run_inference(repeat))
+    if 'imports' in parts:
+        results.update(run_imports())
+    for name, seconds in results.items():
+        print(f"{name:<45} {format_seconds(seconds):>10}")
+    return results
+
+
+# Where and when a run was made, so results from different machines are not compared unknowingly
+def environment() -> dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def save(results: dict, file: str) -> None:
+    with open(file, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=2)
+    print(f"Results saved to '{file}'.")
+
+
+def load(file: str) -> dict:
+    with open(file) as f:
+        return json.load(f)
+
+
+# Compares each measurement with the baseline's, returning the ratio of every shared one and the names of those
+# slower than the tolerance allows, faster by as much, or only in one of the two runs
+# Measurements of parts that were not run at all are not reported as missing
+def compare(results: dict, baseline: dict, tolerance=TOLERANCE, min_difference=MIN_DIFFERENCE) -> dict:
+    parts = {name.split('/')[0] for name in results}
+    comparison = {'ratios': {}, 'regressions': [], 'improvements': [], 'new': sorted(set(results) - set(baseline)),
+                  'missing': sorted(name for name in set(baseline) - set(results) if name.split('/')[0] in parts)}
+    for name in results.keys() & baseline.keys():
+        current, previous = results[name], baseline[name]
+        ratio = current / previous if previous > 0 else float('inf')
+        comparison['ratios'][name] = ratio
+        if abs(current - previous) < min_difference:
+            continue
+        if ratio > 1 + tolerance:
+            comparison['regressions'].append(name)
+        elif ratio < 1 / (1 + tolerance):
+            comparison['improvements'].append(name)
+    comparison['regressions'].sort()
+    comparison['improvements'].sort()
+    return comparison
+
+
+def print_comparison(results: dict, baseline: dict, comparison: dict) -> None:
+    for name in sorted(comparison['ratios']):
+        flag = 'REGRESSION' if name in comparison['regressions'] else 'faster' if name in comparison['improvements'] else ''
+        print(f"{name:<45} {format_seconds(baseline[name]):>10} -> {format_seconds(results[name]):>10} "
+              f"({comparison['ratios'][name]:.2f}x) {flag}")
+    for label in ('new', 'missing'):
+        if comparison[label]:
+            print(f"{label.capitalize()} measurements: {', '.join(comparison[label])}")
+    print(f"{len(comparison['regressions'])} regressions and {len(comparison['improvements'])} improvements "
+          f"in {len(comparison['ratios'])} measurements.")
+
+
+def main(args=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark feature extraction, results storage and inference.")
+    parser.add_argument('--parts', nargs='+', choices=PARTS, default=list(PARTS), help="parts of the suite to run")
+    parser.add_argument('--sizes', nargs='+', type=int, default=list(SIZES), help="results table sizes for the storage part")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per measurement, the best is kept")
+    parser.add_argument('--output', default=None, help="JSON file to save the results to")
+    parser.add_argument('--results', default=None, help="compare a saved JSON file instead of running the suite")
+    parser.add_argument('--baseline', default=None, help="JSON file of a previous run to compare against")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help="slowdown allowed before flagging a regression")
+    args = parser.parse_args(args)
+
+    if args.results is not None:
+        results = load(args.results)['results']
+    else:
+        results = run(args.parts, args.sizes, args.repeat)
+        if args.output is not None:
+            save(results, args.output)
+
+    if args.baseline is not None:
+        baseline = load(args.baseline)
+        if baseline['environment'].get('platform') != platform.platform() and args.results is None:
+            print(f"Baseline was measured on {baseline['environment'].get('platform')}, not this machine.")
+        comparison = compare(results, baseline['results'], args.tolerance)
+        print_comparison(results, baseline['results'], comparison)
+        # A non-zero exit status lets a CI job fail on regressions
+        return 1 if comparison['regressions'] else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
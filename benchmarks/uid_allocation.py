@@ -0,0 +1,52 @@
+# Compares the previous random UID picker with the persisted counter allocators
+# Run from the repository root: python -m benchmarks.uid_allocation
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from random import choice
+
+from benchmarks.timing import format_seconds
+from src.UIDAllocator import FileUIDAllocator, SQLiteUIDAllocator
+
+
+# The picker previously used by ResultsManager.add_results
+def random_uid(results) -> str:
+    return str(choice([x for x in range(1,1000) if x not in results]))
+
+
+# Mean time per allocation after the first (seeding) call
+def per_allocation(allocate, count: int) -> float:
+    allocate()
+    start = time.perf_counter()
+    for _ in range(count):
+        allocate()
+    return (time.perf_counter() - start) / count
+
+
+def run(existing_rows=1000000, count=1000) -> dict:
+    directory = tempfile.mkdtemp()
+    try:
+        results = {str(uid): None for uid in range(1, 900)}
+        random_seconds = per_allocation(lambda: random_uid(results), count)
+
+        existing = [str(uid) for uid in range(1, existing_rows + 1)]
+        file_allocator = FileUIDAllocator(os.path.join(directory, 'results.csv.uid'))
+        file_seconds = per_allocation(lambda: file_allocator.allocate(existing), count)
+
+        connection = sqlite3.connect(os.path.join(directory, 'results.db'))
+        sqlite_allocator = SQLiteUIDAllocator(connection)
+        sqlite_seconds = per_allocation(lambda: sqlite_allocator.allocate(existing), count)
+        connection.close()
+    finally:
+        shutil.rmtree(directory)
+
+    print(f"random picker with 899 existing UIDs:   {format_seconds(random_seconds)} per UID (fails at 999)")
+    print(f"file counter with {existing_rows} existing UIDs:   {format_seconds(file_seconds)} per UID")
+    print(f"sqlite counter with {existing_rows} existing UIDs: {format_seconds(sqlite_seconds)} per UID")
+    return {'random_seconds': random_seconds, 'file_seconds': file_seconds, 'sqlite_seconds': sqlite_seconds}
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,54 @@
+# Measures what voice activity detection saves on recordings with leading silence, a breath and trailing silence,
+# made by padding the given one by different amounts: time to find the segment, extraction time on the whole
+# recording and on the segment, and how much each measure varies across the paddings (max - min, relative to mean)
+# Run from the repository root: python -m benchmarks.voice_activity [wav file] [variants]
+import sys
+
+import numpy as np
+
+from benchmarks.timing import best_of, format_seconds
+from src.FeatureExtractor import FeatureExtractor
+from src.VoiceActivityDetector import VoiceActivityDetector
+
+compared_labels = ['MDVP:Fo(Hz)', 'MDVP:Jitter(%)', 'MDVP:RAP', 'MDVP:Shimmer', 'MDVP:APQ', 'HNR']
+
+
+def padded_recording(samples: np.ndarray, seed: int, sample_rate=44100) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return np.concatenate([
+        rng.normal(0, 0.001, int(rng.uniform(0.5, 1.5) * sample_rate)),
+        rng.normal(0, 0.05, int(rng.uniform(0.1, 0.5) * sample_rate)),
+        samples,
+        rng.normal(0, 0.001, int(rng.uniform(0.2, 1.0) * sample_rate)),
+    ])
+
+
+def spread(values) -> float:
+    return (max(values) - min(values)) / np.mean(values)
+
+
+def run(sound_file='tests/test.wav', variants=5, repeat=3) -> dict:
+    samples = FeatureExtractor(sound_file, lazy=True).get_samples()
+    recordings = [padded_recording(samples, seed) for seed in range(variants)]
+    detector = VoiceActivityDetector()
+    segments = [detector.select(recording, 44100) for recording in recordings]
+    extract = lambda x: FeatureExtractor(x, sample_rate=44100).get_dataset_features()
+
+    detect = best_of(lambda: detector.select(recordings[0], 44100), repeat)
+    whole_seconds = best_of(lambda: extract(recordings[0]), repeat)
+    segment_seconds = best_of(lambda: extract(segments[0]), repeat)
+    print(f"{len(recordings[0]) / 44100:.2f} s recording, {len(segments[0]) / 44100:.2f} s segment found in {format_seconds(detect)}")
+    print(f"All features: whole recording {format_seconds(whole_seconds)} | segment {format_seconds(segment_seconds)} + detection")
+
+    whole = [extract(recording) for recording in recordings]
+    selected = [extract(segment) for segment in segments]
+    spreads = {}
+    print(f"Spread across {variants} paddings: {'whole':>8} {'segment':>8}")
+    for label in compared_labels:
+        spreads[label] = {'whole': spread([f[label] for f in whole]), 'segment': spread([f[label] for f in selected])}
+        print(f"{label:>32}: {spreads[label]['whole']:>8.2%} {spreads[label]['segment']:>8.2%}")
+    return {'detect_seconds': detect, 'whole_seconds': whole_seconds, 'segment_seconds': segment_seconds, 'spreads': spreads}
+
+
+if __name__ == '__main__':
+    run(*sys.argv[1:2], *map(int, sys.argv[2:3]))
@@ -0,0 +1,80 @@
+import numpy as np
+
+
+# Fixed-size ring buffer of mono int16 samples for audio captured in frames (e.g. from WebRTC)
+# Every frame is downmixed to mono and resampled to the buffer's sample rate, then written in place,
+# so memory stays bounded and each write costs the same however long the recording is
+# Once full, the oldest samples are overwritten and the buffer holds the latest max_seconds of audio
+class AudioBuffer:
+    def __init__(self, max_seconds=10, sample_rate=44100) -> None:
+        self.sample_rate = sample_rate
+        self.samples = np.zeros(int(max_seconds * sample_rate), dtype=np.int16)
+        self.clear()
+
+    def clear(self) -> None:
+        self.position = 0
+        self.length = 0
+        # Resampling state carried between frames: the last input sample, and where the next output
+        # sample falls relative to it, in input samples
+        self.previous = None
+        self.phase = 0.0
+
+    # Writes a PyAV AudioFrame, as received from streamlit-webrtc
+    def write_frame(self, audio_frame) -> None:
+        samples = audio_frame.to_ndarray()
+        channels = len(audio_frame.layout.channels)
+        # Packed formats interleave the channels in a single row
+        if not audio_frame.format.is_planar:
+            samples = samples.reshape(-1, channels).T
+        self.write(samples, audio_frame.sample_rate)
+
+    # Writes samples shaped (channels, frames) or (frames,). Integer samples are taken as int16,
+    # floating point samples as [-1, 1]
+    def write(self, samples: np.ndarray, sample_rate: int) -> None:
+        samples = np.asarray(samples)
+        floating = np.issubdtype(samples.dtype, np.floating)
+        if samples.ndim == 2:
+            samples = samples[0] if samples.shape[0] == 1 else samples.mean(axis=0)
+        if floating:
+            samples = samples * np.iinfo(np.int16).max
+        if sample_rate != self.sample_rate:
+            samples = self.resample(samples, sample_rate)
+        if samples.dtype != np.int16:
+            samples = np.clip(np.rint(samples), -32768, 32767).astype(np.int16)
+
+        # Only the latest samples fit if the frame is longer than the whole buffer
+        capacity = len(self.samples)
+        if len(samples) > capacity:
+            samples = samples[-capacity:]
+        n = len(samples)
+        first = min(n, capacity - self.position)
+        self.samples[self.position:self.position + first] = samples[:first]
+        self.samples[:n - first] = samples[first:]
+        self.position = (self.position + n) % capacity
+        self.length = min(self.length + n, capacity)
+
+    # Linear interpolation of one frame to the buffer's sample rate, continuing from the end of the previous frame
+    def resample(self, samples: np.ndarray, sample_rate: int) -> np.ndarray:
+        samples = samples.astype(np.float64)
+        if self.previous is not None:
+            samples = np.concatenate(([self.previous], samples))
+        if len(samples) == 0:
+            return samples
+        step = sample_rate / self.sample_rate
+        last = len(samples) - 1
+        positions = np.arange(self.phase, last + 1e-9, step)
+        self.phase = (positions[-1] + step - last) if len(positions) > 0 else self.phase - last
+        self.previous = samples[-1]
+        return np.interp(positions, np.arange(len(samples)), samples)
+
+    # Returns the recorded samples in order. A view while the buffer has not wrapped, a copy once it has
+    def to_array(self) -> np.ndarray:
+        if self.length < len(self.samples):
+            return self.samples[:self.length]
+        return np.concatenate((self.samples[self.position:], self.samples[:self.position]))
+
+    def duration(self) -> float:
+        return self.length / self.sample_rate
+
+    def __len__(self) -> int:
+        return self.length
@@ -0,0 +1,186 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from src.FeatureCache import FeatureCache
+from src.FeatureExtractor import FeatureExtractor
+from src.ResultsManager import ResultsManager
+
+
+# Extracts the dataset features of one recording. Runs in a worker process, so errors are returned rather than raised
+# Features are read from and written to the feature cache in cache_directory, if given
+def extract_file(path: str, labels=None, cache_directory=None) -> tuple:
+    try:
+        feature_extractor = FeatureExtractor(path, lazy=True, cache=get_cache(cache_directory))
+        return path, feature_extractor.get_dataset_features(labels), None
+    except Exception as e:
+        return path, None, f"{type(e).__name__}: {e}"
+
+
+# One cache per directory in each worker process, so the directory is only scanned once
+def get_cache(directory: str) -> FeatureCache:
+    if directory is None:
+        return None
+    if directory not in _caches:
+        _caches[directory] = FeatureCache(directory)
+    return _caches[directory]
+
+_caches = {}
+
+
+# Returns the .wav files in a directory, or the paths listed one per line in a manifest file
+# Relative paths in a manifest are taken from the manifest's directory
+def find_recordings(source: str) -> list:
+    if os.path.isdir(source):
+        return sorted(os.path.join(source, name) for name in os.listdir(source) if name.lower().endswith('.wav'))
+    with open(source) as f:
+        lines = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    return [os.path.join(os.path.dirname(source), line) for line in lines]
+
+
+# Extracts features from many recordings across a process pool and adds them to a results table in chunks
+# Every processed file is logged to a progress file, so an interrupted run can be resumed without redoing work
+# Files that failed are retried on the next run
+class BatchExtractor:
+    # Files submitted to the pool ahead of the ones being extracted, per worker
+    queue_per_worker = 2
+
+    def __init__(self, results_manager: ResultsManager, workers=None, chunk_size=50, labels=None, progress_file=None, cache_directory=None) -> None:
+        self.results_manager = results_manager
+        self.workers = workers or os.cpu_count()
+        self.chunk_size = chunk_size
+        self.labels = labels
+        self.progress_file = progress_file or results_manager.path + '.progress'
+        self.cache_directory = cache_directory
+
+    # Returns the paths already added to the results table, and their UIDs, from the progress file
+    # A chunk is logged before it is saved, so a UID that never made it into the table is not counted as done
+    def get_completed(self) -> dict:
+        completed = {}
+        if os.path.exists(self.progress_file):
+            with open(self.progress_file) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if record.get('uid') is not None and record['uid'] in self.results_manager.results:
+                        completed[record['path']] = record['uid']
+        return completed
+
+    # Processes every path not already completed, calling progress(done, total, failed) as files finish
+    # Returns a summary of the run, including the error for every failed file
+    def run(self, paths, progress=None) -> dict:
+        completed = self.get_completed()
+        pending = [os.path.abspath(path) for path in paths if os.path.abspath(path) not in completed]
+        summary = {'total': len(pending), 'added': 0, 'skipped': len(paths) - len(pending), 'failed': {}, 'seconds': 0}
+        start = time.perf_counter()
+
+        chunk = []
+        done = 0
+        for path, features, error in self._extract(pending):
+            done += 1
+            chunk.append((path, features, error))
+            if error is not None:
+                summary['failed'][path] = error
+            if len(chunk) >= self.chunk_size:
+                summary['added'] += self._write_chunk(chunk)
+                chunk = []
+            if progress is not None:
+                progress(done, len(pending), len(summary['failed']))
+        summary['added'] += self._write_chunk(chunk)
+
+        summary['seconds'] = time.perf_counter() - start
+        return summary
+
+    # Yields (path, features, error) as files finish, in completion order
+    # Only a few files per worker are queued at a time, and an error in one file never stops the rest of the batch
+    def _extract(self, paths):
+        if self.workers == 1:
+            for path in paths:
+                yield extract_file(path, self.labels, self.cache_directory)
+            return
+        pending = deque(paths)
+        while pending:
+            crashed = []
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                running = {}
+                while (pending or running) and not crashed:
+                    while pending and len(running) < self.workers * self.queue_per_worker:
+                        path = pending.popleft()
+                        running[executor.submit(extract_file, path, self.labels, self.cache_directory)] = path
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        path = running.pop(future)
+                        try:
+                            yield future.result()
+                        except BrokenProcessPool:
+                            crashed.append(path)
+                        except Exception as e:
+                            yield path, None, f"{type(e).__name__}: {e}"
+                crashed.extend(running.values())
+            # A worker that dies (e.g. in native code) breaks the pool and fails every file in flight, so each of those
+            # is retried in a pool of its own to find the one that caused it, then the rest of the batch carries on
+            for path in crashed:
+                yield self._extract_alone(path)
+
+    def _extract_alone(self, path: str) -> tuple:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            try:
+                return executor.submit(extract_file, path, self.labels, self.cache_directory).result()
+            except BrokenProcessPool:
+                return path, None, "BrokenProcessPool: the worker process crashed while extracting this file"
+            except Exception as e:
+                return path, None, f"{type(e).__name__}: {e}"
+
+    # Adds a chunk of results and logs it as done, then saves the results
+    # Logging first means a crash in between is caught on resume, as the logged UIDs are missing from the saved table
+    def _write_chunk(self, chunk) -> int:
+        if not chunk:
+            return 0
+        records = []
+        for path, features, error in chunk:
+            uid = None if error else self.results_manager.add_results(features)
+            records.append({'path': path, 'uid': uid, 'error': error})
+        with open(self.progress_file, 'a') as f:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+        self.results_manager.save()
+        return sum(1 for record in records if record['uid'] is not None)
+
+
+def main(args=None) -> None:
+    parser = argparse.ArgumentParser(description="Extract vocal features from a directory or manifest of .wav recordings.")
+    parser.add_argument('source', help="directory of .wav files, or a manifest listing one path per line")
+    parser.add_argument('--results', default='results/results.db', help="results table to add to (.db or .csv)")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument('--chunk-size', type=int, default=50, help="results saved per write")
+    parser.add_argument('--model-features', action='store_true', help="only extract the features used by the bundled models")
+    parser.add_argument('--progress-file', default=None, help="progress log used to resume (default: <results>.progress)")
+    parser.add_argument('--cache', default=None, metavar='DIR', help="feature cache directory, so re-imported recordings are not re-analysed")
+    args = parser.parse_args(args)
+
+    paths = find_recordings(args.source)
+    labels = ResultsManager.feature_names if args.model_features else None
+    batch_extractor = BatchExtractor(ResultsManager(args.results), args.workers, args.chunk_size, labels, args.progress_file, args.cache)
+
+    start = time.perf_counter()
+    def progress(done, total, failed):
+        rate = done / max(time.perf_counter() - start, 1e-9)
+        print(f"\r[{done:>{len(str(total))}}/{total}] {failed} failed, {rate:.1f} files/s", end='', file=sys.stderr)
+
+    summary = batch_extractor.run(paths, progress)
+    print(file=sys.stderr)
+    print(f"Added {summary['added']} results, skipped {summary['skipped']} already processed, "
+          f"{len(summary['failed'])} failed in {summary['seconds']:.1f} s.")
+    for path, error in summary['failed'].items():
+        print(f"  {path}: {error}")
+
+
+if __name__ == '__main__':
+    main()
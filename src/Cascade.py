@@ -0,0 +1,154 @@
+import threading
+import time
+from os.path import exists
+
+import numpy as np
+import pandas as pd
+from joblib import dump, load
+from sklearn.base import clone
+from sklearn.model_selection import StratifiedKFold
+
+from src.Classifier import Voting
+
+
+# Cascade inference over a trained Voting ensemble: the cheapest member predicts first, and only rows where its
+# probability is not above threshold are passed to the full soft-voting ensemble
+# The threshold is calibrated on held-out data, as the highest confidence at which the first member disagreed with
+# the ensemble, so early exits only happen where it agreed with it. Until calibrated, every row goes to the ensemble
+class Cascade:
+    # Disagreements needed to trust the threshold. With fewer, the threshold is infinite and every row goes to the
+    # ensemble, so a small or easy calibration set never lets the first member answer for rows it is unsure about
+    min_disagreements = 3
+
+    def __init__(self, voting: Voting, first=None, threshold=None) -> None:
+        self.voting = voting
+        self.first = first
+        self.threshold = threshold
+        self.lock = threading.Lock()
+        self.stats = {'calls': 0, 'predictions': 0, 'early_exits': 0, 'seconds': 0.0}
+
+    # Index of the member tried first, the fastest to predict a single row unless set
+    def first_member(self, X) -> int:
+        if self.first is None:
+            row = self._prepare(X)[:1]
+            latencies = []
+            for member in self.voting.clf.estimators_:
+                member.predict_proba(row)
+                start = time.perf_counter()
+                for _ in range(5):
+                    member.predict_proba(row)
+                latencies.append(time.perf_counter() - start)
+            self.first = int(np.argmin(latencies))
+        return self.first
+
+    # Chooses the threshold on held-out predictions and returns the held-out accuracy of the ensemble and the cascade
+    # With cv, X and y are the training data and the predictions are out-of-fold, from copies of the ensemble fitted
+    # on the other folds; a single small validation set gives too few disagreements to calibrate on reliably.
+    # Without cv, X and y must be held out from the data the ensemble was trained on
+    # The cascade agrees with the ensemble on every row the threshold was picked on, so its accuracy and early exit rate
+    # are cross-fitted: each half of the rows is scored with the threshold picked on the other half
+    def calibrate(self, X, y, cv=5) -> dict:
+        X = self._prepare(X)
+        y = np.asarray(y)
+        first = self.first_member(X)
+        classes = self.voting.clf.le_.classes_
+        member_probabilities = np.zeros((len(y), len(classes)))
+        ensemble_predictions = np.zeros(len(y), dtype=classes.dtype)
+        if cv is None:
+            folds = [(None, np.arange(len(y)))]
+        else:
+            folds = StratifiedKFold(cv, shuffle=True, random_state=0).split(X, y)
+        for train, test in folds:
+            ensemble = self.voting.clf if train is None else clone(self.voting.clf).fit(X.iloc[train], y[train])
+            member_probabilities[test] = ensemble.estimators_[first].predict_proba(X.iloc[test])
+            ensemble_predictions[test] = ensemble.predict(X.iloc[test])
+
+        confidence = member_probabilities.max(axis=1)
+        member_predictions = classes[member_probabilities.argmax(axis=1)]
+        disagree = member_predictions != ensemble_predictions
+        self.threshold = _pick_threshold(confidence, disagree, self.min_disagreements)
+
+        exits = np.zeros(len(y), dtype=bool)
+        for pick, score in StratifiedKFold(2, shuffle=True, random_state=0).split(X, y):
+            exits[score] = confidence[score] > _pick_threshold(confidence[pick], disagree[pick], self.min_disagreements)
+        cascade_predictions = np.where(exits, member_predictions, ensemble_predictions)
+        return {
+            'threshold': self.threshold,
+            'ensemble_accuracy': float(np.mean(ensemble_predictions == y)),
+            'cascade_accuracy': float(np.mean(cascade_predictions == y)),
+            'early_exit_rate': float(exits.mean()),
+        }
+
+    # Predicts a single row or a whole feature matrix, like Classifier.predict
+    def predict(self, features) -> np.ndarray:
+        probabilities = self.predict_probability(features)
+        return self.voting.clf.le_.classes_[probabilities.argmax(axis=1)]
+
+    # Probabilities from the first member for rows it is confident about, and from the ensemble for the rest
+    def predict_probability(self, features) -> np.ndarray:
+        start = time.perf_counter()
+        X = self._prepare(features)
+        if len(X) == 0:
+            return np.zeros((0, len(self.voting.clf.le_.classes_)))
+        exits = np.zeros(len(X), dtype=bool)
+        if self.threshold is None:
+            probabilities = self.voting.clf.predict_proba(X)
+        else:
+            probabilities = self.voting.clf.estimators_[self.first_member(X)].predict_proba(X)
+            exits = probabilities.max(axis=1) > self.threshold
+            if not exits.all():
+                probabilities[~exits] = self.voting.clf.predict_proba(X[~exits])
+        with self.lock:
+            self.stats['calls'] += 1
+            self.stats['predictions'] += len(X)
+            self.stats['early_exits'] += int(exits.sum())
+            self.stats['seconds'] += time.perf_counter() - start
+        return probabilities
+
+    def feature_names(self) -> list:
+        return self.voting.feature_names()
+
+    # Returns the fraction of predictions that exited early and the mean latency per call and per prediction
+    def get_stats(self) -> dict:
+        with self.lock:
+            stats = self.stats
+            return {
+                'calls': stats['calls'],
+                'predictions': stats['predictions'],
+                'early_exits': stats['early_exits'],
+                'early_exit_rate': stats['early_exits'] / stats['predictions'] if stats['predictions'] else None,
+                'mean_seconds_per_call': stats['seconds'] / stats['calls'] if stats['calls'] else None,
+                'mean_seconds_per_prediction': stats['seconds'] / stats['predictions'] if stats['predictions'] else None,
+            }
+
+    def save(self, file="models/Cascade") -> None:
+        dump({'voting': self.voting.clf, 'first': self.first, 'threshold': self.threshold}, file)
+        print(f"Model saved to '{file}'.")
+
+    @classmethod
+    def load(cls, file="models/Cascade"):
+        if not exists(file):
+            print(f"Model file '{file}' does not exist.")
+            return None
+        saved = load(file)
+        voting = Voting()
+        voting.clf = saved['voting']
+        return cls(voting, saved['first'], saved['threshold'])
+
+    # Puts the columns of a DataFrame in the order the ensemble was trained on, as Classifier.predict does
+    # A single row may be a Series or a flat array
+    def _prepare(self, features) -> pd.DataFrame:
+        names = self.feature_names()
+        if isinstance(features, pd.Series):
+            features = features.to_frame().T
+        if isinstance(features, pd.DataFrame):
+            return features[names] if names is not None else features
+        return pd.DataFrame(np.atleast_2d(np.asarray(features, dtype=float)), columns=names)
+
+
+# The highest confidence at which the first member disagreed with the ensemble, so rows above it exit early
+# Infinite, so no row exits early, if there were fewer than min_disagreements disagreements to estimate it from
+def _pick_threshold(confidence: np.ndarray, disagree: np.ndarray, min_disagreements: int) -> float:
+    if disagree.sum() < min_disagreements:
+        return float('inf')
+    return float(confidence[disagree].max())
@@ -3,11 +3,15 @@ from sklearn import svm
 from sklearn.ensemble import (AdaBoostClassifier, RandomForestClassifier,
                               VotingClassifier)
 from sklearn.metrics import ConfusionMatrixDisplay, classification_report
-from sklearn.model_selection import cross_val_score, train_test_split
+from sklearn.model_selection import train_test_split
 from joblib import load, dump
 from os.path import exists
 import numpy as np
 
+from src.CompiledModel import compile_model
+from src.CrossValidation import cross_validate
+from src.Instrumentation import instrumentation
+
 
 class Classifier:
     # def __init__(self) -> None:
@@ -28,25 +32,43 @@ class Classifier:
         # self.train(self.X_train, self.y_train)
         # pass
         
+    @instrumentation.timed()
     def train(self, X, y) -> None:
         self.clf = self.clf.fit(X, y)
         return self.clf
         # return self.clf
 
-    def cross_validate(self, X, y) -> float:
-        scores_test = cross_val_score(self.clf, X.values, y.values, scoring='accuracy', cv=10)
-        return np.mean(scores_test)
+    # Mean accuracy over 10 stratified folds. Folds run in parallel, and fold indices and SVM kernels are cached
+    # With details=True, returns each fold's score and fit and score times as well as the mean
+    def cross_validate(self, X, y, details=False, workers=None) -> float:
+        results = cross_validate(self.clf, X, y, cv=10, workers=workers)
+        return results if details else results['mean_score']
 
     # def cross_validate(self, X, y):
     #     scores_test = cross_val_score(self.clf, X.values, y.values, scoring='accuracy', cv=10)
     #     return np.mean(scores_test)
 
+    # Predicts a single row or a whole feature matrix in one call
+    # DataFrames are reordered to the columns the model was trained on
+    @instrumentation.timed()
     def predict(self, features) -> list:
         # to_predict = []
         # for key, value in features.items():
         #     to_predict.append(value)
+        if isinstance(features, pd.DataFrame):
+            if len(features) == 0:
+                return np.array([], dtype=int)
+            if self.feature_names() is not None:
+                features = features[self.feature_names()]
         return self.clf.predict(features)
 
+    # Returns the feature names the model was trained on, or None if it was trained without them
+    def feature_names(self) -> list:
+        if hasattr(self.clf, 'feature_names_in_'):
+            return list(self.clf.feature_names_in_)
+        return None
+
+    @instrumentation.timed()
     def predict_probability(self, features) -> list:
         return self.clf.predict_proba(features)
 
@@ -61,6 +83,14 @@ class Classifier:
         dump(self.clf, "models/" + type(self).__name__)
         print(f"Model saved to 'models/{type(self).__name__}'.")
 
+    # Compiles the trained model to an array-based artifact, predicted with CompiledModel.load(file) using NumPy alone
+    def export(self, file=None) -> str:
+        file = file or "models/" + type(self).__name__ + ".npz"
+        compile_model(self.clf, file)
+        print(f"Compiled model saved to '{file}'.")
+        return file
+
+    @instrumentation.timed()
     def load(self, file):
         if exists(file):
             try:
@@ -109,7 +139,8 @@ class RandomForest(Classifier):
                     max_depth=params['max_depth'] if 'max_depth' in params else None,
                     min_samples_split=params['min_samples_split'] if 'min_samples_split' in params else 2,
                     max_leaf_nodes=params['max_leaf_nodes'] if 'max_leaf_nodes' in params else None,
-                    max_features=params['max_features'] if 'max_features' in params else 'auto',
+                    # 'auto' meant 'sqrt' for classifiers, and newer scikit-learn no longer accepts it
+                    max_features=params['max_features'] if 'max_features' in params else 'sqrt',
                     max_samples=params['max_samples'] if 'max_samples' in params else None,
                     random_state=params['random_state'] if 'random_state' in params else None,
                 )
@@ -124,11 +155,13 @@ class AdaBoost(Classifier):
             self.clf = AdaBoostClassifier()
         elif type(params) is dict:
             try:
+                # algorithm was removed from newer scikit-learn, so it is only passed when asked for
+                algorithm = {'algorithm': params['algorithm']} if 'algorithm' in params else {}
                 self.clf = AdaBoostClassifier(
                     n_estimators=params['n_estimators'] if 'n_estimators' in params else 50,
                     learning_rate=params['learning_rate'] if 'learning_rate' in params else 1,
-                    algorithm=params['algorithm'] if 'algorithm' in params else 'SAMME.R',
                     random_state=params['random_state'] if 'random_state' in params else None,
+                    **algorithm,
                 )
             except:
                 self.__init__()
@@ -176,6 +209,9 @@ def main():
     rf.save()
     ada.save()
     vc.save()
+
+    for clf in [svm, rf, ada, vc]:
+        clf.export()
     
     print()
 
@@ -0,0 +1,313 @@
+import json
+
+import numpy as np
+
+# Bumped whenever the layout of compiled artifacts changes
+FORMAT_VERSION = 1
+
+
+# A trained classifier compiled to plain arrays, predicting with NumPy alone
+# Loading one needs neither scikit-learn nor joblib, and prediction skips the estimators' input validation
+# Predictions match the scikit-learn estimator it was compiled from. Probabilities of the tree ensembles match
+# exactly, and those of SVMs to within floating point rounding (libsvm sums the kernels in a different order)
+# Supports binary SVCs with a built-in kernel, random forests, AdaBoost (SAMME) and soft-voting ensembles of them
+class CompiledModel:
+    def __init__(self, predictor, feature_names=None) -> None:
+        self.predictor = predictor
+        self.names = feature_names
+        self.classes_ = predictor.classes
+
+    # Loads a compiled artifact saved by compile_model
+    @classmethod
+    def load(cls, file: str):
+        with np.load(file, allow_pickle=False) as artifact:
+            arrays = {name: artifact[name] for name in artifact.files}
+        meta = json.loads(str(arrays.pop('meta')))
+        if meta['format'] != FORMAT_VERSION:
+            raise ValueError(f"'{file}' uses compiled model format {meta['format']}, expected {FORMAT_VERSION}")
+        return cls(_build(meta['model'], arrays, ''), meta['feature_names'])
+
+    # Predicts a single row or a whole feature matrix, like Classifier.predict
+    # DataFrames are reordered to the columns the model was trained on
+    def predict(self, features) -> np.ndarray:
+        return self.predictor.predict(self._to_array(features))
+
+    def predict_proba(self, features) -> np.ndarray:
+        return self.predictor.predict_proba(self._to_array(features))
+
+    # Alias so a CompiledModel can stand in for a Classifier
+    predict_probability = predict_proba
+
+    def feature_names(self) -> list:
+        return self.names
+
+    def _to_array(self, features) -> np.ndarray:
+        # Selecting columns costs more than predicting a row, so it is skipped when they are already in order
+        if hasattr(features, 'columns') and self.names is not None and list(features.columns) != self.names:
+            features = features[self.names]
+        return np.asarray(features, dtype=np.float64).reshape(-1, self.predictor.n_features)
+
+
+# Compiles a trained scikit-learn estimator and saves it to file as an uncompressed .npz
+def compile_model(clf, file: str) -> None:
+    arrays = {}
+    model = _compile(clf, arrays, '')
+    feature_names = [str(name) for name in clf.feature_names_in_] if hasattr(clf, 'feature_names_in_') else None
+    meta = {'format': FORMAT_VERSION, 'model': model, 'feature_names': feature_names}
+    with open(file, 'wb') as f:
+        np.savez(f, meta=np.array(json.dumps(meta)), **arrays)
+
+
+# Adds the arrays describing an estimator to arrays, under prefix, and returns its JSON description
+# Estimators are recognised by class name so compiling does not import scikit-learn either
+def _compile(clf, arrays: dict, prefix: str) -> dict:
+    kind = type(clf).__name__
+    if kind == 'SVC':
+        return _compile_svm(clf, arrays, prefix)
+    if kind in ('RandomForestClassifier', 'ExtraTreesClassifier'):
+        model = {'kind': 'forest', 'n_features': int(clf.n_features_in_)}
+        _compile_trees(clf.estimators_, arrays, prefix)
+    elif kind == 'AdaBoostClassifier':
+        # SAMME.R (the default before scikit-learn 1.6) combines class probabilities rather than weighted votes
+        if getattr(clf, 'algorithm', 'SAMME') != 'SAMME':
+            raise ValueError(f"Only SAMME AdaBoost can be compiled, not {clf.algorithm}")
+        model = {'kind': 'adaboost', 'n_features': int(clf.n_features_in_)}
+        for tree in clf.estimators_:
+            if not np.array_equal(tree.classes_, clf.classes_):
+                raise ValueError("Every AdaBoost estimator must be trained on all the classes")
+        _compile_trees(clf.estimators_, arrays, prefix)
+        arrays[prefix + 'estimator_weights'] = np.asarray(clf.estimator_weights_, dtype=np.float64)
+    elif kind == 'VotingClassifier':
+        if clf.voting != 'soft':
+            raise ValueError("Only soft voting can be compiled")
+        members = [_compile(member, arrays, f'{prefix}{i}/') for i, member in enumerate(clf.estimators_)]
+        model = {'kind': 'voting', 'n_features': int(clf.n_features_in_), 'members': members}
+        if clf._weights_not_none is not None:
+            arrays[prefix + 'weights'] = np.asarray(clf._weights_not_none, dtype=np.float64)
+        arrays[prefix + 'classes'] = np.asarray(clf.le_.classes_)
+        return model
+    else:
+        raise ValueError(f"Cannot compile {kind}")
+    arrays[prefix + 'classes'] = np.asarray(clf.classes_)
+    return model
+
+
+def _compile_svm(clf, arrays: dict, prefix: str) -> dict:
+    if clf.kernel not in ('linear', 'poly', 'rbf', 'sigmoid'):
+        raise ValueError(f"Cannot compile an SVC with a {clf.kernel} kernel")
+    if len(clf.classes_) != 2:
+        raise ValueError("Only binary SVCs can be compiled")
+    model = {
+        'kind': 'svm',
+        'n_features': int(clf.n_features_in_),
+        'kernel': clf.kernel,
+        'gamma': float(clf._gamma),
+        'coef0': float(clf.coef0),
+        'degree': int(clf.degree),
+    }
+    arrays[prefix + 'classes'] = np.asarray(clf.classes_)
+    arrays[prefix + 'support_vectors'] = np.asarray(clf.support_vectors_, dtype=np.float64)
+    arrays[prefix + 'dual_coef'] = np.asarray(clf.dual_coef_[0], dtype=np.float64)
+    arrays[prefix + 'intercept'] = np.asarray(clf.intercept_, dtype=np.float64)
+    if getattr(clf, 'probability', False) and len(clf.probA_) > 0:
+        arrays[prefix + 'prob_a'] = np.asarray(clf.probA_, dtype=np.float64)
+        arrays[prefix + 'prob_b'] = np.asarray(clf.probB_, dtype=np.float64)
+    return model
+
+
+# Flattens decision trees into one set of node arrays. Leaves point to themselves, so every sample can take the
+# same number of steps down its tree
+def _compile_trees(trees: list, arrays: dict, prefix: str) -> None:
+    left, right, feature, threshold, value, roots = [], [], [], [], [], []
+    offset, depth = 0, 0
+    for tree in trees:
+        nodes = tree.tree_
+        index = np.arange(nodes.node_count)
+        leaf = nodes.children_left == -1
+        roots.append(offset)
+        left.append(np.where(leaf, index, nodes.children_left) + offset)
+        right.append(np.where(leaf, index, nodes.children_right) + offset)
+        feature.append(np.where(leaf, 0, nodes.feature))
+        threshold.append(np.where(leaf, 0, nodes.threshold))
+        # Class fractions of each leaf, which is what the tree's predict_proba returns. scikit-learn before 1.4 stores
+        # weighted sample counts here instead, so every row is normalised
+        counts = nodes.value[:, 0, :]
+        value.append(counts / counts.sum(axis=1, keepdims=True))
+        offset += nodes.node_count
+        depth = max(depth, nodes.max_depth)
+    arrays[prefix + 'left'] = np.concatenate(left).astype(np.intp)
+    arrays[prefix + 'right'] = np.concatenate(right).astype(np.intp)
+    arrays[prefix + 'feature'] = np.concatenate(feature).astype(np.intp)
+    arrays[prefix + 'threshold'] = np.concatenate(threshold).astype(np.float64)
+    arrays[prefix + 'value'] = np.concatenate(value).astype(np.float64)
+    arrays[prefix + 'roots'] = np.asarray(roots, dtype=np.intp)
+    arrays[prefix + 'depth'] = np.asarray(depth)
+
+
+def _build(model: dict, arrays: dict, prefix: str):
+    get = lambda name: arrays.get(prefix + name)
+    if model['kind'] == 'svm':
+        return SVMPredictor(model, get)
+    if model['kind'] == 'forest':
+        return ForestPredictor(model, get)
+    if model['kind'] == 'adaboost':
+        return AdaBoostPredictor(model, get)
+    if model['kind'] == 'voting':
+        members = [_build(member, arrays, f'{prefix}{i}/') for i, member in enumerate(model['members'])]
+        return VotingPredictor(model, get, members)
+    raise ValueError(f"Unknown compiled model kind '{model['kind']}'")
+
+
+# Binary SVC. Probabilities are Platt-scaled decision values, coupled as libsvm does
+class SVMPredictor:
+    def __init__(self, model: dict, get) -> None:
+        self.n_features = model['n_features']
+        self.kernel = model['kernel']
+        self.gamma = model['gamma']
+        self.coef0 = model['coef0']
+        self.degree = model['degree']
+        self.classes = get('classes')
+        self.support_vectors = get('support_vectors')
+        self.dual_coef = get('dual_coef')
+        self.intercept = get('intercept')
+        self.prob_a = get('prob_a')
+        self.prob_b = get('prob_b')
+
+    def decision_function(self, X: np.ndarray) -> np.ndarray:
+        return self._kernel(X) @ self.dual_coef + self.intercept[0]
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.classes[(self.decision_function(X) >= 0).astype(np.intp)]
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        if self.prob_a is None:
+            raise AttributeError("The SVC was trained without probability=True")
+        # libsvm's decision values have the opposite sign to scikit-learn's
+        f = -self.decision_function(X) * self.prob_a[0] + self.prob_b[0]
+        with np.errstate(over='ignore'):
+            r = np.where(f >= 0, np.exp(-f) / (1.0 + np.exp(-f)), 1.0 / (1 + np.exp(f)))
+        r = np.minimum(np.maximum(r, 1e-7), 1 - 1e-7)
+        return _couple_binary(r)
+
+    def _kernel(self, X: np.ndarray) -> np.ndarray:
+        if self.kernel == 'rbf':
+            # Differences are taken before squaring, as libsvm does, since the features' scales vary widely
+            squared = np.zeros((len(X), len(self.support_vectors)))
+            for j in range(X.shape[1]):
+                difference = X[:, j, None] - self.support_vectors[:, j]
+                squared += difference * difference
+            return np.exp(-self.gamma * squared)
+        dot = X @ self.support_vectors.T
+        if self.kernel == 'linear':
+            return dot
+        if self.kernel == 'poly':
+            return (self.gamma * dot + self.coef0) ** self.degree
+        return np.tanh(self.gamma * dot + self.coef0)
+
+
+# libsvm's multiclass_probability for two classes, vectorised over samples. The pairwise probabilities are coupled
+# by iterating to a tolerance rather than used directly, so the same iteration is repeated here
+def _couple_binary(r01: np.ndarray) -> np.ndarray:
+    r10 = 1 - r01
+    Q = [[r10 * r10, -r10 * r01], [-r10 * r01, r01 * r01]]
+    p = [np.full(len(r01), 0.5), np.full(len(r01), 0.5)]
+    active = np.ones(len(r01), dtype=bool)
+    for _ in range(100):
+        Qp = [Q[t][0] * p[0] + Q[t][1] * p[1] for t in range(2)]
+        pQp = p[0] * Qp[0] + p[1] * Qp[1]
+        # Samples stop updating once they have converged
+        active &= np.maximum(np.abs(Qp[0] - pQp), np.abs(Qp[1] - pQp)) >= 0.005 / 2
+        if not active.any():
+            break
+        for t in range(2):
+            diff = np.where(active, (-Qp[t] + pQp) / Q[t][t], 0.0)
+            p[t] = p[t] + diff
+            pQp = (pQp + diff * (diff * Q[t][t] + 2 * Qp[t])) / (1 + diff) / (1 + diff)
+            for j in range(2):
+                Qp[j] = (Qp[j] + diff * Q[t][j]) / (1 + diff)
+                p[j] = p[j] / (1 + diff)
+    return np.stack(p, axis=1)
+
+
+# Decision trees flattened into node arrays, all walked together one level at a time
+class TreePredictor:
+    def __init__(self, model: dict, get) -> None:
+        self.n_features = model['n_features']
+        self.classes = get('classes')
+        self.feature = get('feature')
+        self.threshold = get('threshold')
+        self.value = get('value')
+        self.roots = get('roots')
+        self.depth = int(get('depth'))
+        # Right and left children interleaved, so a node's next node is children[2 * node + go_left]
+        self.children = np.stack([get('right'), get('left')], axis=1).ravel()
+
+    # Class fractions of the leaf each sample reaches in each tree, shaped (trees, samples, classes)
+    def leaf_values(self, X: np.ndarray) -> np.ndarray:
+        # Trees compare features as float32, as scikit-learn does
+        X = np.asarray(X, dtype=np.float32)
+        flat = X.ravel()
+        offsets = np.arange(len(X)) * X.shape[1]
+        nodes = np.repeat(self.roots[:, None], len(X), axis=1)
+        for _ in range(self.depth):
+            go_left = flat.take(offsets + self.feature.take(nodes)) <= self.threshold.take(nodes)
+            nodes = self.children.take(2 * nodes + go_left)
+        return self.value.take(nodes, axis=0)
+
+
+class ForestPredictor(TreePredictor):
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        return self.leaf_values(X).sum(axis=0) / len(self.roots)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.classes[np.argmax(self.predict_proba(X), axis=1)]
+
+
+# SAMME: each tree votes for its predicted class with its weight
+class AdaBoostPredictor(TreePredictor):
+    def __init__(self, model: dict, get) -> None:
+        super().__init__(model, get)
+        self.estimator_weights = get('estimator_weights')
+
+    def decision_function(self, X: np.ndarray) -> np.ndarray:
+        n_classes = len(self.classes)
+        predicted = np.argmax(self.leaf_values(X), axis=2)
+        weights = self.estimator_weights[:len(self.roots), None, None]
+        votes = np.where(predicted[:, :, None] == np.arange(n_classes), weights, -1 / (n_classes - 1) * weights)
+        decision = votes.sum(axis=0) / self.estimator_weights.sum()
+        if n_classes == 2:
+            decision[:, 0] *= -1
+            return decision.sum(axis=1)
+        return decision
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        decision = self.decision_function(X)
+        if len(self.classes) == 2:
+            decision = np.vstack([-decision, decision]).T / 2
+        else:
+            decision /= len(self.classes) - 1
+        decision -= decision.max(axis=1, keepdims=True)
+        np.exp(decision, out=decision)
+        decision /= decision.sum(axis=1, keepdims=True)
+        return decision
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        decision = self.decision_function(X)
+        if len(self.classes) == 2:
+            return self.classes[(decision > 0).astype(np.intp)]
+        return self.classes[np.argmax(decision, axis=1)]
+
+
+# Soft voting: the (weighted) mean of the members' probabilities
+class VotingPredictor:
+    def __init__(self, model: dict, get, members: list) -> None:
+        self.n_features = model['n_features']
+        self.classes = get('classes')
+        self.weights = get('weights')
+        self.members = members
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        return np.average(np.asarray([member.predict_proba(X) for member in self.members]), axis=0, weights=self.weights)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.classes[np.argmax(self.predict_proba(X), axis=1)]
@@ -0,0 +1,167 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score
+from sklearn.metrics.pairwise import pairwise_kernels
+from sklearn.model_selection import StratifiedKFold
+from sklearn.svm import SVC
+
+
+# In-memory cache of the work cross-validation repeats between calls on the same dataset: the fold indices and,
+# for SVMs, the kernel matrix over every sample. Entries are keyed by a hash of the dataset, and the least recently
+# used are evicted once the cache holds more than max_bytes
+# Kernel matrices depend only on the kernel and its parameters, so a sweep over C computes each one once
+class CrossValidationCache:
+    def __init__(self, max_bytes=128 * 2**20) -> None:
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    # Returns the (train, test) indices of cv stratified folds, the same folds cross_val_score uses
+    def folds(self, key: str, y: np.ndarray, cv: int) -> list:
+        return self._get(('folds', key, cv), lambda: list(StratifiedKFold(cv).split(np.zeros(len(y)), y)))
+
+    # Returns the kernel matrix an SVC would use when trained on X[train], over every sample of X
+    # gamma='scale' depends on the training samples, so it is resolved first and each value has its own matrix
+    def kernel(self, key: str, X: np.ndarray, train: np.ndarray, svc: SVC) -> np.ndarray:
+        params = kernel_params(svc, X[train])
+        return self._get(('kernel', key, svc.kernel, tuple(sorted(params.items()))),
+                lambda: pairwise_kernels(X, metric=svc.kernel, **params))
+
+    # Returns hit, miss and eviction counts and the current size of the cache
+    def get_stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else None,
+                'evictions': self.evictions,
+                'bytes': self.size,
+            }
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def _get(self, key: tuple, compute):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+        # Computed outside the lock so folds waiting on other entries are not held up
+        value = compute()
+        with self.lock:
+            if key not in self.entries:
+                self.entries[key] = value
+                self.size += _nbytes(value)
+            while self.size > self.max_bytes and len(self.entries) > 1:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= _nbytes(evicted)
+                self.evictions += 1
+        return value
+
+
+# Hash of a dataset's values and labels
+def dataset_hash(X: np.ndarray, y: np.ndarray) -> str:
+    digest = hashlib.sha256()
+    for values in (np.ascontiguousarray(X), np.ascontiguousarray(y)):
+        digest.update(repr((values.dtype.str, values.shape)).encode())
+        digest.update(values.tobytes())
+    return digest.hexdigest()
+
+
+# Whether an estimator is an SVC whose kernel can be precomputed
+def uses_kernel(estimator) -> bool:
+    return type(estimator) is SVC and estimator.kernel in ('linear', 'poly', 'rbf', 'sigmoid')
+
+
+# The parameters of an SVC's kernel as pairwise_kernels takes them, with gamma resolved as SVC.fit does
+def kernel_params(svc: SVC, X_train: np.ndarray) -> dict:
+    if svc.kernel == 'linear':
+        return {}
+    if svc.gamma == 'scale':
+        variance = X_train.var()
+        gamma = 1.0 / (X_train.shape[1] * variance) if variance != 0 else 1.0
+    elif svc.gamma == 'auto':
+        gamma = 1.0 / X_train.shape[1]
+    else:
+        gamma = svc.gamma
+    params = {'gamma': float(gamma)}
+    if svc.kernel in ('poly', 'sigmoid'):
+        params['coef0'] = svc.coef0
+    if svc.kernel == 'poly':
+        params['degree'] = svc.degree
+    return params
+
+
+# Scores an estimator on one fold, returning its accuracy and how long fitting and scoring took
+# SVCs with a built-in kernel are fitted on slices of the cached kernel matrix instead of the features. Their
+# predictions are the same, and probability estimates are skipped since accuracy does not need them
+def score_fold(estimator, X: np.ndarray, y: np.ndarray, train: np.ndarray, test: np.ndarray, cache=None, key=None) -> dict:
+    start = time.perf_counter()
+    if cache is not None and uses_kernel(estimator):
+        kernel = cache.kernel(key or dataset_hash(X, y), X, train, estimator)
+        model = clone(estimator).set_params(kernel='precomputed', probability=False)
+        X_train, X_test = kernel[np.ix_(train, train)], kernel[np.ix_(test, train)]
+    else:
+        model = clone(estimator)
+        X_train, X_test = X[train], X[test]
+    model.fit(X_train, y[train])
+    fitted = time.perf_counter()
+    score = accuracy_score(y[test], model.predict(X_test))
+    return {'score': score, 'fit_seconds': fitted - start, 'score_seconds': time.perf_counter() - fitted}
+
+
+# Cross-validates an estimator on cv stratified folds, scoring accuracy as cross_val_score does
+# Folds are scored in parallel on a thread pool (fitting releases the GIL), and fold indices and SVM kernels are
+# cached between calls. Returns the mean score and each fold's score and timings
+def cross_validate(estimator, X, y, cv=10, workers=None, cache=None) -> dict:
+    if cache is None:
+        cache = cross_validation_cache
+    X, y = np.asarray(X), np.asarray(y)
+    key = dataset_hash(X, y)
+    folds = cache.folds(key, y, cv)
+
+    start = time.perf_counter()
+    run = lambda fold: score_fold(estimator, X, y, fold[0], fold[1], cache, key)
+    workers = min(workers or os.cpu_count(), cv)
+    if workers == 1:
+        results = list(map(run, folds))
+    else:
+        with ThreadPoolExecutor(workers) as executor:
+            results = list(executor.map(run, folds))
+
+    scores = [result['score'] for result in results]
+    return {
+        'mean_score': float(np.mean(scores)),
+        'scores': scores,
+        'fit_seconds': [result['fit_seconds'] for result in results],
+        'score_seconds': [result['score_seconds'] for result in results],
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def _nbytes(value) -> int:
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (list, tuple)):
+        return sum(_nbytes(item) for item in value)
+    return 0
+
+
+# Shared by every classifier in the process
+cross_validation_cache = CrossValidationCache()
@@ -0,0 +1,117 @@
+import hashlib
+import inspect
+import json
+import os
+import threading
+
+
+# Persistent cache of extracted features, stored as one JSON file per recording
+# Entries are keyed by a hash of the recording's samples together with the extractor's source code and analysis
+# parameters, so changing either produces new keys and old entries are never read again. Once the cache grows
+# past max_bytes, the least recently used entries are evicted
+class FeatureCache:
+    def __init__(self, directory='cache/features', max_bytes=64 * 2**20) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        self.size = sum(entry.stat().st_size for entry in self._entries())
+
+    # Returns the cache key for the recording held by a FeatureExtractor
+    def key(self, feature_extractor) -> str:
+        digest = hashlib.sha256()
+        digest.update(extractor_version(type(feature_extractor)).encode())
+        digest.update(repr(analysis_params(feature_extractor)).encode())
+        digest.update(repr(feature_extractor.sound.sampling_frequency).encode())
+        digest.update(feature_extractor.sound.values.tobytes())
+        return digest.hexdigest()
+
+    # Returns the cached features for a key, or None
+    def get(self, key: str) -> dict:
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                features = json.load(f)
+            # Mark as recently used
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            with self.lock:
+                self.misses += 1
+            return None
+        with self.lock:
+            self.hits += 1
+        return features
+
+    # Stores features for a key, evicting the least recently used entries if the cache is over its size limit
+    def put(self, key: str, features: dict) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(features, f)
+        with self.lock:
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(temp_path, path)
+            self.size += os.path.getsize(path) - previous
+            if self.size > self.max_bytes:
+                self._evict()
+
+    # Returns hit, miss and eviction counts and the current size of the cache
+    def get_stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else None,
+                'evictions': self.evictions,
+                'bytes': self.size,
+            }
+
+    # Removes the oldest entries until the cache is back under 90% of its limit
+    def _evict(self) -> None:
+        entries = sorted(self._entries(), key=lambda entry: entry.stat().st_mtime_ns)
+        self.size = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if self.size <= 0.9 * self.max_bytes:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+            self.size -= size
+            self.evictions += 1
+
+    def _entries(self) -> list:
+        if not os.path.isdir(self.directory):
+            return []
+        return [entry for entry in os.scandir(self.directory) if entry.name.endswith('.json')]
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + '.json')
+
+
+# Hash of the source code of an extractor class and the module it lives in, so any code change invalidates the cache
+def extractor_version(extractor_class) -> str:
+    if extractor_class not in _versions:
+        source = inspect.getsource(inspect.getmodule(extractor_class))
+        _versions[extractor_class] = hashlib.sha256(source.encode()).hexdigest()
+    return _versions[extractor_class]
+
+_versions = {}
+
+
+# Analysis parameters that change the features of a recording
+def analysis_params(feature_extractor) -> tuple:
+    return (
+        tuple(feature_extractor.voice_report_params),
+        feature_extractor.embedding_dimension,
+        feature_extractor.embedding_delay,
+    )
+
+
+# Shared by every page and Streamlit session in the process
+feature_cache = FeatureCache()
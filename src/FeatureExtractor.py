@@ -1,5 +1,42 @@
+import numpy as np
 import pandas as pd
 import parselmouth as pm
+from scipy.spatial import cKDTree
+
+from src.Instrumentation import instrumentation
+
+
+# Time-delay embedding of a signal: row i is [x[i], x[i + delay], ..., x[i + (dimension - 1) * delay]]
+# Returned as a strided view, so no samples are copied
+def embed(samples: np.ndarray, dimension: int, delay: int) -> np.ndarray:
+    window = (dimension - 1) * delay + 1
+    return np.lib.stride_tricks.sliding_window_view(samples, window)[:, ::delay]
+
+
+# Residual of a series after removing its linear prediction from the previous `order` values
+# The predictor is fitted to the whole series at once by least squares
+def whiten(series: np.ndarray, order=2) -> np.ndarray:
+    lagged = np.column_stack([series[order - k - 1:len(series) - k - 1] for k in range(order)] + [np.ones(len(series) - order)])
+    coefficients = np.linalg.lstsq(lagged, series[order:], rcond=None)[0]
+    return series[order:] - lagged @ coefficients
+
+
+# Converts raw PCM samples, shaped (frames,) or (frames, channels), to a Praat Sound
+# Integer samples are scaled from their sample_width (in bytes, taken from the dtype if not given) to [-1, 1]
+# Floating point samples are used as they are
+def pcm_to_sound(samples: np.ndarray, sample_rate: float, sample_width=None) -> pm.Sound:
+    samples = np.asarray(samples)
+    if np.issubdtype(samples.dtype, np.integer):
+        sample_width = sample_width or samples.dtype.itemsize
+        values = samples.astype(np.float64)
+        values /= 2 ** (8 * sample_width - 1)
+    else:
+        values = samples.astype(np.float64, copy=False)
+    if values.ndim == 1:
+        values = values[np.newaxis, :]
+    else:
+        values = values.T
+    return pm.Sound(values, sampling_frequency=sample_rate)
 
 
 class FeatureExtractor:
@@ -7,16 +44,174 @@ class FeatureExtractor:
         ['Mean pitch','Maximum pitch','Minimum pitch','Jitter (local)','Jitter (local, absolute)','Jitter (rap)','Jitter (ppq5)','Jitter (ddp)','Shimmer (local)','Shimmer (local, dB)','Shimmer (apq3)','Shimmer (apq5)','Shimmer (apq11)','Shimmer (dda)','Mean noise-to-harmonics ratio','Mean harmonics-to-noise ratio'],
         ["MDVP:Fo(Hz)","MDVP:Fhi(Hz)","MDVP:Flo(Hz)","MDVP:Jitter(%)","MDVP:Jitter(Abs)","MDVP:RAP","MDVP:PPQ","Jitter:DDP","MDVP:Shimmer","MDVP:Shimmer(dB)","Shimmer:APQ3","Shimmer:APQ5","MDVP:APQ","Shimmer:DDA","NHR","HNR"], 
     ))
+    # Arguments to Praat's "Voice report": time range, pitch floor and ceiling (Hz), maximum period factor,
+    # maximum amplitude factor, silence threshold and voicing threshold
+    voice_report_params = (2, 0, 75, 500, 1.3, 1.6, 0.03, 0.45)
+    # Voice report measures and the queries that calculate them, on the PointProcess for jitter
+    # and on the AmplitudeTier of peak amplitudes per period for shimmer
+    jitter_measures = {
+        'Jitter (local)': 'Get jitter (local)',
+        'Jitter (local, absolute)': 'Get jitter (local, absolute)',
+        'Jitter (rap)': 'Get jitter (rap)',
+        'Jitter (ppq5)': 'Get jitter (ppq5)',
+        'Jitter (ddp)': 'Get jitter (ddp)',
+    }
+    shimmer_measures = {
+        'Shimmer (local)': 'Get shimmer (local)',
+        'Shimmer (local, dB)': 'Get shimmer (local_dB)',
+        'Shimmer (apq3)': 'Get shimmer (apq3)',
+        'Shimmer (apq5)': 'Get shimmer (apq5)',
+        'Shimmer (apq11)': 'Get shimmer (apq11)',
+        'Shimmer (dda)': 'Get shimmer (dda)',
+    }
     dataset_labels = ["MDVP:Fo(Hz)","MDVP:Fhi(Hz)","MDVP:Flo(Hz)","MDVP:Jitter(%)","MDVP:Jitter(Abs)","MDVP:RAP","MDVP:PPQ","Jitter:DDP","MDVP:Shimmer","MDVP:Shimmer(dB)","Shimmer:APQ3","Shimmer:APQ5","MDVP:APQ","Shimmer:DDA","NHR","HNR","RPDE","DFA","spread1","spread2","D2","PPE"]
 
-    def __init__(self, sound_data) -> None:
+    # Analysis steps: the method that runs each one and the steps it builds on
+    # Each step runs at most once per recording, the first time it or a step depending on it is needed
+    analysis_steps = {
+        'pitch': ('extract_pitch', []),
+        'pulses': ('extract_pulses', ['pitch']),
+        'voice_measures': ('extract_voice_measures', ['pitch', 'pulses']),
+        'pitch_contour': ('extract_pitch_contour', ['pitch']),
+        'periods': ('extract_periods', ['pulses']),
+        'embedding': ('extract_embedding', []),
+        'RPDE': ('calculate_rpde', ['embedding']),
+        'DFA': ('calculate_dfa', []),
+        'D2': ('calculate_d2', ['embedding']),
+        'PPE': ('calculate_ppe', ['periods']),
+        'spread1': ('calculate_spread1', ['pitch_contour']),
+        'spread2': ('calculate_spread2', ['pitch_contour']),
+    }
+    # Features calculated by their own analysis step. Every other feature is a voice report measure
+    nonlinear_labels = ['RPDE', 'DFA', 'spread1', 'spread2', 'D2', 'PPE']
+    # Time-delay embedding shared by RPDE and D2 (Little et al. 2007): dimension, and delay in seconds
+    embedding_dimension = 4
+    embedding_delay = 35 / 25000
+
+    # By default every feature is extracted straight away
+    # With lazy=True, nothing is analysed until a feature is requested, and only the steps it needs are run
+    # With a FeatureCache, features already extracted from the same recording are read back instead of recomputed,
+    # and newly extracted features are written to it
+    # sound_data is a file path or anything parselmouth accepts. With a sample_rate, it is a raw PCM array instead
+    def __init__(self, sound_data, lazy=False, cache=None, sample_rate=None, sample_width=None) -> None:
         self.features = {}
+        self.analysis = {}
+        if sample_rate is None:
+            self.sound = pm.Sound(sound_data)
+        else:
+            self.sound = pcm_to_sound(sound_data, sample_rate, sample_width)
+        self.cache = cache
+        self.cache_key = None
+
+        if cache is not None:
+            self.cache_key = cache.key(self)
+            self.features.update(cache.get(self.cache_key) or {})
+
+        if not lazy:
+            self.extract_all()
+
+    # Runs an analysis step, and the steps it depends on, unless it has already run
+    def analyse(self, step: str):
+        if step not in self.analysis:
+            method, dependencies = self.analysis_steps[step]
+            for dependency in dependencies:
+                self.analyse(dependency)
+            # Timed once its dependencies have run, so each step is timed on its own
+            with instrumentation.timer('FeatureExtractor.' + step):
+                self.analysis[step] = getattr(self, method)()
+        return self.analysis[step]
+
+    # Extracts the voice report measures and every nonlinear feature
+    def extract_all(self) -> None:
+        self.extract_features(self.dataset_labels)
+
+    # Makes sure the given features have been extracted
+    def extract_features(self, labels) -> None:
+        extracted = len(self.features)
+        for label in labels:
+            if label in self.features:
+                continue
+            if label in self.nonlinear_labels:
+                self.features[label] = self.analyse(label)
+            else:
+                self.analyse('voice_measures')
+        if self.cache is not None and len(self.features) > extracted:
+            self.cache.put(self.cache_key, self.features)
+
+    @property
+    def pitch(self):
+        return self.analyse('pitch')
+
+    @property
+    def pulses(self):
+        return self.analyse('pulses')
+
+    @property
+    def pitch_contour(self) -> np.ndarray:
+        return self.analyse('pitch_contour')
+
+    @property
+    def periods(self) -> np.ndarray:
+        return self.analyse('periods')
+
+    def extract_pitch(self):
+        return self.sound.to_pitch()
+
+    def extract_pulses(self):
+        return pm.praat.call([self.sound, self.pitch], "To PointProcess (cc)")
 
-        # Generate voice report as string
-        sound = pm.Sound(sound_data)
-        pitch = sound.to_pitch()
-        pulses = pm.praat.call([sound, pitch], "To PointProcess (cc)")
-        voice_report = pm.praat.call([sound, pitch, pulses], "Voice report", 2,0,75,500,1.3,1.6,0.03,0.45)
+    # Calculates the voice report measures used as features straight from the Pitch and PointProcess,
+    # adding them to the features and returning them as a dictionary. Undefined measures are None
+    def extract_voice_measures(self) -> dict:
+        start, end, floor, ceiling, period_factor, amplitude_factor = self.voice_report_params[:6]
+        # Periods the voice report accepts as voiced
+        shortest_period, longest_period = 0.8 / ceiling, 1.25 / floor
+
+        measures = {
+            'Mean pitch': pm.praat.call(self.pitch, "Get mean", start, end, "Hertz"),
+            'Maximum pitch': pm.praat.call(self.pitch, "Get maximum", start, end, "Hertz", "Parabolic"),
+            'Minimum pitch': pm.praat.call(self.pitch, "Get minimum", start, end, "Hertz", "Parabolic"),
+        }
+        for name, command in self.jitter_measures.items():
+            measures[name] = pm.praat.call(self.pulses, command, start, end, shortest_period, longest_period, period_factor)
+        # Amplitudes are measured once for every shimmer measure, instead of once per query
+        # Praat refuses to measure them with too few pulses, in which case shimmer is undefined
+        try:
+            amplitudes = pm.praat.call([self.sound, self.pulses], "To AmplitudeTier (period)", start, end, shortest_period, longest_period, period_factor)
+            for name, command in self.shimmer_measures.items():
+                measures[name] = pm.praat.call(amplitudes, command, shortest_period, longest_period, amplitude_factor)
+        except pm.PraatError:
+            pass
+
+        # Harmonicity of the voiced frames, from the strength of the pitch candidates
+        strengths = self.get_voiced_strengths(start, end)
+        if len(strengths) > 0:
+            measures['Mean noise-to-harmonics ratio'] = np.mean((1 - strengths) / strengths)
+            measures['Mean harmonics-to-noise ratio'] = np.mean(10 * np.log10(strengths / (1 - strengths)))
+
+        voice_measures = {key: None if measures.get(key) is None or np.isnan(measures[key]) else float(measures[key])
+            for key in self.praat_dataset_labels}
+        # Features can be identified using either naming convention
+        for key, value in self.praat_dataset_labels.items():
+            voice_measures[value] = voice_measures[key]
+
+        self.features.update(voice_measures)
+        return voice_measures
+
+    # Strength of the pitch candidate in every voiced frame between start and end (the whole sound if end <= start),
+    # clipped the way Praat clips it before converting to a harmonicity ratio
+    def get_voiced_strengths(self, start: float, end: float) -> np.ndarray:
+        frames = self.pitch.selected_array
+        voiced = frames['frequency'] > 0
+        if end > start:
+            times = self.pitch.xs()
+            voiced &= (times >= start) & (times <= end)
+        return np.clip(frames['strength'][voiced], 1e-15, 1 - 1e-15)
+
+    # Generates the voice report text and parses every value in it, adding them to the features and returning them
+    # as a dictionary. The values are rounded as printed by Praat. Kept as the reference for extract_voice_measures
+    def extract_voice_report(self) -> dict:
+        voice_report = pm.praat.call([self.sound, self.pitch, self.pulses], "Voice report", *self.voice_report_params)
 
         # Parse voice report as a dictionary
         voice_report_dict = dict(item.strip().split(": ") for item in voice_report.split("\n")[1:] if ": " in item)
@@ -44,45 +239,187 @@ class FeatureExtractor:
         for key, value in self.praat_dataset_labels.items():
             voice_report_dict[value] = voice_report_dict[key]
 
-        voice_report_dict['RPDE'] = self.calculate_rpde()
-        voice_report_dict['DFA'] = self.calculate_dfa()
-        voice_report_dict['spread1'] = self.calculate_spread1()
-        voice_report_dict['spread2'] = self.calculate_spread2()
-        voice_report_dict['D2'] = self.calculate_d2()
-        voice_report_dict['PPE'] = self.calculate_ppe()
+        self.features.update(voice_report_dict)
+        return voice_report_dict
+
+    # Returns the samples of the sound as a mono signal
+    def get_samples(self) -> np.ndarray:
+        values = self.sound.values
+        return values[0] if values.shape[0] == 1 else values.mean(axis=0)
+
+    # Shared embedding of the peak-normalised signal, or None for a silent recording
+    def extract_embedding(self) -> np.ndarray:
+        return self.get_embedding(self.embedding_dimension, self.embedding_delay)
 
-        self.features = voice_report_dict
+    # Time-delay embedding of the peak-normalised signal, with the delay in seconds
+    # The shared embedding is reused when the default dimension and delay are asked for
+    def get_embedding(self, dimension: int, delay: float) -> np.ndarray:
+        if (dimension, delay) == (self.embedding_dimension, self.embedding_delay) and 'embedding' in self.analysis:
+            return self.analysis['embedding']
+        samples = self.get_samples()
+        peak = np.abs(samples).max()
+        if peak == 0:
+            return None
+        delay = max(1, round(delay * self.sound.sampling_frequency))
+        return embed((samples / peak).astype(np.float32), dimension, delay)
 
-    def calculate_rpde(self) -> float:
-        return None
+    # Recurrence period density entropy (Little et al. 2007)
+    # The signal is embedded in `dimension` dimensions, and for each reference point the first time the trajectory
+    # returns to within `radius` of it, after leaving, is its recurrence period. RPDE is the entropy of the period
+    # histogram, normalised to [0, 1]. Delay and maximum period are in seconds so they scale with the sample rate.
+    # Recurrences are searched for every reference point at once, a block of lags at a time, and points drop out
+    # of the search once their period is found. max_points reference points are spread evenly across the signal
+    def calculate_rpde(self, dimension=embedding_dimension, delay=embedding_delay, radius=0.12, max_period=1000/25000, max_points=5000, block=64) -> float:
+        points = self.get_embedding(dimension, delay)
+        max_period = round(max_period * self.sound.sampling_frequency)
+        if points is None or len(points) <= max_period:
+            return None
 
-    def calculate_dfa(self) -> float:
-        return None
+        n = len(points) - max_period
+        references = np.linspace(0, n - 1, min(max_points, n)).astype(int)
+        periods = np.zeros(len(references), dtype=int)
+        has_left = np.zeros(len(references), dtype=bool)
+        active = np.arange(len(references))
 
+        for start in range(1, max_period + 1, block):
+            lags = np.arange(start, min(start + block, max_period + 1))
+            origins = references[active]
+            distances = ((points[origins[:, None] + lags] - points[origins][:, None, :]) ** 2).sum(axis=-1)
+            inside = distances < radius ** 2
+            # A return only counts once the trajectory has been outside the radius at an earlier lag
+            outside = np.logical_or.accumulate(~inside, axis=1)
+            left_before = np.concatenate([has_left[active, None], outside[:, :-1] | has_left[active, None]], axis=1)
+            returned = inside & left_before
+            found = returned.any(axis=1)
+            periods[active[found]] = lags[returned[found].argmax(axis=1)]
+            has_left[active] |= outside[:, -1]
+            active = active[~found]
+            if len(active) == 0:
+                break
+
+        counts = np.bincount(periods[periods > 0], minlength=max_period + 1)[1:]
+        if counts.sum() == 0:
+            return None
+        density = counts[counts > 0] / counts.sum()
+        return float(-(density * np.log(density)).sum() / np.log(max_period))
+
+    # Detrended fluctuation analysis (Little et al. 2007)
+    # The mean-removed signal is integrated, split into non-overlapping windows of each scale, and a straight line is
+    # removed from every window by least squares. The slope of log fluctuation against log scale is the scaling
+    # exponent, returned through a logistic function as in the reference dataset. Scales are in seconds and spaced
+    # logarithmically; a list of scales in seconds can also be given
+    def calculate_dfa(self, min_scale=50/25000, max_scale=100/25000, n_scales=10, scales=None) -> float:
+        samples = self.get_samples()
+        if scales is None:
+            scales = np.geomspace(min_scale, max_scale, n_scales)
+        scales = np.unique(np.round(np.asarray(scales) * self.sound.sampling_frequency).astype(int))
+        scales = scales[(scales >= 3) & (scales <= len(samples) // 2)]
+        if len(scales) < 2:
+            return None
+
+        profile = np.cumsum(samples - samples.mean())
+        fluctuations = np.array([self._fluctuation(profile, scale) for scale in scales])
+        if (fluctuations == 0).any():
+            return None
+        alpha = np.polyfit(np.log(scales), np.log(fluctuations), 1)[0]
+        return float(1 / (1 + np.exp(-alpha)))
+
+    # Root mean square residual of the profile around a linear fit in each window of the given length
+    # Every window is detrended at once: the residual energy of a least squares line has a closed form
+    def _fluctuation(self, profile: np.ndarray, scale: int) -> float:
+        n_windows = len(profile) // scale
+        windows = profile[:n_windows * scale].reshape(n_windows, scale)
+        windows = windows - windows.mean(axis=1, keepdims=True)
+        t = np.arange(scale) - (scale - 1) / 2
+        residual_energy = (windows ** 2).sum(axis=1) - (windows @ t) ** 2 / (t @ t)
+        return np.sqrt(residual_energy.sum() / (n_windows * scale))
+
+    # Frequencies (Hz) of the voiced frames of the pitch object
+    def extract_pitch_contour(self) -> np.ndarray:
+        frequency = self.pitch.selected_array['frequency']
+        return frequency[frequency > 0]
+
+    # Lengths (s) of the glottal cycles marked by the PointProcess. Gaps between voiced stretches are left out
+    def extract_periods(self) -> np.ndarray:
+        if pm.praat.call(self.pulses, "Get number of points") < 2:
+            return np.array([])
+        times = pm.praat.call(self.pulses, "To Matrix").values[0]
+        periods = np.diff(times)
+        pitch_floor, pitch_ceiling = self.voice_report_params[2:4]
+        return periods[(periods >= 1 / pitch_ceiling) & (periods <= 1 / pitch_floor)]
+
+    # Log of the spread of the pitch contour once its predictable (autoregressive) part is removed,
+    # i.e. the size of the unpredictable frame-to-frame pitch variation
     def calculate_spread1(self) -> float:
-        return None
+        if len(self.pitch_contour) < 10:
+            return None
+        residual = whiten(np.log(self.pitch_contour))
+        return float(np.log(residual.std()))
 
+    # Spread of the pitch contour on a log frequency scale, i.e. the overall pitch variation
     def calculate_spread2(self) -> float:
-        return None
+        if len(self.pitch_contour) < 10:
+            return None
+        return float(np.log(self.pitch_contour).std())
+
+    # Correlation dimension (Grassberger-Procaccia) of the time-delay embedded signal
+    # Rather than all O(N^2) pairwise distances, up to max_points embedded points are sampled at random and put in a
+    # KD-tree, and a single dual-tree pass counts the neighbours of n_references of them at every radius.
+    # D2 is the slope of log correlation sum against log radius where the correlation sum lies between
+    # min_correlation and max_correlation. Raising max_points and n_references trades speed for accuracy
+    def calculate_d2(self, dimension=embedding_dimension, delay=embedding_delay, max_points=20000, n_references=1000, n_radii=20,
+            min_correlation=1e-3, max_correlation=1e-1, seed=0) -> float:
+        embedded = self.get_embedding(dimension, delay)
+        if embedded is None or len(embedded) < 2:
+            return None
+
+        rng = np.random.default_rng(seed)
+        points = embedded[np.sort(rng.choice(len(embedded), min(max_points, len(embedded)), replace=False))]
+        references = points[rng.choice(len(points), min(n_references, len(points)), replace=False)]
+
+        # Radii span from well below to beyond the size of the attractor
+        size = np.sqrt(((points - points.mean(axis=0)) ** 2).sum(axis=1).mean())
+        radii = np.geomspace(size * 1e-3, size * 2, n_radii)
+        # Every reference point is also in the tree, so its match with itself is removed
+        pairs = cKDTree(references).count_neighbors(cKDTree(points), radii) - len(references)
+        correlation = pairs / (len(references) * (len(points) - 1))
 
-    def calculate_d2(self) -> float:
-        return None
+        scaling = (correlation >= min_correlation) & (correlation <= max_correlation)
+        if scaling.sum() < 2:
+            return None
+        return float(np.polyfit(np.log(radii[scaling]), np.log(correlation[scaling]), 1)[0])
 
-    def calculate_ppe(self) -> float:
-        return None
+    # Pitch period entropy (Little et al. 2009)
+    # Cycle-to-cycle pitch in semitones is whitened with a linear predictor, and PPE is the entropy of the residual's
+    # distribution over a fixed grid of bins (bin_width semitones, n_bins bins), normalised to [0, 1]
+    def calculate_ppe(self, bin_width=0.1, n_bins=60) -> float:
+        if len(self.periods) < 10:
+            return None
+        residual = whiten(12 * np.log2(1 / self.periods))
+        edges = (np.arange(n_bins + 1) - n_bins / 2) * bin_width
+        counts = np.histogram(np.clip(residual, edges[0], edges[-1]), edges)[0]
+        density = counts[counts > 0] / counts.sum()
+        return float(-(density * np.log(density)).sum() / np.log(n_bins))
 
     # Returns a dictionary of features
     # If a list of features is passed, return only those features
     # Else return all features
+    # Only the analysis needed for the requested features is run
     def get_features(self, features=None) -> dict:
         if features is None:
+            self.extract_all()
             return self.features
         else:
+            self.extract_features(features)
             return {k: v for k, v in self.features.items() if k in features}
 
     # Returns dict of features present in the dataset
-    def get_dataset_features(self) -> dict:
-        return {k:v for k,v in self.features.items() if k in self.dataset_labels}
+    # If a list of labels is passed, e.g. the features a model was trained on, return only those
+    def get_dataset_features(self, labels=None) -> dict:
+        if labels is None:
+            labels = self.dataset_labels
+        self.extract_features(labels)
+        return {k:v for k,v in self.features.items() if k in self.dataset_labels and k in labels}
 
     # Converts features to dataframe
     def to_dataframe(self, features=None) -> pd.DataFrame:
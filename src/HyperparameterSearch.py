@@ -0,0 +1,300 @@
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import StratifiedKFold
+
+from src.Classifier import SVM, AdaBoost, RandomForest
+from src.CrossValidation import cross_validation_cache, dataset_hash, score_fold
+
+classifiers = {
+    'SVM': SVM,
+    'RandomForest': RandomForest,
+    'AdaBoost': AdaBoost,
+}
+
+# Values tried for each parameter. Random search also accepts scipy.stats distributions
+search_spaces = {
+    'SVM': {
+        'C': [0.1, 1, 10, 100, 1000],
+        'gamma': ['scale', 1e-4, 1e-3, 1e-2, 1e-1],
+        'kernel': ['rbf'],
+    },
+    'RandomForest': {
+        'n_estimators': [50, 100, 200],
+        'max_depth': [None, 5, 10],
+        'min_samples_split': [2, 5],
+        'max_features': ['sqrt', 'log2'],
+    },
+    'AdaBoost': {
+        'n_estimators': [25, 50, 100, 200],
+        'learning_rate': [0.1, 0.5, 1.0],
+    },
+}
+
+
+# Every combination of the values in a search space
+def grid_candidates(space: dict) -> list:
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+# n candidates drawn at random from a search space, without repeats where the space allows
+def random_candidates(space: dict, n: int, seed=0) -> list:
+    rng = np.random.default_rng(seed)
+    candidates = []
+    for _ in range(n * 10):
+        if len(candidates) == n:
+            break
+        candidate = {}
+        for name, values in space.items():
+            if hasattr(values, 'rvs'):
+                candidate[name] = values.rvs(random_state=rng)
+            else:
+                candidate[name] = values[rng.integers(len(values))]
+            if isinstance(candidate[name], np.generic):
+                candidate[name] = candidate[name].item()
+        if candidate not in candidates:
+            candidates.append(candidate)
+    return candidates
+
+
+# Data shared by every evaluation in a worker process, sent once when the worker starts
+# SVM kernels are cached in each worker, so candidates differing only in C reuse them
+_shared = {}
+
+def _init_worker(X: np.ndarray, y: np.ndarray, splits: list) -> None:
+    _shared.update(X=X, y=y, splits=splits, key=dataset_hash(X, y))
+
+
+# Scores a candidate on the given folds, in order. Runs in a worker process, so errors are returned rather than raised
+# Once min_folds have been scored, the candidate is pruned if its mean is more than prune_margin below prune_below
+def evaluate_candidate(classifier_name: str, params: dict, folds: list, prune_below=None, prune_margin=0.05, min_folds=3) -> dict:
+    start = time.perf_counter()
+    result = {'params': params, 'scores': {}, 'pruned': False, 'error': None}
+    try:
+        estimator = classifiers[classifier_name](params).clf
+        # The classifiers fall back to their defaults when given parameters they do not accept
+        accepted = estimator.get_params()
+        rejected = [name for name, value in params.items() if accepted.get(name) != value]
+        if rejected:
+            raise ValueError(f"{classifier_name} did not accept {', '.join(rejected)}")
+
+        X, y, splits = _shared['X'], _shared['y'], _shared['splits']
+        for fold in folds:
+            train, test = splits[fold]
+            result['scores'][fold] = score_fold(estimator, X, y, train, test, cross_validation_cache, _shared['key'])['score']
+            scored = list(result['scores'].values())
+            if prune_below is not None and len(scored) >= min_folds and len(scored) < len(folds) and np.mean(scored) < prune_below - prune_margin:
+                result['pruned'] = True
+                break
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+# Searches the parameters of one of the classifiers by cross-validation, evaluating candidates across a process pool
+# The CV splits are computed once and shared by every candidate, so all candidates are scored on the same folds
+# Candidates falling well behind the best so far are pruned before all their folds are scored
+# The leaderboard is written to disk after every batch of results
+class HyperparameterSearch:
+    def __init__(self, classifier_name: str, X: pd.DataFrame, y: pd.Series, cv=10, workers=None, leaderboard_file=None,
+            prune=True, prune_margin=0.05, seed=0) -> None:
+        self.classifier_name = classifier_name
+        self.X = X
+        self.y = y
+        self.cv = cv
+        self.workers = workers or os.cpu_count()
+        self.leaderboard_file = leaderboard_file or f"results/{classifier_name}.leaderboard.csv"
+        self.prune = prune
+        self.prune_margin = prune_margin
+        self.seed = seed
+        self.splits = list(StratifiedKFold(cv, shuffle=True, random_state=seed).split(X, y))
+        self.results = []
+
+    def grid(self, space=None) -> list:
+        return self.evaluate(grid_candidates(space or search_spaces[self.classifier_name]))
+
+    def random(self, n_iter=20, space=None) -> list:
+        return self.evaluate(random_candidates(space or search_spaces[self.classifier_name], n_iter, self.seed))
+
+    # Successive halving with folds as the budget: every candidate is scored on min_folds folds, then the best
+    # 1/factor of them on factor times as many, and so on until the survivors have been scored on every fold
+    # Scores from earlier rounds are kept, so each round only scores the new folds
+    def successive_halving(self, n_candidates=27, factor=3, min_folds=1, space=None) -> list:
+        candidates = random_candidates(space or search_spaces[self.classifier_name], n_candidates, self.seed)
+        records = [{'params': params, 'scores': {}, 'pruned': False, 'error': None, 'seconds': 0} for params in candidates]
+        alive = list(records)
+        folds = min(min_folds, self.cv)
+        with self._executor() as executor:
+            while True:
+                tasks = [(record['params'], list(range(len(record['scores']), folds)), None) for record in alive]
+                for i, result in self._map(executor, tasks):
+                    alive[i]['scores'].update(result['scores'])
+                    alive[i]['seconds'] += result['seconds']
+                    alive[i]['error'] = result['error']
+                self.results = [self._summarise(record) for record in records]
+                self._write_leaderboard()
+
+                alive = [record for record in alive if record['error'] is None]
+                if folds == self.cv or not alive:
+                    break
+                alive.sort(key=lambda record: np.mean(list(record['scores'].values())), reverse=True)
+                survivors = max(1, len(alive) // factor)
+                for record in alive[survivors:]:
+                    record['pruned'] = True
+                alive = alive[:survivors]
+                folds = self.cv if survivors == 1 else min(folds * factor, self.cv)
+        return self.get_leaderboard()
+
+    # Scores candidates on every fold, pruning them against the best complete score so far
+    def evaluate(self, candidates: list) -> list:
+        folds = list(range(self.cv))
+        self.results = []
+        with self._executor() as executor:
+            tasks = ((params, folds) for params in candidates)
+            for _, result in self._map(executor, tasks, adaptive=True):
+                self.results.append(self._summarise(result))
+                if len(self.results) % max(self.workers, 1) == 0:
+                    self._write_leaderboard()
+        self._write_leaderboard()
+        return self.get_leaderboard()
+
+    # Results ranked by mean score, candidates that failed last
+    def get_leaderboard(self) -> list:
+        ranked = sorted(self.results, key=lambda result: (result['error'] is not None, result['pruned'], -(result['mean_score'] or 0)))
+        for rank, result in enumerate(ranked, 1):
+            result['rank'] = rank
+        return ranked
+
+    # Parameters of the best candidate scored on every fold
+    def best_params(self) -> dict:
+        complete = [result for result in self.get_leaderboard() if result['folds'] == self.cv and result['error'] is None]
+        return complete[0]['params'] if complete else None
+
+    # Trains the best candidate on all the data and saves it through Classifier.save
+    # Raises ValueError if no candidate was scored on every fold, rather than saving a default model over the current one
+    def save_best(self):
+        params = self.best_params()
+        if params is None:
+            raise ValueError("No candidate was scored on every fold, so there is no best model to save")
+        classifier = classifiers[self.classifier_name](params)
+        classifier.train(self.X, self.y)
+        classifier.save()
+        return classifier
+
+    def _executor(self):
+        if self.workers == 1:
+            _init_worker(self.X.values, self.y.values, self.splits)
+            return _InlineExecutor()
+        return ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self.X.values, self.y.values, self.splits))
+
+    # Runs tasks of (params, folds[, prune_below]) and yields (task index, result) as they finish
+    # With adaptive=True, only a few tasks are queued at a time so each is pruned against an up-to-date best score
+    def _map(self, executor, tasks, adaptive=False):
+        tasks = iter(enumerate(tasks))
+        best = None
+        running = {}
+
+        def submit() -> bool:
+            try:
+                i, task = next(tasks)
+            except StopIteration:
+                return False
+            params, folds, *prune_below = task
+            threshold = prune_below[0] if prune_below else (best if self.prune else None)
+            future = executor.submit(evaluate_candidate, self.classifier_name, params, folds, threshold, self.prune_margin)
+            running[future] = i
+            return True
+
+        while len(running) < (2 * self.workers if adaptive else float('inf')) and submit():
+            pass
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = running.pop(future)
+                result = future.result()
+                if not result['pruned'] and result['error'] is None and len(result['scores']) == self.cv:
+                    score = np.mean(list(result['scores'].values()))
+                    best = score if best is None else max(best, score)
+                yield i, result
+                if adaptive:
+                    submit()
+
+    def _summarise(self, result: dict) -> dict:
+        scores = list(result['scores'].values())
+        return {
+            'classifier': self.classifier_name,
+            'params': result['params'],
+            'mean_score': float(np.mean(scores)) if scores else None,
+            'std_score': float(np.std(scores)) if scores else None,
+            'folds': len(scores),
+            'pruned': result['pruned'],
+            'error': result['error'],
+            'seconds': result['seconds'],
+        }
+
+    def _write_leaderboard(self) -> None:
+        leaderboard = pd.DataFrame(self.get_leaderboard())
+        if len(leaderboard) == 0:
+            return
+        leaderboard['params'] = leaderboard['params'].apply(json.dumps)
+        os.makedirs(os.path.dirname(self.leaderboard_file) or '.', exist_ok=True)
+        leaderboard.set_index('rank').to_csv(self.leaderboard_file)
+
+
+# Runs tasks in the calling process, for workers=1
+class _InlineExecutor:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        pass
+
+    def submit(self, fn, *args) -> Future:
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+def main(args=None) -> None:
+    parser = argparse.ArgumentParser(description="Search a classifier's parameters by cross-validation on the Parkinson's dataset.")
+    parser.add_argument('classifier', choices=list(classifiers), help="classifier to tune")
+    parser.add_argument('--strategy', choices=['grid', 'random', 'halving'], default='grid', help="search strategy")
+    parser.add_argument('--candidates', type=int, default=20, help="candidates drawn by random search and successive halving")
+    parser.add_argument('--cv', type=int, default=10, help="cross-validation folds")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument('--no-prune', action='store_true', help="score every candidate on every fold")
+    parser.add_argument('--leaderboard', default=None, help="leaderboard file (default: results/<classifier>.leaderboard.csv)")
+    parser.add_argument('--save', action='store_true', help="train the best candidate on all the data and save it")
+    args = parser.parse_args(args)
+
+    df = pd.read_csv("data/parkinsons.data")
+    y = df['status']
+    X = df.drop(['name', 'status', 'RPDE', 'DFA', 'spread1', 'spread2', 'D2', 'PPE'], axis=1)
+    search = HyperparameterSearch(args.classifier, X, y, args.cv, args.workers, args.leaderboard, prune=not args.no_prune)
+
+    start = time.perf_counter()
+    if args.strategy == 'grid':
+        leaderboard = search.grid()
+    elif args.strategy == 'random':
+        leaderboard = search.random(args.candidates)
+    else:
+        leaderboard = search.successive_halving(args.candidates)
+    print(f"Scored {len(leaderboard)} candidates in {time.perf_counter() - start:.1f} s with {search.workers} workers.")
+    for result in leaderboard[:5]:
+        score = f"{result['mean_score']:.3f}" if result['mean_score'] is not None else '-'
+        print(f"  {result['rank']:>3}. {score} over {result['folds']} folds  {result['params']}")
+    print(f"Leaderboard written to '{search.leaderboard_file}'.")
+    if args.save and search.best_params() is not None:
+        search.save_best()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+import atexit
+import json
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from functools import wraps
+
+import numpy as np
+
+# Returned by timer while timing is off, so disabled timers allocate nothing
+_not_timed = nullcontext()
+
+
+# In-process timings of named pipeline stages, such as 'FeatureExtractor.pulses' or 'ResultsManager.save'
+# Each stage keeps its most recent max_samples durations, from which the count, mean and p50/p95/p99 are reported
+# Timing is off until enabled. While off, timers only check a flag, so instrumented code pays almost nothing
+# If a metrics file is given, every duration is also appended to it as a line of JSON. The file is opened when it is
+# set, and lines are written in batches. Recording never raises into the code being timed: if a write fails, the
+# metrics file is turned off and the error kept in metrics_error
+class Instrumentation:
+    # Lines held before they are written to the metrics file. Any left are written by flush, e.g. when timing is turned off
+    metrics_buffer = 100
+
+    def __init__(self, enabled=False, max_samples=10000, metrics_file=None) -> None:
+        self.enabled = enabled
+        self.max_samples = max_samples
+        # stage -> [count, total seconds, recent durations]
+        self.stages = {}
+        self.lock = threading.Lock()
+        # Held while writing, so writes never hold up recording in other threads
+        self.metrics_lock = threading.Lock()
+        self.metrics_file = None
+        self.metrics = None
+        self.metrics_error = None
+        self.pending = []
+        self.set_metrics_file(metrics_file)
+
+    # Turns timing on. Raises OSError if the metrics file cannot be opened, in which case timing is left as it was
+    def enable(self, metrics_file=None) -> None:
+        if metrics_file != self.metrics_file or (metrics_file is not None and self.metrics is None):
+            self.set_metrics_file(metrics_file)
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+        self.flush()
+
+    # Opens the file every duration is appended to, or stops appending if None, writing any lines still held first
+    def set_metrics_file(self, metrics_file) -> None:
+        self.flush()
+        with self.metrics_lock:
+            if self.metrics is not None:
+                self.metrics.close()
+            self.metrics = None
+            self.metrics_file = metrics_file
+            if metrics_file is not None:
+                self.metrics = open(metrics_file, 'a')
+                self.metrics_error = None
+
+    # Context manager timing the block it wraps as one run of stage
+    def timer(self, stage: str):
+        if not self.enabled:
+            return _not_timed
+        return _Timer(self, stage)
+
+    # Decorator timing every call of a function as one run of stage, by default the function's qualified name
+    def timed(self, stage=None):
+        def decorator(function):
+            name = stage or function.__qualname__
+
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.record(name, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    # Adds one run of stage that took the given number of seconds
+    def record(self, stage: str, seconds: float) -> None:
+        with self.lock:
+            if stage not in self.stages:
+                self.stages[stage] = [0, 0.0, deque(maxlen=self.max_samples)]
+            timings = self.stages[stage]
+            timings[0] += 1
+            timings[1] += seconds
+            timings[2].append(seconds)
+            if self.metrics is None:
+                return
+            self.pending.append(json.dumps({'time': time.time(), 'stage': stage, 'seconds': seconds}) + '\n')
+            if len(self.pending) < self.metrics_buffer:
+                return
+            lines, self.pending = self.pending, []
+        self._write(lines)
+
+    # Writes every line held for the metrics file
+    def flush(self) -> None:
+        with self.lock:
+            lines, self.pending = self.pending, []
+        if lines:
+            self._write(lines)
+
+    def _write(self, lines: list) -> None:
+        with self.metrics_lock:
+            if self.metrics is None:
+                return
+            try:
+                self.metrics.write(''.join(lines))
+                self.metrics.flush()
+            except Exception as e:
+                self.metrics_error = f"Could not write to metrics file '{self.metrics_file}', so it has been turned off: {e}"
+                print(self.metrics_error)
+                try:
+                    self.metrics.close()
+                except Exception:
+                    pass
+                self.metrics = None
+
+    # Returns the recent durations of a stage, oldest first
+    def get_samples(self, stage: str) -> np.ndarray:
+        with self.lock:
+            return np.array(self.stages[stage][2]) if stage in self.stages else np.array([])
+
+    # Returns the number of runs, total and mean time of each stage, and percentiles of its recent durations
+    def get_stats(self) -> dict:
+        with self.lock:
+            stages = {stage: (count, total, np.array(samples)) for stage, (count, total, samples) in self.stages.items()}
+        report = {}
+        for stage, (count, total, samples) in sorted(stages.items()):
+            p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+            report[stage] = {
+                'count': count,
+                'total_seconds': total,
+                'mean_seconds': total / count,
+                'p50_seconds': float(p50),
+                'p95_seconds': float(p95),
+                'p99_seconds': float(p99),
+                'max_seconds': float(samples.max()),
+            }
+        return report
+
+    # Writes the current statistics of every stage to a JSON file
+    def export(self, file: str) -> None:
+        with open(file, 'w') as f:
+            json.dump({'time': time.time(), 'stages': self.get_stats()}, f, indent=2)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.stages.clear()
+
+
+class _Timer:
+    def __init__(self, instrumentation: Instrumentation, stage: str) -> None:
+        self.instrumentation = instrumentation
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.instrumentation.record(self.stage, time.perf_counter() - self.start)
+
+
+# Shared by every page and Streamlit session in the process. Lines still held for the metrics file are written at exit
+instrumentation = Instrumentation()
+atexit.register(instrumentation.flush)
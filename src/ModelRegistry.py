@@ -0,0 +1,96 @@
+import hashlib
+import os
+import threading
+import time
+
+from src.Classifier import AdaBoost, Classifier, RandomForest, SVM, Voting
+
+
+class ModelRegistry:
+    # Classifier wrapper used to load each model artifact, keyed by file name
+    classifiers = {
+        'SVM': SVM,
+        'RandomForest': RandomForest,
+        'AdaBoost': AdaBoost,
+        'Voting': Voting,
+    }
+
+    def __init__(self, directory='models') -> None:
+        self.directory = directory
+        # name -> (fingerprint, digest, classifier)
+        self.models = {}
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    # Returns the loaded classifier for the given model name, loading it only if the artifact has changed
+    def get(self, name: str) -> Classifier:
+        if name not in self.classifiers:
+            print(f"Unknown model '{name}'. Available models: {', '.join(self.classifiers)}")
+            return None
+
+        path = os.path.join(self.directory, name)
+        if not os.path.exists(path):
+            print(f"Model file '{path}' does not exist.")
+            return None
+
+        with self.lock:
+            stats = self.stats.setdefault(name, {'loads': 0, 'hits': 0, 'last_load_seconds': None, 'total_load_seconds': 0.0})
+            fingerprint = self._fingerprint(path)
+            cached = self.models.get(name)
+            if cached is not None:
+                if cached[0] == fingerprint:
+                    stats['hits'] += 1
+                    return cached[2]
+                # File was touched, only reload if its contents actually changed
+                digest = self._digest(path)
+                if cached[1] == digest:
+                    self.models[name] = (fingerprint, digest, cached[2])
+                    stats['hits'] += 1
+                    return cached[2]
+            else:
+                digest = self._digest(path)
+
+            start = time.perf_counter()
+            classifier = self.classifiers[name]()
+            if not classifier.load(path):
+                return None
+            stats['last_load_seconds'] = time.perf_counter() - start
+            stats['total_load_seconds'] += stats['last_load_seconds']
+            stats['loads'] += 1
+            self.models[name] = (fingerprint, digest, classifier)
+            return classifier
+
+    # Drops a cached model, or every cached model if no name is given
+    def invalidate(self, name=None) -> None:
+        with self.lock:
+            if name is None:
+                self.models.clear()
+            else:
+                self.models.pop(name, None)
+
+    # Returns load counts, cache hits and load latency for each model requested so far
+    def get_stats(self) -> dict:
+        with self.lock:
+            report = {}
+            for name, stats in self.stats.items():
+                report[name] = {
+                    'loads': stats['loads'],
+                    'hits': stats['hits'],
+                    'last_load_seconds': stats['last_load_seconds'],
+                    'mean_load_seconds': stats['total_load_seconds'] / stats['loads'] if stats['loads'] else None,
+                }
+            return report
+
+    # Cheap check for changes to an artifact
+    def _fingerprint(self, path: str) -> tuple:
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    # Hash of the artifact contents, used to confirm a change once the fingerprint differs
+    def _digest(self, path: str) -> str:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+
+# Shared by every page and Streamlit session in the process
+registry = ModelRegistry()
@@ -1,24 +1,73 @@
+import asyncio
+import threading
+import time
 import wave
 
 import numpy as np
-import sounddevice as sd
+
+from src.Instrumentation import instrumentation
 
 
 class Recorder:
-    def __init__(self) -> None:
+    # Seconds to wait for the input device to deliver a chunk before giving up
+    timeout = 5
+
+    # backend provides InputStream and play like the sounddevice module, which is used by default
+    # and only imported when first needed
+    def __init__(self, backend=None) -> None:
         self.SAMPLERATE = 44100
         self.CHANNELS = 1
+        self.backend = backend
+        self.audio_data = None
+        self.recorded = 0
+        self.condition = threading.Condition()
 
     # Record audio data from user's microphone for specified length
     def record(self, length):
         print(f"Recording for {length} seconds...")
-        audio = sd.rec(int(length * self.SAMPLERATE), samplerate=self.SAMPLERATE, channels=self.CHANNELS, blocking=True)
+        for _ in self.stream(max_seconds=length):
+            pass
         # Normalise audio to 16-bit range
-        audio = audio / audio.max() * np.iinfo(np.int16).max
-        audio = audio.astype(np.int16)
-        self.audio_data = audio
+        self.normalise()
         print(f"Recording complete.")
-        return audio
+        return self.audio_data
+
+    # Yields int16 chunks of chunk_seconds, shaped (channels, samples), as they are captured, for at most max_seconds
+    # The input stream's callback writes into a buffer allocated up front, and each chunk is a view of it
+    # Capture stops as soon as the caller stops iterating, and audio_data is left holding what was recorded
+    def stream(self, chunk_seconds=0.25, max_seconds=10):
+        chunk_samples = int(chunk_seconds * self.SAMPLERATE)
+        try:
+            with self._open(max_seconds):
+                for start in range(0, len(self.audio_data), chunk_samples):
+                    end = min(start + chunk_samples, len(self.audio_data))
+                    self._wait_for(end)
+                    yield self.audio_data[start:end].T
+        finally:
+            self.audio_data = self.audio_data[:self.recorded]
+
+    # The same chunks as stream, as an async iterator. Waiting for each chunk happens off the event loop
+    async def astream(self, chunk_seconds=0.25, max_seconds=10):
+        loop = asyncio.get_running_loop()
+        chunk_samples = int(chunk_seconds * self.SAMPLERATE)
+        try:
+            with self._open(max_seconds):
+                for start in range(0, len(self.audio_data), chunk_samples):
+                    end = min(start + chunk_samples, len(self.audio_data))
+                    await loop.run_in_executor(None, self._wait_for, end)
+                    yield self.audio_data[start:end].T
+        finally:
+            self.audio_data = self.audio_data[:self.recorded]
+
+    # Scales the recording in place so its largest absolute sample is at full scale. Silence is left as it is
+    def normalise(self) -> None:
+        if self.audio_data is None or self.audio_data.size == 0:
+            return
+        peak = max(int(self.audio_data.max()), -int(self.audio_data.min()))
+        if peak == 0:
+            return
+        # The ufunc scales in small buffered blocks, so no full-size float copy is made
+        np.multiply(self.audio_data, np.iinfo(np.int16).max / peak, out=self.audio_data, casting='unsafe')
 
     # Save audio data to file
     def save(self, filename: str):
@@ -32,4 +81,82 @@ class Recorder:
     # Playback recorded audio
     def play(self):
         if self.audio_data is not None:
-            sd.play(self.audio_data)
+            self._get_backend().play(self.audio_data, self.SAMPLERATE)
+
+    def _get_backend(self):
+        if self.backend is None:
+            import sounddevice
+            self.backend = sounddevice
+        return self.backend
+
+    # Allocates the buffer for max_seconds and returns an input stream whose callback fills it
+    def _open(self, max_seconds):
+        self.audio_data = np.zeros((int(max_seconds * self.SAMPLERATE), self.CHANNELS), dtype=np.int16)
+        self.recorded = 0
+
+        def callback(indata, frames, time, status):
+            with self.condition:
+                n = min(frames, len(self.audio_data) - self.recorded)
+                self.audio_data[self.recorded:self.recorded + n] = indata[:n]
+                self.recorded += n
+                self.condition.notify_all()
+
+        return self._get_backend().InputStream(samplerate=self.SAMPLERATE, channels=self.CHANNELS, dtype='int16', callback=callback)
+
+    # Blocks until the callback has written the first `samples` samples
+    # Timed as the 'Recorder.wait' stage: the time spent waiting on the device, not what the consumer does with each chunk
+    @instrumentation.timed('Recorder.wait')
+    def _wait_for(self, samples: int) -> None:
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.recorded >= samples, self.timeout):
+                raise TimeoutError("No audio received from the input device")
+
+
+# Stands in for sounddevice, feeding a recording to the input stream callback from a background thread
+# Useful for testing and for replaying recordings. With realtime=True, blocks arrive at the rate they would
+# from a microphone. After the recording ends, silence is delivered
+class SyntheticBackend:
+    def __init__(self, samples: np.ndarray, sample_rate=44100, blocksize=1024, realtime=False) -> None:
+        self.samples = np.asarray(samples)
+        self.sample_rate = sample_rate
+        self.blocksize = blocksize
+        self.realtime = realtime
+        self.played = []
+
+    def InputStream(self, samplerate, channels, dtype, callback, **kwargs):
+        return _SyntheticStream(self, channels, dtype, callback)
+
+    def play(self, data, samplerate=None) -> None:
+        self.played.append(data)
+
+
+class _SyntheticStream:
+    def __init__(self, backend: SyntheticBackend, channels: int, dtype, callback) -> None:
+        self.backend = backend
+        self.channels = channels
+        self.dtype = dtype
+        self.callback = callback
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stopped.set()
+        self.thread.join()
+
+    def _run(self) -> None:
+        samples, blocksize = self.backend.samples, self.backend.blocksize
+        position = 0
+        start = time.monotonic()
+        while not self.stopped.is_set():
+            # In real time, each block is delivered once it would have been fully captured
+            if self.backend.realtime and self.stopped.wait(start + (position + blocksize) / self.backend.sample_rate - time.monotonic()):
+                break
+            block = np.zeros((blocksize, self.channels), dtype=self.dtype)
+            data = samples[position:position + blocksize]
+            block[:len(data)] = data.reshape(-1, self.channels)
+            position += blocksize
+            self.callback(block, blocksize, None, None)
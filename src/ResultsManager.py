@@ -1,45 +1,64 @@
+import threading
+
 import pandas as pd
-from os.path import exists
-from random import choice
+
+from src.Instrumentation import instrumentation
+from src.ResultsStorage import CSVStorage, SQLiteStorage
+from src.ResultsTable import ResultsTable
 
 class ResultsManager:
     col_names = ["MDVP:Fo(Hz)","MDVP:Fhi(Hz)","MDVP:Flo(Hz)","MDVP:Jitter(%)","MDVP:Jitter(Abs)","MDVP:RAP","MDVP:PPQ","Jitter:DDP","MDVP:Shimmer","MDVP:Shimmer(dB)","Shimmer:APQ3","Shimmer:APQ5","MDVP:APQ","Shimmer:DDA","NHR","HNR","status","RPDE","DFA","spread1","spread2","D2","PPE"]
+    # Feature columns the bundled models are trained on, in training order
+    feature_names = [c for c in col_names if c not in ('status', 'RPDE', 'DFA', 'spread1', 'spread2', 'D2', 'PPE')]
+
+    # Results are kept in memory and persisted through a storage backend
+    # Paths ending in .db or .sqlite use SQLite, anything else is treated as a .csv file
+    # One manager may be shared by every Streamlit session, so mutations are serialised by a lock, and reads reload
+    # the table first if another connection or process has committed to the storage since
+    def __init__(self, results_file, storage=None) -> None:
+        if storage is None:
+            if results_file.endswith(('.db', '.sqlite')):
+                storage = SQLiteStorage(results_file, self.col_names)
+            else:
+                if '.csv' not in results_file:
+                    results_file += '.csv'
+                storage = CSVStorage(results_file)
 
-    def __init__(self, results_file) -> None:
-        if '.csv' not in results_file:
-            results_file += '.csv'
-            
-        if exists(results_file):
-            try:
-                self.results = pd.read_csv(results_file, index_col=0).to_dict(orient='index')
-                self.results = {str(k): v for k, v in self.results.items()}
-                self.path = results_file
-            except:
-                print(f"ERROR: Could not parse file {results_file}. Creating empty results table.")
-                self.results = {}
-                self.path = results_file
-        else:
-            print(f"ERROR: File {results_file} does not exist. Using defaults.")
-            self.results = {}
-            self.path = results_file
+        self.storage = storage
+        self.path = storage.path
+        self.results = ResultsTable(self.col_names, storage.load())
+        self.lock = threading.RLock()
+
+    # Reloads the table if the storage was changed by anything other than this manager
+    def refresh(self) -> None:
+        with self.lock:
+            if self.storage.changed():
+                self.results = ResultsTable(self.col_names, self.storage.load())
 
     # Used to add results to the results table, status can be optionally given
+    # UIDs come from a persisted counter, so they are never reused, even across processes
+    @instrumentation.timed()
     def add_results(self, features: dict, status=None) -> str:
-        uid = str(choice([x for x in range(1,1000) if x not in self.results]))
-        self.results[uid] = {}
+        row = {}
         for key in self.col_names:
             if key in features:
-                self.results[uid][key] = features[key]
+                row[key] = features[key]
             else:
-                self.results[uid][key] = None
-        self.results[uid]['status'] = status
+                row[key] = None
+        row['status'] = status
+        with self.lock:
+            uid = self.storage.uid_allocator.allocate(self.results)
+            # Stored first, so a row the storage rejects never appears in memory
+            self.storage.add(uid, row)
+            self.results.add(uid, row)
         return uid
 
     # Get status for given UID
     def get_status(self, uid: str) -> int:
+        self.refresh()
         if uid in self.results:
             try:
-                return int(self.results[uid]['status'])
+                return int(self.results.get_value(uid, 'status'))
             except:
                 return -1
         else:
@@ -47,40 +66,104 @@ class ResultsManager:
 
     # Get features for given UID
     def get_features(self, uid: str) -> dict:
+        self.refresh()
         if uid in self.results:
             return {k: v for k, v in self.results[uid].items() if k != 'status'}
 
     # Update the status for a given UID
+    @instrumentation.timed()
     def set_status(self, uid: str, status: bool) -> None:
-        if uid in self.results:
-            self.results[uid]['status'] = int(status)
+        with self.lock:
+            if uid in self.results:
+                self.results.set_value(uid, 'status', int(status))
+                self.storage.set_status(uid, int(status))
+
+    # Update the statuses for many UIDs at once, e.g. from a batch prediction
+    @instrumentation.timed()
+    def set_statuses(self, uids, statuses) -> None:
+        with self.lock:
+            updated = {uid: int(status) for uid, status in zip(uids, statuses) if uid in self.results}
+            self.results.set_values(updated.keys(), 'status', updated.values())
+            self.storage.set_statuses(updated)
 
     # Delete results for given UID
     def remove_results(self, uid: str) -> None:
-        if uid in self.results:
-            del(self.results[uid])
+        with self.lock:
+            if uid in self.results:
+                self.results.remove(uid)
+                self.storage.remove(uid)
 
     # Returns a list of UIDs without predictions
     def get_unpredicted(self) -> list:
-        unpredicted = []
-        for uid in self.results:
-            if pd.isnull(self.results[uid]['status']):
-                unpredicted.append(uid)
-        return unpredicted
-
-    # Converts current results dictionary to a pandas dataframe
+        with self.lock:
+            self.refresh()
+            unpredicted = self.storage.get_unpredicted()
+            if unpredicted is not None:
+                return unpredicted
+            return self.results.get_unpredicted()
+
+    # Returns the features of every UID without a prediction as one matrix, indexed by UID, with columns in a fixed order
+    # Rows missing any of the requested features are left out as they cannot be scored, as are any not in the table
+    # With return_skipped=True, the UIDs of those rows are returned as well, as (features, skipped)
+    def get_unpredicted_features(self, columns=None, return_skipped=False) -> pd.DataFrame:
+        if columns is None:
+            columns = self.feature_names
+        with self.lock:
+            unpredicted = self.get_unpredicted()
+            missing = [uid for uid in unpredicted if uid not in self.results]
+            unpredicted = [uid for uid in unpredicted if uid in self.results]
+            features = pd.DataFrame(self.results.to_matrix(unpredicted, columns), index=unpredicted, columns=list(columns))
+        complete = features.notna().all(axis=1)
+        if return_skipped:
+            return features[complete], missing + list(features.index[~complete])
+        return features[complete]
+
+    # Converts current results table to a pandas dataframe, or a single set of results to a one row dataframe
+    # The full table is returned without copying, in insertion order
     def to_dataframe(self, results=None) -> pd.DataFrame:
         if results is None:
-            return pd.DataFrame.from_dict(self.results, orient='index').sort_index()
+            self.refresh()
+            return self.results.to_dataframe()
         else:
             return pd.DataFrame([results.values()], columns=results.keys())
 
     # Outputs a .csv file of results. Defaults to the current working file, else a given output file can be written to
+    @instrumentation.timed()
     def save(self, file_path=None) -> None:
-        if file_path is None:
-            self.to_dataframe().to_csv(self.path, index_label='name')
-        else:
-            self.to_dataframe().to_csv(file_path, index_label='name')
+        with self.lock:
+            if file_path is None:
+                self.storage.save(self)
+            else:
+                self.to_dataframe().to_csv(file_path, index_label='name')
+
+    # Adds every result from a .csv file to the current results table, keeping their UIDs
+    def import_csv(self, file_path: str) -> int:
+        imported = CSVStorage(file_path).load()
+        with self.lock:
+            self.results.add_frame(imported)
+            self.storage.add_many(imported)
+            self.storage.uid_allocator.reserve(self.results)
+        return len(imported)
+
+    # Imports a .csv file into an empty results table, e.g. to seed a new database, returning the number of results
+    # imported. Nothing is imported if there are results already, including ones seeded meanwhile by another
+    # session or process, in which case those are loaded instead
+    def seed_csv(self, file_path: str) -> int:
+        if len(self.results) > 0:
+            return 0
+        imported = CSVStorage(file_path).load()
+        if imported.empty:
+            return 0
+        with self.lock:
+            if not self.storage.seed(imported):
+                self.results = ResultsTable(self.col_names, self.storage.load())
+                return 0
+            self.results.add_frame(imported)
+        return len(imported)
+
+    # Writes the current results table to a .csv file
+    def export_csv(self, file_path: str) -> None:
+        self.save(file_path)
 
 
     # UNUSED FUNCTIONS
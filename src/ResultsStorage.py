@@ -0,0 +1,156 @@
+import sqlite3
+from os.path import exists
+
+import pandas as pd
+
+from src.UIDAllocator import FileUIDAllocator, SQLiteUIDAllocator
+
+
+# Keeps results in a .csv file. Mutations only happen in memory, and the whole table is rewritten on save
+class CSVStorage:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.uid_allocator = FileUIDAllocator(path + '.uid')
+
+    # Returns a DataFrame of results indexed by UID
+    def load(self) -> pd.DataFrame:
+        if not exists(self.path):
+            print(f"ERROR: File {self.path} does not exist. Using defaults.")
+            return pd.DataFrame()
+        try:
+            results = pd.read_csv(self.path, index_col=0)
+            results.index = results.index.astype(str)
+            return results
+        except:
+            print(f"ERROR: Could not parse file {self.path}. Creating empty results table.")
+            return pd.DataFrame()
+
+    def add(self, uid: str, row: dict) -> None:
+        pass
+
+    def add_many(self, rows: pd.DataFrame) -> None:
+        pass
+
+    # The caller has already checked its table is empty, as a .csv file has no transactions to guard it with
+    def seed(self, rows: pd.DataFrame) -> bool:
+        self.uid_allocator.reserve(rows.index)
+        return True
+
+    def set_status(self, uid: str, status: int) -> None:
+        pass
+
+    def set_statuses(self, statuses: dict) -> None:
+        pass
+
+    def remove(self, uid: str) -> None:
+        pass
+
+    # No index to query, the caller scans its results instead
+    def get_unpredicted(self) -> list:
+        return None
+
+    # The table in memory is the only copy being written to, so the file never changes underneath it
+    def changed(self) -> bool:
+        return False
+
+    def save(self, results_manager) -> None:
+        results_manager.to_dataframe().to_csv(self.path, index_label='name')
+
+    def close(self) -> None:
+        pass
+
+
+# Keeps results in a local SQLite database. Each mutation is a single row-level statement,
+# and save commits the pending statements
+class SQLiteStorage:
+    def __init__(self, path: str, col_names: list) -> None:
+        self.path = path
+        self.col_names = col_names
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+
+        columns = ', '.join(f'"{col}" {"INTEGER" if col == "status" else "REAL"}' for col in col_names)
+        self.connection.execute(f"CREATE TABLE IF NOT EXISTS results (uid TEXT PRIMARY KEY, {columns})")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS results_status ON results (status)")
+        self.connection.commit()
+        self.uid_allocator = SQLiteUIDAllocator(self.connection)
+
+        quoted = ', '.join(f'"{col}"' for col in col_names)
+        placeholders = ', '.join('?' for _ in range(len(col_names) + 1))
+        # New results never replace a row, so a UID collision fails rather than overwriting another patient's results
+        self.insert_sql = f"INSERT INTO results (uid, {quoted}) VALUES ({placeholders})"
+        # Imported results replace any with the same UID
+        self.replace_sql = f"INSERT OR REPLACE INTO results (uid, {quoted}) VALUES ({placeholders})"
+        self.data_version = None
+
+    # Returns a DataFrame of results indexed by UID, in insertion order
+    def load(self) -> pd.DataFrame:
+        self.data_version = self._data_version()
+        return pd.read_sql_query("SELECT * FROM results ORDER BY rowid", self.connection, index_col='uid')
+
+    def add(self, uid: str, row: dict) -> None:
+        self.connection.execute(self.insert_sql, self._to_record(uid, row))
+
+    def add_many(self, rows: pd.DataFrame) -> None:
+        rows = rows.reindex(columns=self.col_names)
+        rows = rows.astype(object).where(rows.notna(), None)
+        records = ((str(uid), *values) for uid, *values in rows.itertuples(name=None))
+        self.connection.executemany(self.replace_sql, records)
+
+    # Adds rows only if the table is empty, checked and written in one transaction, so sessions or processes
+    # seeding a new database at the same time import the rows once. Returns whether they were added
+    def seed(self, rows: pd.DataFrame) -> bool:
+        self.connection.commit()
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            if self.connection.execute("SELECT 1 FROM results LIMIT 1").fetchone() is not None:
+                self.connection.rollback()
+                return False
+            self.add_many(rows)
+            self.uid_allocator.reserve(rows.index)
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        return True
+
+    def set_status(self, uid: str, status: int) -> None:
+        self.connection.execute("UPDATE results SET status = ? WHERE uid = ?", (status, uid))
+
+    def set_statuses(self, statuses: dict) -> None:
+        self.connection.executemany("UPDATE results SET status = ? WHERE uid = ?", ((status, uid) for uid, status in statuses.items()))
+
+    def remove(self, uid: str) -> None:
+        self.connection.execute("DELETE FROM results WHERE uid = ?", (uid,))
+
+    # Indexed lookup of UIDs without a status
+    def get_unpredicted(self) -> list:
+        cursor = self.connection.execute("SELECT uid FROM results WHERE status IS NULL ORDER BY rowid")
+        return [row[0] for row in cursor]
+
+    # Whether another connection, e.g. a batch import or another app process, has committed changes since the last load
+    def changed(self) -> bool:
+        return self._data_version() != self.data_version
+
+    def save(self, results_manager) -> None:
+        self.connection.commit()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def _data_version(self) -> int:
+        return self.connection.execute("PRAGMA data_version").fetchone()[0]
+
+    # Orders a row's values to match the table, storing missing values as NULL
+    def _to_record(self, uid: str, row: dict) -> tuple:
+        values = [uid]
+        for col in self.col_names:
+            value = row.get(col)
+            if value is None or pd.isnull(value):
+                values.append(None)
+            elif col == 'status':
+                values.append(int(value))
+            else:
+                values.append(float(value))
+        return tuple(values)
@@ -0,0 +1,160 @@
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+
+# Columnar store for the results table: one float64 array per column plus a UID -> row index
+# Missing values (including an unset status) are NaN. Deleted rows are tombstoned and
+# compacted away once they make up a large enough share of the table
+# Reads like a dictionary of rows keyed by UID
+class ResultsTable(Mapping):
+    initial_capacity = 1024
+    # Compact once at least this many rows, and this fraction of the table, are tombstones
+    compact_min_deleted = 1024
+    compact_fraction = 0.25
+
+    def __init__(self, col_names: list, frame=None) -> None:
+        self.col_names = list(col_names)
+        self.size = 0
+        self.deleted = 0
+        self.uids = []
+        self.index = {}
+        self._allocate(self.initial_capacity)
+        if frame is not None and len(frame) > 0:
+            self.add_frame(frame)
+
+    # Adds or replaces a single row. Missing values may be None, NaN or pd.NA
+    def add(self, uid: str, row: dict) -> None:
+        if uid in self.index:
+            i = self.index[uid]
+        else:
+            if self.size == self.capacity:
+                self._allocate(self.capacity * 2)
+            i = self.size
+            self.size += 1
+            self.uids.append(uid)
+            self.index[uid] = i
+            self.live[i] = True
+        for col in self.col_names:
+            value = row.get(col)
+            self.columns[col][i] = np.nan if pd.isna(value) else value
+
+    # Appends every row of a DataFrame indexed by UID, replacing rows that already exist
+    def add_frame(self, frame: pd.DataFrame) -> None:
+        uids = [str(uid) for uid in frame.index]
+        existing = [uid in self.index for uid in uids]
+        if any(existing):
+            for uid, (_, row) in zip(uids, frame.iterrows()):
+                self.add(uid, row.to_dict())
+            return
+
+        n = len(uids)
+        if self.size + n > self.capacity:
+            capacity = self.capacity
+            while capacity < self.size + n:
+                capacity *= 2
+            self._allocate(capacity)
+        rows = slice(self.size, self.size + n)
+        for col in self.col_names:
+            if col in frame.columns:
+                self.columns[col][rows] = pd.to_numeric(frame[col], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+            else:
+                self.columns[col][rows] = np.nan
+        self.live[rows] = True
+        self.index.update(zip(uids, range(self.size, self.size + n)))
+        self.uids.extend(uids)
+        self.size += n
+
+    # Returns a single value, or None if the UID is not present
+    def get_value(self, uid: str, col: str) -> float:
+        if uid in self.index:
+            return self.columns[col][self.index[uid]]
+        return None
+
+    def set_value(self, uid: str, col: str, value) -> None:
+        if uid in self.index:
+            self.columns[col][self.index[uid]] = value
+
+    # Sets one column for many UIDs at once, ignoring UIDs that are not present
+    def set_values(self, uids, col: str, values) -> None:
+        pairs = [(self.index[uid], value) for uid, value in zip(uids, values) if uid in self.index]
+        if pairs:
+            rows, values = zip(*pairs)
+            self.columns[col][list(rows)] = values
+
+    def remove(self, uid: str) -> None:
+        if uid in self.index:
+            self.live[self.index.pop(uid)] = False
+            self.deleted += 1
+            if self.deleted >= self.compact_min_deleted and self.deleted >= self.compact_fraction * self.size:
+                self.compact()
+
+    # Drops tombstoned rows, rebuilding the UID index
+    def compact(self) -> None:
+        if self.deleted == 0:
+            return
+        keep = self.live[:self.size]
+        for col in self.col_names:
+            self.columns[col] = self.columns[col][:self.size][keep].copy()
+        self.uids = [uid for uid, alive in zip(self.uids, keep) if alive]
+        self.index = {uid: i for i, uid in enumerate(self.uids)}
+        self.size = len(self.uids)
+        self.live = np.ones(self.size, dtype=bool)
+        self.deleted = 0
+        self._allocate(max(self.initial_capacity, self.size))
+
+    # Returns the UIDs with no status, in insertion order
+    def get_unpredicted(self) -> list:
+        unpredicted = np.isnan(self.columns['status'][:self.size]) & self.live[:self.size]
+        return [self.uids[i] for i in np.flatnonzero(unpredicted)]
+
+    # Returns the given columns for the given UIDs as a 2D array
+    def to_matrix(self, uids, columns) -> np.ndarray:
+        rows = [self.index[uid] for uid in uids]
+        matrix = np.empty((len(rows), len(columns)))
+        for j, col in enumerate(columns):
+            matrix[:, j] = self.columns[col][rows]
+        return matrix
+
+    # Returns the table as a DataFrame indexed by UID
+    # The feature columns share memory with the table, so copy the frame before holding on to it across updates
+    # The status column is converted to nullable integers, with <NA> for results without a prediction
+    def to_dataframe(self) -> pd.DataFrame:
+        self.compact()
+        data = {col: self.columns[col][:self.size] for col in self.col_names}
+        if 'status' in data:
+            data['status'] = pd.array(data['status'], dtype='Int64')
+        return pd.DataFrame(data, index=pd.Index(self.uids, dtype=object), copy=False)
+
+    def __getitem__(self, uid: str) -> dict:
+        i = self.index[uid]
+        return {col: self.columns[col][i] for col in self.col_names}
+
+    def __contains__(self, uid) -> bool:
+        return uid in self.index
+
+    def __iter__(self):
+        return iter([self.uids[i] for i in np.flatnonzero(self.live[:self.size])])
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    # Bytes held by the column arrays
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in self.columns.values()) + self.live.nbytes
+
+    # Grows (or, after compaction, shrinks) every column to the given capacity
+    def _allocate(self, capacity: int) -> None:
+        columns = {}
+        for col in self.col_names:
+            array = np.full(capacity, np.nan)
+            if hasattr(self, 'columns'):
+                array[:self.size] = self.columns[col][:self.size]
+            columns[col] = array
+        live = np.zeros(capacity, dtype=bool)
+        if hasattr(self, 'live'):
+            live[:self.size] = self.live[:self.size]
+        self.columns = columns
+        self.live = live
+        self.capacity = capacity
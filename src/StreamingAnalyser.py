@@ -0,0 +1,100 @@
+import numpy as np
+
+from src.AudioBuffer import AudioBuffer
+from src.FeatureExtractor import FeatureExtractor
+
+
+# Analyses a recording while it is being captured, so it can stop as soon as the voice measures have settled
+# Audio is analysed in overlapping windows as it arrives, keeping a running mean of pitch, jitter, shimmer and HNR
+# over the voiced windows. The measures have converged once every running mean has changed by at most tolerance
+# (relative) for stable_windows windows in a row, and at least min_seconds have been captured
+# With a VoiceActivityDetector, windows that are mostly unvoiced are skipped without running Praat, and only the
+# longest stable voiced segment of the recording is used for its features
+class StreamingAnalyser:
+    tracked_labels = ['MDVP:Fo(Hz)', 'MDVP:Jitter(%)', 'MDVP:Shimmer', 'HNR']
+
+    def __init__(self, sample_rate=44100, window_seconds=1.0, hop_seconds=0.5, tolerance=0.05, stable_windows=3,
+            min_seconds=2.0, max_seconds=10, cache=None, voice_activity_detector=None) -> None:
+        self.audio_buffer = AudioBuffer(max_seconds, sample_rate)
+        self.sample_rate = sample_rate
+        self.window = int(window_seconds * sample_rate)
+        self.hop = int(hop_seconds * sample_rate)
+        self.tolerance = tolerance
+        self.stable_windows = stable_windows
+        self.min_seconds = min_seconds
+        self.cache = cache
+        self.voice_activity_detector = voice_activity_detector
+        self.clear()
+
+    def clear(self) -> None:
+        self.audio_buffer.clear()
+        self.window_end = self.window
+        self.windows = {label: [] for label in self.tracked_labels}
+        self.history = []
+        self.stable = 0
+
+    # Adds captured samples, analysing every window they complete
+    def write(self, samples: np.ndarray, sample_rate=None) -> None:
+        self.audio_buffer.write(samples, sample_rate or self.sample_rate)
+        self._update()
+
+    # Adds a PyAV AudioFrame, as received from streamlit-webrtc
+    def write_frame(self, audio_frame) -> None:
+        self.audio_buffer.write_frame(audio_frame)
+        self._update()
+
+    # Running mean of each tracked measure over the voiced windows so far, None before any voiced window
+    def get_estimates(self) -> dict:
+        return {label: float(np.mean(values)) if values else None for label, values in self.windows.items()}
+
+    def is_converged(self) -> bool:
+        return self.stable >= self.stable_windows and self.audio_buffer.duration() >= self.min_seconds
+
+    # Capture should stop once the measures have converged or the buffer is full
+    def is_done(self) -> bool:
+        return self.is_converged() or len(self.audio_buffer) == len(self.audio_buffer.samples)
+
+    # Extracts features from everything captured so far, or its longest stable voiced segment
+    def get_features(self, labels=None) -> dict:
+        samples = self.audio_buffer.to_array()
+        if self.voice_activity_detector is not None:
+            samples = self.voice_activity_detector.select(samples, self.sample_rate)
+        feature_extractor = FeatureExtractor(samples, lazy=True, cache=self.cache, sample_rate=self.sample_rate)
+        return feature_extractor.get_dataset_features(labels)
+
+    # Feeds chunks of samples, e.g. from Recorder.stream, until done, then returns the recording's features
+    # Stopping iteration early lets the source stop capturing
+    def run(self, chunks, labels=None) -> dict:
+        for chunk in chunks:
+            self.write(chunk)
+            if self.is_done():
+                break
+        return self.get_features(labels)
+
+    def _update(self) -> None:
+        samples = self.audio_buffer.to_array()
+        while self.window_end <= len(samples):
+            self._analyse_window(samples[self.window_end - self.window:self.window_end])
+            self.window_end += self.hop
+
+    def _analyse_window(self, samples: np.ndarray) -> None:
+        # Unvoiced windows (e.g. before the patient starts) neither count towards the estimates nor as stable
+        if self.voice_activity_detector is not None and self.voice_activity_detector.voiced_frames(samples, self.sample_rate).mean() < 0.5:
+            self.stable = 0
+            return
+        measures = FeatureExtractor(samples, lazy=True, sample_rate=self.sample_rate).get_dataset_features(self.tracked_labels)
+        if any(measures.get(label) is None for label in self.tracked_labels):
+            self.stable = 0
+            return
+        previous = self.get_estimates()
+        for label in self.tracked_labels:
+            self.windows[label].append(measures[label])
+        estimates = self.get_estimates()
+        self.history.append(estimates)
+
+        if previous[self.tracked_labels[0]] is None:
+            return
+        if all(abs(estimates[label] - previous[label]) <= self.tolerance * abs(estimates[label]) for label in self.tracked_labels):
+            self.stable += 1
+        else:
+            self.stable = 0
@@ -0,0 +1,118 @@
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+# UIDs handed out before the counter existed were picked at random from 1-999. They stay valid,
+# and the counter starts above them (or above any larger numeric UID already in the table)
+FIRST_UID = 1000
+
+
+# Returns the first UID the counter can hand out without colliding with the given UIDs
+def first_free_uid(uids) -> int:
+    numeric = [int(uid) for uid in uids if str(uid).isdigit()]
+    return max([FIRST_UID - 1] + numeric) + 1
+
+
+# Sequential numeric UIDs kept in a small counter file next to a .csv results table
+# An OS lock on a lock file makes each allocation atomic across processes. Neither file exists until the first UID is
+# allocated or reserved, so opening a table only to read it leaves nothing behind
+class FileUIDAllocator:
+    lock_timeout = 10
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.lock_path = path + '.lock'
+
+    # Returns the next UID. existing is only read the first time, to migrate a table created before the counter
+    def allocate(self, existing=()) -> str:
+        with self._lock():
+            uid = self._read()
+            if uid is None:
+                uid = first_free_uid(existing)
+            self._write(uid + 1)
+        return str(uid)
+
+    # Makes sure the counter will never hand out any of the given UIDs, e.g. after importing results
+    def reserve(self, uids) -> None:
+        with self._lock():
+            current = self._read()
+            self._write(max(current or FIRST_UID, first_free_uid(uids)))
+
+    def _read(self) -> int:
+        try:
+            with open(self.path) as f:
+                return int(f.read().strip())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    # Written to a temporary file and renamed, so a crash never leaves a partial counter behind
+    def _write(self, value: int) -> None:
+        temp_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w') as f:
+            f.write(str(value))
+        os.replace(temp_path, self.path)
+
+    def _lock(self):
+        return _FileLock(self.lock_path, self.lock_timeout)
+
+
+# An exclusive OS lock (flock, or msvcrt.locking on Windows) on a lock file. The OS releases it if the process holding
+# it dies, so there is never a stale lock to break. The file is left in place, as removing it would let two processes
+# each lock a different file
+class _FileLock:
+    def __init__(self, path: str, timeout: float) -> None:
+        self.path = path
+        self.timeout = timeout
+
+    def __enter__(self):
+        self.fd = os.open(self.path, os.O_CREAT | os.O_RDWR)
+        start = time.monotonic()
+        while True:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(self.fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                else:
+                    msvcrt.locking(self.fd, msvcrt.LK_NBLCK, 1)
+                return self
+            except OSError:
+                if time.monotonic() - start > self.timeout:
+                    os.close(self.fd)
+                    raise TimeoutError(f"Could not acquire UID lock {self.path}")
+                time.sleep(0.001)
+
+    def __exit__(self, *args) -> None:
+        try:
+            if fcntl is not None:
+                fcntl.flock(self.fd, fcntl.LOCK_UN)
+            else:
+                msvcrt.locking(self.fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self.fd)
+
+
+# Sequential numeric UIDs kept in a single-row table of a SQLite results database
+# The increment and read are one statement inside the connection's write transaction, so SQLite's locking makes it
+# atomic across processes and across threads sharing the connection
+class SQLiteUIDAllocator:
+    def __init__(self, connection) -> None:
+        self.connection = connection
+        self.connection.execute("CREATE TABLE IF NOT EXISTS uid_counter (id INTEGER PRIMARY KEY CHECK (id = 0), next_uid INTEGER NOT NULL)")
+        self.connection.commit()
+
+    # Returns the next UID. existing is only read the first time, to migrate a table created before the counter
+    def allocate(self, existing=()) -> str:
+        if self.connection.execute("SELECT next_uid FROM uid_counter WHERE id = 0").fetchone() is None:
+            self.connection.execute("INSERT OR IGNORE INTO uid_counter VALUES (0, ?)", (first_free_uid(existing),))
+        rows = self.connection.execute("UPDATE uid_counter SET next_uid = next_uid + 1 WHERE id = 0 RETURNING next_uid - 1").fetchall()
+        return str(rows[0][0])
+
+    # Makes sure the counter will never hand out any of the given UIDs, e.g. after importing results
+    def reserve(self, uids) -> None:
+        floor = first_free_uid(uids)
+        self.connection.execute("INSERT OR IGNORE INTO uid_counter VALUES (0, ?)", (floor,))
+        self.connection.execute("UPDATE uid_counter SET next_uid = MAX(next_uid, ?) WHERE id = 0", (floor,))
@@ -0,0 +1,75 @@
+import numpy as np
+
+
+# Finds the longest stable voiced segment of a recording, so analysis can skip leading and trailing silence,
+# breaths and the onset and offset of the vowel
+# The recording is split into short frames. A frame is voiced if its energy is within energy_range_db of the loudest
+# frame and above silence_db (relative to full scale), and its zero-crossing rate is below max_zero_crossing_rate
+# (breaths and other noise cross zero far more often than a sustained vowel). Gaps of up to max_gap_seconds are
+# bridged, and trim_seconds is dropped from each end of the longest voiced run to leave out the transients
+class VoiceActivityDetector:
+    def __init__(self, frame_seconds=0.02, energy_range_db=25, silence_db=-50, max_zero_crossing_rate=0.1,
+            max_gap_seconds=0.1, trim_seconds=0.15, min_seconds=1.0) -> None:
+        self.frame_seconds = frame_seconds
+        self.energy_range_db = energy_range_db
+        self.silence_db = silence_db
+        self.max_zero_crossing_rate = max_zero_crossing_rate
+        self.max_gap_seconds = max_gap_seconds
+        self.trim_seconds = trim_seconds
+        self.min_seconds = min_seconds
+
+    # Returns the energy (dB relative to full scale) and zero-crossing rate of each frame
+    # Integer samples are scaled by their type's range, floating point samples are taken as [-1, 1]
+    def frame_features(self, samples: np.ndarray, sample_rate: float) -> tuple:
+        frame_length = max(int(self.frame_seconds * sample_rate), 2)
+        n_frames = len(samples) // frame_length
+        frames = np.asarray(samples[:n_frames * frame_length], dtype=np.float32).reshape(n_frames, frame_length)
+        full_scale = np.iinfo(samples.dtype).max if np.issubdtype(samples.dtype, np.integer) else 1
+        energy = 10 * np.log10(np.mean(frames * frames, axis=1) / full_scale ** 2 + 1e-20)
+        signs = np.signbit(frames)
+        zero_crossing_rate = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame_length - 1)
+        return energy, zero_crossing_rate
+
+    # Returns a mask of the voiced frames
+    def voiced_frames(self, samples: np.ndarray, sample_rate: float) -> np.ndarray:
+        energy, zero_crossing_rate = self.frame_features(samples, sample_rate)
+        if len(energy) == 0:
+            return np.zeros(0, dtype=bool)
+        floor = max(energy.max() - self.energy_range_db, self.silence_db)
+        voiced = (energy >= floor) & (zero_crossing_rate <= self.max_zero_crossing_rate)
+
+        # Bridge short unvoiced gaps between voiced frames
+        max_gap = int(self.max_gap_seconds / self.frame_seconds)
+        starts, ends = runs(~voiced)
+        for start, end in zip(starts, ends):
+            if end - start <= max_gap and start > 0 and end < len(voiced):
+                voiced[start:end] = True
+        return voiced
+
+    # Returns the (start, end) sample indices of the longest stable voiced segment, or None if it is too short
+    def find_segment(self, samples: np.ndarray, sample_rate: float) -> tuple:
+        voiced = self.voiced_frames(samples, sample_rate)
+        starts, ends = runs(voiced)
+        if len(starts) == 0:
+            return None
+        longest = np.argmax(ends - starts)
+        frame_length = max(int(self.frame_seconds * sample_rate), 2)
+        trim = int(self.trim_seconds * sample_rate)
+        start = starts[longest] * frame_length + trim
+        end = ends[longest] * frame_length - trim
+        if end - start < self.min_seconds * sample_rate:
+            return None
+        return int(start), int(end)
+
+    # Returns the longest stable voiced segment as a view of the samples, or all of them if there is none
+    def select(self, samples: np.ndarray, sample_rate: float) -> np.ndarray:
+        segment = self.find_segment(samples, sample_rate)
+        if segment is None:
+            return samples
+        return samples[segment[0]:segment[1]]
+
+
+# Returns the start and end (exclusive) indices of each run of True values in a mask
+def runs(mask: np.ndarray) -> tuple:
+    edges = np.diff(np.concatenate(([False], mask, [False])).astype(np.int8))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
@@ -0,0 +1,65 @@
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+from src.AudioBuffer import AudioBuffer
+
+# Stands in for a PyAV AudioFrame
+def audio_frame(samples, sample_rate=48000, channels=1, planar=False):
+    return SimpleNamespace(
+        to_ndarray=lambda: samples,
+        sample_rate=sample_rate,
+        layout=SimpleNamespace(channels=[None] * channels),
+        format=SimpleNamespace(is_planar=planar),
+    )
+
+class TestAudioBuffer(unittest.TestCase):
+    def test_write(self):
+        audio_buffer = AudioBuffer(1, 100)
+        audio_buffer.write(np.arange(30, dtype=np.int16), 100)
+        audio_buffer.write(np.arange(30, 60, dtype=np.int16), 100)
+        self.assertEqual(len(audio_buffer), 60)
+        np.testing.assert_array_equal(audio_buffer.to_array(), np.arange(60))
+        # Before wrapping, the samples are returned without copying
+        self.assertTrue(np.shares_memory(audio_buffer.to_array(), audio_buffer.samples))
+
+    # Once full, only the latest samples are kept
+    def test_wrap(self):
+        audio_buffer = AudioBuffer(1, 100)
+        for start in range(0, 250, 30):
+            audio_buffer.write(np.arange(start, start + 30, dtype=np.int16), 100)
+        self.assertEqual(len(audio_buffer), 100)
+        np.testing.assert_array_equal(audio_buffer.to_array(), np.arange(170, 270))
+
+        audio_buffer.write(np.arange(1000, 1250, dtype=np.int16), 100)
+        np.testing.assert_array_equal(audio_buffer.to_array(), np.arange(1150, 1250))
+
+        audio_buffer.clear()
+        self.assertEqual(len(audio_buffer), 0)
+
+    # Packed stereo frames interleave their channels, planar frames have one row per channel
+    def test_write_frame(self):
+        left = np.array([100, 200, 300], dtype=np.int16)
+        right = np.array([300, 400, 500], dtype=np.int16)
+        audio_buffer = AudioBuffer(1, 48000)
+        audio_buffer.write_frame(audio_frame(np.column_stack([left, right]).reshape(1, -1), channels=2))
+        audio_buffer.write_frame(audio_frame(np.stack([left, right]), channels=2, planar=True))
+        audio_buffer.write_frame(audio_frame(np.array([[0.5, -0.5]], dtype=np.float32)))
+        np.testing.assert_array_equal(audio_buffer.to_array(), [200, 300, 400, 200, 300, 400, 16384, -16384])
+
+    # A tone captured in 20 ms frames at 48 kHz should come out as the same tone at 44.1 kHz, with no seams between frames
+    def test_resample(self):
+        t = np.arange(48000) / 48000
+        tone = np.round(10000 * np.sin(2 * np.pi * 200 * t)).astype(np.int16)
+        audio_buffer = AudioBuffer(2, 44100)
+        for start in range(0, len(tone), 960):
+            audio_buffer.write_frame(audio_frame(tone[np.newaxis, start:start + 960]))
+
+        samples = audio_buffer.to_array()
+        self.assertLessEqual(abs(len(samples) - 44100), 1)
+        expected = 10000 * np.sin(2 * np.pi * 200 * np.arange(len(samples)) / 44100)
+        self.assertLess(np.abs(samples - expected).max(), 20)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from src.BatchExtractor import BatchExtractor, extract_file, find_recordings
+from src.ResultsManager import ResultsManager
+
+# Kills the worker process on recordings named crash*.wav, as a crash in native code would
+def crashing_extract_file(path, labels=None, cache_directory=None):
+    if os.path.basename(path).startswith('crash'):
+        os._exit(1)
+    return extract_file(path, labels, cache_directory)
+
+class TestBatchExtractor(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.recordings = os.path.join(self.directory, 'recordings')
+        os.mkdir(self.recordings)
+        for name in ['a.wav', 'b.wav']:
+            shutil.copy('tests/test.wav', os.path.join(self.recordings, name))
+        with open(os.path.join(self.recordings, 'broken.wav'), 'wb') as f:
+            f.write(b'not a wav file')
+        self.results_file = os.path.join(self.directory, 'results.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_find_recordings(self):
+        paths = find_recordings(self.recordings)
+        self.assertEqual([os.path.basename(path) for path in paths], ['a.wav', 'b.wav', 'broken.wav'])
+
+        manifest = os.path.join(self.directory, 'manifest.txt')
+        with open(manifest, 'w') as f:
+            f.write('# clinic batch\nrecordings/b.wav\n\n')
+        self.assertEqual(find_recordings(manifest), [os.path.join(self.directory, 'recordings/b.wav')])
+
+    # A broken file should not stop the rest of the batch, and completed files are skipped on the next run
+    def test_run(self):
+        results_manager = ResultsManager(self.results_file)
+        batch_extractor = BatchExtractor(results_manager, workers=2, chunk_size=2, labels=ResultsManager.feature_names)
+        updates = []
+        summary = batch_extractor.run(find_recordings(self.recordings), lambda *args: updates.append(args))
+
+        self.assertEqual(summary['added'], 2)
+        self.assertEqual(list(summary['failed']), [os.path.abspath(os.path.join(self.recordings, 'broken.wav'))])
+        self.assertEqual(updates[-1], (3, 3, 1))
+
+        reloaded = ResultsManager(self.results_file)
+        self.assertEqual(len(reloaded.results), 2)
+        self.assertAlmostEqual(reloaded.get_features(reloaded.get_unpredicted()[0])['HNR'], 20.432, places=3)
+
+        resumed = BatchExtractor(reloaded, workers=1).run(find_recordings(self.recordings))
+        self.assertEqual(resumed['skipped'], 2)
+        self.assertEqual(resumed['total'], 1)
+        self.assertEqual(len(ResultsManager(self.results_file).results), 2)
+
+    # Identical recordings should only be analysed once when a feature cache is used
+    def test_cache(self):
+        cache_directory = os.path.join(self.directory, 'cache')
+        batch_extractor = BatchExtractor(ResultsManager(self.results_file), workers=1, labels=ResultsManager.feature_names, cache_directory=cache_directory)
+        summary = batch_extractor.run(find_recordings(self.recordings))
+        self.assertEqual(summary['added'], 2)
+        self.assertEqual(len(os.listdir(cache_directory)), 1)
+
+    # A worker dying only fails the file it was extracting, even with more files queued than workers
+    def test_worker_crash(self):
+        shutil.copy('tests/test.wav', os.path.join(self.recordings, 'crash.wav'))
+        for i in range(4):
+            shutil.copy('tests/test.wav', os.path.join(self.recordings, f'c{i}.wav'))
+        batch_extractor = BatchExtractor(ResultsManager(self.results_file), workers=2, labels=ResultsManager.feature_names)
+        with mock.patch('src.BatchExtractor.extract_file', crashing_extract_file):
+            summary = batch_extractor.run(find_recordings(self.recordings))
+
+        self.assertEqual(summary['added'], 6)
+        self.assertEqual(sorted(os.path.basename(path) for path in summary['failed']), ['broken.wav', 'crash.wav'])
+        self.assertIn('BrokenProcessPool', summary['failed'][os.path.abspath(os.path.join(self.recordings, 'crash.wav'))])
+
+    # A chunk logged as done but never saved is extracted again on resume rather than skipped or added twice
+    def test_crash_before_save(self):
+        results_manager = ResultsManager(self.results_file)
+        batch_extractor = BatchExtractor(results_manager, workers=1, chunk_size=2, labels=ResultsManager.feature_names)
+        with mock.patch.object(results_manager, 'save', side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                batch_extractor.run(find_recordings(self.recordings))
+        results_manager.storage.close()
+
+        reloaded = ResultsManager(self.results_file)
+        self.assertEqual(len(reloaded.results), 0)
+        summary = BatchExtractor(reloaded, workers=1).run(find_recordings(self.recordings))
+        self.assertEqual(summary['skipped'], 0)
+        self.assertEqual(summary['added'], 2)
+        self.assertEqual(len(ResultsManager(self.results_file).results), 2)
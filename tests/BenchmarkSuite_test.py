@@ -0,0 +1,45 @@
+import unittest
+
+from benchmarks.suite import compare
+
+class TestBenchmarkSuite(unittest.TestCase):
+    baseline = {
+        'storage/csv/1000/load': 0.010,
+        'storage/csv/1000/save': 0.020,
+        'storage/csv/1000/add': 0.001,
+        'inference/SVM/train': 0.050,
+    }
+
+    def test_tolerance(self):
+        results = {'storage/csv/1000/load': 0.0125, 'storage/csv/1000/save': 0.015, 'storage/csv/1000/add': 0.0011}
+        comparison = compare(results, self.baseline, tolerance=0.2, min_difference=0)
+        self.assertEqual(comparison['regressions'], ['storage/csv/1000/load'])
+        self.assertEqual(comparison['improvements'], ['storage/csv/1000/save'])
+        self.assertAlmostEqual(comparison['ratios']['storage/csv/1000/add'], 1.1)
+
+        comparison = compare(results, self.baseline, tolerance=0.3, min_difference=0)
+        self.assertEqual(comparison['regressions'], [])
+        self.assertEqual(comparison['improvements'], ['storage/csv/1000/save'])
+
+    # Differences below the timer noise are not flagged, however large the ratio
+    def test_min_difference(self):
+        results = {'storage/csv/1000/add': 0.003, 'storage/csv/1000/load': 0.020}
+        comparison = compare(results, self.baseline, tolerance=0.2, min_difference=0.005)
+        self.assertEqual(comparison['regressions'], ['storage/csv/1000/load'])
+        self.assertAlmostEqual(comparison['ratios']['storage/csv/1000/add'], 3)
+
+        comparison = compare({'storage/csv/1000/add': 0.001}, {'storage/csv/1000/add': 0}, min_difference=0)
+        self.assertEqual(comparison['ratios']['storage/csv/1000/add'], float('inf'))
+        self.assertEqual(comparison['regressions'], ['storage/csv/1000/add'])
+
+    # Measurements are only missing if their part was run, so running one part is not reported as losing the others
+    def test_new_and_missing(self):
+        results = {'storage/csv/1000/load': 0.010, 'storage/sqlite/1000/load': 0.005, 'imports/Doctor view': 0.3}
+        comparison = compare(results, self.baseline)
+        self.assertEqual(comparison['new'], ['imports/Doctor view', 'storage/sqlite/1000/load'])
+        self.assertEqual(comparison['missing'], ['storage/csv/1000/add', 'storage/csv/1000/save'])
+        self.assertEqual(list(comparison['ratios']), ['storage/csv/1000/load'])
+        self.assertEqual(comparison['regressions'] + comparison['improvements'], [])
+
+if __name__ == '__main__':
+    unittest.main()
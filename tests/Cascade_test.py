@@ -0,0 +1,97 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import StratifiedKFold, train_test_split
+
+from src.Cascade import Cascade
+from src.Classifier import SVM, AdaBoost, RandomForest, Voting
+
+class TestCascade(unittest.TestCase):
+    dataset = pd.read_csv('data/parkinsons.data')
+    y = dataset['status']
+    X = dataset.drop(['name', 'status', 'RPDE', 'DFA', 'spread1', 'spread2', 'D2', 'PPE'], axis=1)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=0, stratify=y)
+    voting = Voting(SVM({'random_state': 0}), RandomForest({'random_state': 0}), AdaBoost({'random_state': 0}))
+    voting.train(X_train, y_train)
+
+    def test_uncalibrated(self):
+        cascade = Cascade(self.voting)
+        np.testing.assert_array_equal(cascade.predict(self.X_test), self.voting.predict(self.X_test))
+        np.testing.assert_array_equal(cascade.predict_probability(self.X_test), self.voting.predict_probability(self.X_test))
+        self.assertEqual(cascade.get_stats()['early_exits'], 0)
+
+    def test_early_exit(self):
+        cascade = Cascade(self.voting, first=0, threshold=0.9)
+        member = self.voting.clf.estimators_[0].predict_proba(self.X_test)
+        exits = member.max(axis=1) > 0.9
+        self.assertTrue(0 < exits.sum() < len(exits))
+
+        probabilities = cascade.predict_probability(self.X_test)
+        np.testing.assert_array_equal(probabilities[exits], member[exits])
+        np.testing.assert_array_equal(probabilities[~exits], self.voting.predict_probability(self.X_test[~exits]))
+
+        for i in range(3):
+            cascade.predict(self.X_test.iloc[i])
+        stats = cascade.get_stats()
+        self.assertEqual(stats['calls'], 4)
+        self.assertEqual(stats['predictions'], len(self.X_test) + 3)
+        self.assertEqual(stats['early_exits'], exits.sum() + exits[:3].sum())
+        self.assertAlmostEqual(stats['early_exit_rate'], stats['early_exits'] / stats['predictions'])
+        self.assertGreater(stats['mean_seconds_per_prediction'], 0)
+
+    def test_calibrate(self):
+        cascade = Cascade(self.voting)
+        result = cascade.calibrate(self.X_train, self.y_train)
+        self.assertEqual(cascade.threshold, result['threshold'])
+        self.assertGreater(result['early_exit_rate'], 0)
+
+        # On held-out data, early exits only happen above every confidence at which the first member disagreed
+        cascade = Cascade(self.voting, first=0)
+        result = cascade.calibrate(self.X_test, self.y_test, cv=None)
+        np.testing.assert_array_equal(cascade.predict(self.X_test), self.voting.predict(self.X_test))
+        self.assertEqual(result['ensemble_accuracy'], np.mean(self.voting.predict(self.X_test) == self.y_test))
+
+        # so the cascade's accuracy is only reported on rows that were not used to pick the threshold
+        correct, exits = 0, 0
+        for pick, score in StratifiedKFold(2, shuffle=True, random_state=0).split(self.X_test, self.y_test):
+            half = Cascade(self.voting, first=0)
+            half.calibrate(self.X_test.iloc[pick], self.y_test.iloc[pick], cv=None)
+            correct += np.sum(half.predict(self.X_test.iloc[score]) == self.y_test.iloc[score])
+            exits += half.get_stats()['early_exits']
+        self.assertAlmostEqual(result['cascade_accuracy'], correct / len(self.X_test))
+        self.assertAlmostEqual(result['early_exit_rate'], exits / len(self.X_test))
+
+    # Without enough disagreements to estimate the threshold from, nothing exits early
+    def test_calibrate_without_disagreements(self):
+        member = self.voting.clf.le_.classes_[self.voting.clf.estimators_[0].predict_proba(self.X_test).argmax(axis=1)]
+        agree = member == self.voting.predict(self.X_test)
+        disagreements = int((~agree).sum())
+        self.assertLess(disagreements, Cascade.min_disagreements)
+
+        for X, y in [(self.X_test[agree], self.y_test[agree]), (self.X_test, self.y_test)]:
+            cascade = Cascade(self.voting, first=0)
+            result = cascade.calibrate(X, y, cv=None)
+            self.assertEqual(result['threshold'], float('inf'))
+            self.assertEqual(result['early_exit_rate'], 0)
+            self.assertEqual(result['cascade_accuracy'], result['ensemble_accuracy'])
+            cascade.predict(X)
+            self.assertEqual(cascade.get_stats()['early_exits'], 0)
+
+    def test_save_load(self):
+        directory = tempfile.mkdtemp()
+        try:
+            cascade = Cascade(self.voting, first=0, threshold=0.9)
+            cascade.save(os.path.join(directory, 'Cascade'))
+            loaded = Cascade.load(os.path.join(directory, 'Cascade'))
+            self.assertEqual((loaded.first, loaded.threshold), (0, 0.9))
+            np.testing.assert_array_equal(loaded.predict_probability(self.X_test), cascade.predict_probability(self.X_test))
+            self.assertIsNone(Cascade.load(os.path.join(directory, 'missing')))
+        finally:
+            shutil.rmtree(directory)
+
+if __name__ == '__main__':
+    unittest.main()
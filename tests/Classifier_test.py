@@ -102,6 +102,15 @@ class TestClassifier(unittest.TestCase):
         # Ensure score including unseen data is greater than 70%
         self.assertGreater(score, 0.7)
 
+    # Each fold's score and timings are available alongside the mean
+    def test_cross_validate_details(self):
+        svm = SVM({'C': 10})
+        details = svm.cross_validate(self.X, self.y, details=True)
+        self.assertEqual(len(details['scores']), 10)
+        self.assertEqual(len(details['fit_seconds']), 10)
+        self.assertAlmostEqual(details['mean_score'], np.mean(details['scores']))
+        self.assertEqual(svm.cross_validate(self.X, self.y), details['mean_score'])
+
     # Test the predict function on a arbitrary set of features in the dataset
     def test_predict(self):
         test_features = self.X.iloc[0]
@@ -114,6 +123,16 @@ class TestClassifier(unittest.TestCase):
 
         self.assertEqual(test_status, prediction)
 
+    # Test that a whole feature matrix is scored in one call, regardless of column order
+    def test_predict_batch(self):
+        svm = SVM()
+        svm.train(self.X_train, self.y_train)
+
+        expected = svm.predict(self.X_test)
+        shuffled = self.X_test[list(reversed(self.X_test.columns))]
+        self.assertTrue((svm.predict(shuffled) == expected).all())
+        self.assertEqual(len(svm.predict(self.X_test.iloc[:0])), 0)
+
     # Ensure classifier confidence is above 70%
     def test_predict_probability(self):
         test_features = self.X.iloc[0]
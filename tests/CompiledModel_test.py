@@ -0,0 +1,104 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.Classifier import SVM, AdaBoost, RandomForest, Voting
+from src.CompiledModel import CompiledModel
+
+class TestCompiledModel(unittest.TestCase):
+    dataset = pd.read_csv('data/parkinsons.data')
+    y = dataset['status']
+    X = dataset.drop(['name', 'status', 'RPDE', 'DFA', 'spread1', 'spread2', 'D2', 'PPE'], axis=1)
+    # The dataset with nearby points added, so some fall close to the decision boundaries
+    rng = np.random.default_rng(0)
+    perturbed = pd.DataFrame(X.values[rng.integers(0, len(X), 2000)] * rng.normal(1, 0.05, (2000, X.shape[1])), columns=X.columns)
+    X_test = pd.concat([X, perturbed], ignore_index=True)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def compiled(self, classifier):
+        return CompiledModel.load(classifier.export(os.path.join(self.directory, type(classifier).__name__ + '.npz')))
+
+    def assertMatches(self, classifier, compiled, exact_probabilities):
+        np.testing.assert_array_equal(compiled.predict(self.X_test), classifier.predict(self.X_test))
+        expected = classifier.predict_probability(self.X_test)
+        if exact_probabilities:
+            np.testing.assert_array_equal(compiled.predict_proba(self.X_test), expected)
+        else:
+            np.testing.assert_allclose(compiled.predict_proba(self.X_test), expected, rtol=0, atol=1e-9)
+
+    def test_svm(self):
+        svm = SVM()
+        svm.load('models/SVM')
+        compiled = self.compiled(svm)
+        self.assertMatches(svm, compiled, exact_probabilities=False)
+        self.assertEqual(compiled.feature_names(), svm.feature_names())
+
+        for params in [{'kernel': 'poly', 'gamma': 1e-4, 'degree': 2}, {'kernel': 'sigmoid', 'gamma': 1e-5}, {'C': 100, 'gamma': 1e-3}]:
+            svm = SVM(params)
+            svm.train(self.X, self.y)
+            self.assertMatches(svm, self.compiled(svm), exact_probabilities=False)
+
+    def test_trees(self):
+        rf = RandomForest({'random_state': 0})
+        rf.train(self.X, self.y)
+        self.assertMatches(rf, self.compiled(rf), exact_probabilities=True)
+
+        ada = AdaBoost({'random_state': 0})
+        ada.train(self.X, self.y)
+        self.assertMatches(ada, self.compiled(ada), exact_probabilities=True)
+
+    # scikit-learn before 1.4 stores weighted sample counts in each leaf rather than class fractions
+    def test_tree_counts(self):
+        rf = RandomForest({'n_estimators': 20, 'random_state': 0})
+        rf.train(self.X, self.y)
+        expected = rf.predict_probability(self.X_test)
+        for i, tree in enumerate(rf.clf.estimators_):
+            tree.tree_.value[:] *= 10 + i
+        np.testing.assert_allclose(self.compiled(rf).predict_proba(self.X_test), expected, rtol=0, atol=1e-12)
+
+    # SAMME.R models, from scikit-learn before 1.6, combine probabilities and are not supported
+    def test_samme_r(self):
+        ada = AdaBoost({'n_estimators': 5, 'random_state': 0})
+        ada.train(self.X, self.y)
+        ada.clf.algorithm = 'SAMME.R'
+        with self.assertRaises(ValueError):
+            self.compiled(ada)
+
+    def test_voting(self):
+        members = [SVM({'random_state': 0}), RandomForest({'n_estimators': 20, 'random_state': 0}), AdaBoost({'random_state': 0})]
+        vc = Voting(*members)
+        vc.train(self.X, self.y)
+        self.assertMatches(vc, self.compiled(vc), exact_probabilities=False)
+
+    # A single row, as a list of Series like the patient page passes it, or a reordered DataFrame
+    def test_input(self):
+        svm = SVM()
+        svm.load('models/SVM')
+        compiled = self.compiled(svm)
+        row = self.X.iloc[0]
+        self.assertEqual(compiled.predict([row])[0], svm.predict([row])[0])
+        reordered = self.X[list(reversed(self.X.columns))]
+        np.testing.assert_array_equal(compiled.predict(reordered), svm.predict(self.X))
+        self.assertEqual(len(compiled.predict(self.X.iloc[:0])), 0)
+
+    # Loading and predicting should not import scikit-learn or joblib
+    def test_imports(self):
+        svm = SVM()
+        svm.load('models/SVM')
+        path = svm.export(os.path.join(self.directory, 'SVM.npz'))
+        code = (f"import sys; from src.CompiledModel import CompiledModel; "
+                f"CompiledModel.load({path!r}).predict([[1.0] * 16]); "
+                f"print(any(name.split('.')[0] in ('sklearn', 'joblib') for name in sys.modules))")
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), 'False')
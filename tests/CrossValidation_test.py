@@ -0,0 +1,61 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import cross_val_score
+from sklearn.svm import SVC
+
+from src.CrossValidation import CrossValidationCache, cross_validate, dataset_hash
+
+class TestCrossValidation(unittest.TestCase):
+    dataset = pd.read_csv('data/parkinsons.data')
+    y = dataset['status']
+    X = dataset.drop(['name', 'status', 'RPDE', 'DFA', 'spread1', 'spread2', 'D2', 'PPE'], axis=1)
+
+    # Scores should match cross_val_score exactly, including SVMs fitted on precomputed kernels
+    def test_scores(self):
+        estimators = [
+            SVC(),
+            SVC(C=100, gamma=1e-3),
+            SVC(kernel='poly', gamma=1e-4, degree=2),
+            SVC(kernel='sigmoid', gamma=1e-5),
+            RandomForestClassifier(n_estimators=20, random_state=0),
+        ]
+        for estimator in estimators:
+            expected = cross_val_score(estimator, self.X.values, self.y.values, scoring='accuracy', cv=10)
+            results = cross_validate(estimator, self.X, self.y, cache=CrossValidationCache())
+            np.testing.assert_array_equal(results['scores'], expected)
+            self.assertAlmostEqual(results['mean_score'], np.mean(expected))
+            self.assertEqual(len(results['fit_seconds']), 10)
+            self.assertEqual(len(results['score_seconds']), 10)
+
+    def test_workers(self):
+        estimator = RandomForestClassifier(n_estimators=10, random_state=0)
+        serial = cross_validate(estimator, self.X, self.y, cv=5, workers=1)
+        parallel = cross_validate(estimator, self.X, self.y, cv=5, workers=4)
+        self.assertEqual(serial['scores'], parallel['scores'])
+
+    # A sweep over C computes the folds and the kernel once, and gamma='scale' once per fold
+    def test_cache(self):
+        cache = CrossValidationCache()
+        for C in [1, 10, 100]:
+            cross_validate(SVC(C=C, gamma=1e-3), self.X, self.y, cache=cache)
+        self.assertEqual(cache.get_stats()['misses'], 2)
+        self.assertEqual(cache.get_stats()['hits'], 2 + 3 * 10 - 1)
+
+        cache = CrossValidationCache()
+        for C in [1, 10]:
+            cross_validate(SVC(C=C), self.X, self.y, cache=cache)
+        self.assertEqual(cache.get_stats()['misses'], 1 + 10)
+
+        # Changing the data changes the key
+        self.assertNotEqual(dataset_hash(self.X.values, self.y.values), dataset_hash(self.X.values[:-1], self.y.values[:-1]))
+        self.assertEqual(dataset_hash(self.X.values, self.y.values), dataset_hash(self.X.values.copy(), self.y.values.copy()))
+
+    def test_evict(self):
+        cache = CrossValidationCache(max_bytes=len(self.X) ** 2 * 8 * 1.5)
+        for gamma in [1e-3, 1e-2, 1e-1]:
+            cross_validate(SVC(gamma=gamma), self.X, self.y, cache=cache, workers=1)
+        self.assertGreater(cache.get_stats()['evictions'], 0)
+        self.assertLessEqual(cache.get_stats()['bytes'], cache.max_bytes)
@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.FeatureCache import FeatureCache
+from src.FeatureExtractor import FeatureExtractor
+
+class TestFeatureCache(unittest.TestCase):
+    sound_file = 'tests/test.wav'
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = FeatureCache(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    # A second extractor for the same recording should read every feature back without analysing anything
+    def test_hit(self):
+        features = FeatureExtractor(self.sound_file, cache=self.cache).get_features()
+        feature_extractor = FeatureExtractor(self.sound_file, cache=self.cache)
+        self.assertEqual(feature_extractor.get_features(), features)
+        self.assertEqual(feature_extractor.analysis, {})
+
+        stats = self.cache.get_stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hits'], 1)
+
+    # Features extracted lazily are added to the cached entry as they are requested
+    def test_lazy(self):
+        FeatureExtractor(self.sound_file, lazy=True, cache=self.cache).get_dataset_features(['DFA'])
+        feature_extractor = FeatureExtractor(self.sound_file, lazy=True, cache=self.cache)
+        feature_extractor.get_dataset_features(['DFA', 'HNR'])
+        self.assertNotIn('DFA', feature_extractor.analysis)
+        self.assertIn('voice_measures', feature_extractor.analysis)
+
+        features = FeatureExtractor(self.sound_file, lazy=True, cache=self.cache).get_dataset_features(['DFA', 'HNR'])
+        self.assertEqual(set(features), {'DFA', 'HNR'})
+        self.assertEqual(self.cache.get_stats()['hits'], 2)
+
+    # Changing the analysis parameters or the recording should change the key
+    def test_key(self):
+        feature_extractor = FeatureExtractor(self.sound_file, lazy=True)
+        key = self.cache.key(feature_extractor)
+        self.assertEqual(key, self.cache.key(FeatureExtractor(self.sound_file, lazy=True)))
+
+        feature_extractor.voice_report_params = (2, 0, 75, 600, 1.3, 1.6, 0.03, 0.45)
+        self.assertNotEqual(key, self.cache.key(feature_extractor))
+
+        feature_extractor = FeatureExtractor(self.sound_file, lazy=True)
+        feature_extractor.sound.values[0, 0] += 1e-6
+        self.assertNotEqual(key, self.cache.key(feature_extractor))
+
+    # The least recently used entries should be evicted once the cache is over its limit
+    def test_evict(self):
+        cache = FeatureCache(self.directory, max_bytes=300)
+        features = {'feature' + str(i): float(i) for i in range(5)}
+        for i in range(5):
+            cache.put(str(i), features)
+            os.utime(os.path.join(self.directory, f'{i}.json'), ns=(i * 10**9, i * 10**9))
+            # Reading an entry marks it as recently used
+            if i == 2:
+                cache.get('0')
+
+        self.assertLessEqual(cache.get_stats()['bytes'], 300)
+        self.assertGreater(cache.get_stats()['evictions'], 0)
+        self.assertIsNotNone(cache.get('0'))
+        self.assertIsNone(cache.get('1'))
+        self.assertIsNotNone(cache.get('4'))
+
+        # A new instance should pick up the size of what is already on disk
+        self.assertEqual(FeatureCache(self.directory).get_stats()['bytes'], cache.get_stats()['bytes'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,9 @@
 import unittest
+from unittest import mock
+import numpy as np
 import pandas as pd
+import parselmouth as pm
+import pydub
 
 from src.FeatureExtractor import FeatureExtractor
 
@@ -38,4 +42,119 @@ class TestFeatureExtractor(unittest.TestCase):
         df = feature_extractor.to_dataframe()
         self.assertEqual(type(df), pd.DataFrame)
         for label in self.dataset_labels:
-            self.assertTrue(label in df.columns)
\ No newline at end of file
+            self.assertTrue(label in df.columns)
+
+    # Value should fall within the range seen in the reference dataset
+    def test_calculate_rpde(self):
+        feature_extractor = FeatureExtractor(self.sound_file)
+        dataset = pd.read_csv('data/parkinsons.data')
+        rpde = feature_extractor.calculate_rpde()
+        self.assertEqual(rpde, feature_extractor.features['RPDE'])
+        self.assertTrue(dataset['RPDE'].min() <= rpde <= dataset['RPDE'].max())
+
+        # A pure tone recurs at a single period, noise at almost any period
+        t = np.arange(44100 * 2) / 44100
+        tone = FeatureExtractor(np.sin(2 * np.pi * 150 * t)).calculate_rpde()
+        noise = FeatureExtractor(np.random.default_rng(0).normal(size=44100 * 2)).calculate_rpde()
+        self.assertLess(tone, 0.2)
+        self.assertGreater(noise, 0.8)
+
+    def test_calculate_dfa(self):
+        feature_extractor = FeatureExtractor(self.sound_file)
+        dataset = pd.read_csv('data/parkinsons.data')
+        dfa = feature_extractor.calculate_dfa()
+        self.assertEqual(dfa, feature_extractor.features['DFA'])
+        self.assertTrue(dataset['DFA'].min() <= dfa <= dataset['DFA'].max())
+
+        # White noise scales with an exponent of 0.5, its integral (brown noise) with 1.5
+        scales = np.geomspace(0.001, 0.02, 10)
+        noise = np.random.default_rng(0).normal(size=44100 * 2)
+        white = FeatureExtractor(noise).calculate_dfa(scales=scales)
+        brown = FeatureExtractor(np.cumsum(noise)).calculate_dfa(scales=scales)
+        self.assertAlmostEqual(np.log(white / (1 - white)), 0.5, delta=0.1)
+        self.assertAlmostEqual(np.log(brown / (1 - brown)), 1.5, delta=0.1)
+
+    def test_calculate_d2(self):
+        feature_extractor = FeatureExtractor(self.sound_file)
+        dataset = pd.read_csv('data/parkinsons.data')
+        d2 = feature_extractor.calculate_d2()
+        self.assertEqual(d2, feature_extractor.features['D2'])
+        self.assertTrue(dataset['D2'].min() <= d2 <= dataset['D2'].max())
+
+        # A tone traces a closed curve (dimension 1), noise fills the embedding space (dimension 4)
+        t = np.arange(44100 * 2) / 44100
+        tone = FeatureExtractor(np.sin(2 * np.pi * 151.3 * t)).calculate_d2()
+        noise = FeatureExtractor(np.random.default_rng(0).normal(size=44100 * 2)).calculate_d2()
+        self.assertAlmostEqual(tone, 1, delta=0.2)
+        self.assertGreater(noise, 3.5)
+
+    # Pitch-based features should fall within the ranges seen in the reference dataset
+    def test_pitch_features(self):
+        feature_extractor = FeatureExtractor(self.sound_file)
+        dataset = pd.read_csv('data/parkinsons.data')
+        for feature, value in [('PPE', feature_extractor.calculate_ppe()),
+                ('spread1', feature_extractor.calculate_spread1()), ('spread2', feature_extractor.calculate_spread2())]:
+            self.assertEqual(value, feature_extractor.features[feature])
+            self.assertTrue(dataset[feature].min() <= value <= dataset[feature].max())
+
+    # PPE, spread1 and spread2 should share the pitch analysis done for the voice report
+    def test_pitch_computed_once(self):
+        calls = []
+        to_pitch = pm.Sound.to_pitch
+        def counting_to_pitch(sound, *args, **kwargs):
+            calls.append(sound)
+            return to_pitch(sound, *args, **kwargs)
+
+        with mock.patch.object(pm.Sound, 'to_pitch', counting_to_pitch):
+            feature_extractor = FeatureExtractor(self.sound_file)
+            feature_extractor.calculate_ppe()
+            feature_extractor.calculate_spread1()
+            feature_extractor.calculate_spread2()
+        self.assertEqual(len(calls), 1)
+
+    # The structured measures should match the values printed in the voice report, up to Praat's rounding
+    def test_voice_measures(self):
+        feature_extractor = FeatureExtractor(self.sound_file, lazy=True)
+        measures = feature_extractor.extract_voice_measures()
+        report = feature_extractor.extract_voice_report()
+        self.assertEqual(sorted(measures), sorted(list(FeatureExtractor.praat_dataset_labels) + self.dataset_labels[:16]))
+        for label in self.dataset_labels[:16]:
+            self.assertAlmostEqual(measures[label], report[label], delta=abs(report[label]) * 5e-3)
+            self.assertEqual(type(measures[label]), float)
+
+        # A recording with no voice has no pitch or pulses, so every measure is undefined
+        silent = FeatureExtractor(np.zeros(44100), lazy=True)
+        self.assertTrue(all(value is None for value in silent.extract_voice_measures().values()))
+
+    # Raw PCM, as handed over by the WebRTC page, should give the same sound as reading the file
+    def test_pcm(self):
+        segment = pydub.AudioSegment.from_wav(self.sound_file)
+        samples = np.frombuffer(segment.raw_data, dtype=f'<i{segment.sample_width}').reshape(-1, segment.channels)
+        feature_extractor = FeatureExtractor(samples, lazy=True, sample_rate=segment.frame_rate, sample_width=segment.sample_width)
+        from_file = FeatureExtractor(self.sound_file, lazy=True)
+        self.assertEqual(feature_extractor.sound.sampling_frequency, from_file.sound.sampling_frequency)
+        np.testing.assert_array_equal(feature_extractor.sound.values, from_file.sound.values)
+
+        # Floating point samples are used as they are, with one channel per column
+        stereo = np.column_stack([from_file.get_samples(), -from_file.get_samples()])
+        feature_extractor = FeatureExtractor(stereo, lazy=True, sample_rate=44100)
+        self.assertEqual(feature_extractor.sound.n_channels, 2)
+        np.testing.assert_array_equal(feature_extractor.sound.values[1], -from_file.get_samples())
+
+    # Lazily extracting features should only run the analysis they depend on
+    def test_lazy(self):
+        feature_extractor = FeatureExtractor(self.sound_file, lazy=True)
+        self.assertEqual(feature_extractor.analysis, {})
+        self.assertEqual(feature_extractor.features, {})
+
+        praat_labels = self.dataset_labels[:16]
+        features = feature_extractor.get_dataset_features(praat_labels)
+        self.assertEqual(sorted(features), sorted(praat_labels))
+        self.assertEqual(sorted(feature_extractor.analysis), ['pitch', 'pulses', 'voice_measures'])
+
+        feature_extractor.get_features(['D2'])
+        self.assertTrue('embedding' in feature_extractor.analysis)
+        self.assertFalse('RPDE' in feature_extractor.features)
+
+        eager = FeatureExtractor(self.sound_file)
+        self.assertEqual(feature_extractor.get_features(), eager.features)
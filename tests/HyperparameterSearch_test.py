@@ -0,0 +1,94 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from src.Classifier import SVM
+from src.HyperparameterSearch import HyperparameterSearch, grid_candidates, random_candidates
+
+class TestHyperparameterSearch(unittest.TestCase):
+    dataset = pd.read_csv('data/parkinsons.data')
+    y = dataset['status']
+    X = dataset.drop(['name', 'status', 'RPDE', 'DFA', 'spread1', 'spread2', 'D2', 'PPE'], axis=1)
+
+    space = {'C': [1, 100], 'gamma': ['scale', 1e-3]}
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.leaderboard_file = os.path.join(self.directory, 'leaderboard.csv')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def search(self, **kwargs):
+        return HyperparameterSearch('SVM', self.X, self.y, leaderboard_file=self.leaderboard_file, **kwargs)
+
+    def test_candidates(self):
+        self.assertEqual(len(grid_candidates(self.space)), 4)
+        self.assertIn({'C': 100, 'gamma': 1e-3}, grid_candidates(self.space))
+        candidates = random_candidates(self.space, 10)
+        self.assertEqual(len(candidates), 4)
+        self.assertEqual(random_candidates(self.space, 3, seed=1), random_candidates(self.space, 3, seed=1))
+
+    # Running in a process pool should score every candidate exactly as running inline does
+    def test_grid(self):
+        inline = self.search(cv=5, workers=1).grid(self.space)
+        pooled = self.search(cv=5, workers=2).grid(self.space)
+        self.assertEqual(len(inline), 4)
+        self.assertEqual([result['rank'] for result in inline], [1, 2, 3, 4])
+        self.assertEqual([result['mean_score'] for result in inline], sorted((result['mean_score'] for result in inline), reverse=True))
+        scores = lambda leaderboard: {str(result['params']): result['mean_score'] for result in leaderboard}
+        self.assertEqual(scores(inline), scores(pooled))
+
+        leaderboard = pd.read_csv(self.leaderboard_file)
+        self.assertEqual(len(leaderboard), 4)
+        self.assertEqual(leaderboard['mean_score'][0], inline[0]['mean_score'])
+
+    # A candidate well behind the best complete score is dropped before all its folds are scored
+    def test_prune(self):
+        candidates = [{'C': 100}, {'C': 1000}, {'C': 1e-4}]
+        leaderboard = self.search(workers=1).evaluate(candidates)
+        poor = leaderboard[-1]
+        self.assertEqual(poor['params'], {'C': 1e-4})
+        self.assertTrue(poor['pruned'])
+        self.assertLess(poor['folds'], 10)
+
+        leaderboard = self.search(workers=1, prune=False).evaluate(candidates)
+        self.assertFalse(any(result['pruned'] for result in leaderboard))
+        self.assertTrue(all(result['folds'] == 10 for result in leaderboard))
+
+    # Parameters the classifier ignores are reported rather than silently scored with its defaults
+    def test_rejected(self):
+        search = self.search(cv=3, workers=1)
+        leaderboard = search.evaluate([{'C': 10}, {'not_a_param': 1}])
+        self.assertIn('not_a_param', leaderboard[-1]['error'])
+        self.assertEqual(search.best_params(), {'C': 10})
+
+    def test_successive_halving(self):
+        search = self.search(cv=9, workers=1)
+        space = {'C': [0.1, 1, 10, 100, 1000], 'gamma': ['scale', 1e-4, 1e-3, 1e-2, 1e-1]}
+        leaderboard = search.successive_halving(n_candidates=9, factor=3, space=space)
+        self.assertEqual(len(leaderboard), 9)
+        self.assertEqual(sorted(result['folds'] for result in leaderboard), [1] * 6 + [3] * 2 + [9])
+        self.assertEqual(leaderboard[0]['folds'], 9)
+        self.assertEqual(search.best_params(), leaderboard[0]['params'])
+
+    def test_save_best(self):
+        search = self.search(cv=3, workers=1)
+        search.grid(self.space)
+        with mock.patch.object(SVM, 'save') as save:
+            classifier = search.save_best()
+        save.assert_called_once()
+        self.assertEqual(classifier.clf.get_params()['C'], search.best_params()['C'])
+        self.assertEqual(len(classifier.predict(self.X)), len(self.X))
+
+        # Every candidate failed, so nothing is trained or saved
+        search = self.search(cv=3, workers=1)
+        search.evaluate([{'not_a_param': 1}])
+        with mock.patch.object(SVM, 'save') as save:
+            with self.assertRaises(ValueError):
+                search.save_best()
+        save.assert_not_called()
@@ -0,0 +1,155 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import numpy as np
+
+from src.Classifier import SVM
+from src.FeatureExtractor import FeatureExtractor
+from src.Instrumentation import Instrumentation, instrumentation
+from src.Recorder import Recorder, SyntheticBackend
+from src.ResultsManager import ResultsManager
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        instrumentation.disable()
+        instrumentation.clear()
+
+    def test_stats(self):
+        timings = Instrumentation(enabled=True)
+        for seconds in np.arange(1, 101) / 1000:
+            timings.record('stage', seconds)
+        stats = timings.get_stats()['stage']
+        self.assertEqual(stats['count'], 100)
+        self.assertAlmostEqual(stats['mean_seconds'], 0.0505)
+        self.assertAlmostEqual(stats['p50_seconds'], 0.0505)
+        self.assertAlmostEqual(stats['p95_seconds'], 0.09505)
+        self.assertAlmostEqual(stats['p99_seconds'], 0.09901)
+        self.assertAlmostEqual(stats['max_seconds'], 0.1)
+
+    # Only the most recent samples are kept for the percentiles, but every run is counted
+    def test_max_samples(self):
+        timings = Instrumentation(enabled=True, max_samples=10)
+        for seconds in range(20):
+            timings.record('stage', seconds)
+        np.testing.assert_array_equal(timings.get_samples('stage'), np.arange(10, 20))
+        stats = timings.get_stats()['stage']
+        self.assertEqual(stats['count'], 20)
+        self.assertEqual(stats['p50_seconds'], 14.5)
+        self.assertEqual(stats['mean_seconds'], 9.5)
+
+    def test_timers(self):
+        timings = Instrumentation()
+
+        @timings.timed()
+        def function():
+            return 1
+
+        @timings.timed('named')
+        def failing():
+            raise ValueError
+
+        # Disabled timers record nothing
+        with timings.timer('block'):
+            pass
+        self.assertEqual(function(), 1)
+        self.assertEqual(timings.get_stats(), {})
+
+        timings.enable()
+        with timings.timer('block'):
+            pass
+        function()
+        function()
+        with self.assertRaises(ValueError):
+            failing()
+        counts = {stage: stats['count'] for stage, stats in timings.get_stats().items()}
+        self.assertEqual(counts, {'block': 1, 'TestInstrumentation.test_timers.<locals>.function': 2, 'named': 1})
+
+        timings.clear()
+        self.assertEqual(timings.get_stats(), {})
+
+    def test_threads(self):
+        timings = Instrumentation(enabled=True)
+        threads = [threading.Thread(target=lambda: [timings.record('stage', 1.0) for _ in range(1000)]) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(timings.get_stats()['stage']['count'], 4000)
+
+    def test_metrics_file(self):
+        metrics_file = os.path.join(self.directory, 'metrics.jsonl')
+        timings = Instrumentation()
+        timings.metrics_buffer = 2
+        timings.enable(metrics_file)
+        timings.record('a', 0.5)
+        self.assertEqual(os.path.getsize(metrics_file), 0)
+        timings.record('b', 0.25)
+        timings.record('c', 0.125)
+        timings.disable()
+        with open(metrics_file) as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual([(line['stage'], line['seconds']) for line in lines], [('a', 0.5), ('b', 0.25), ('c', 0.125)])
+
+        export_file = os.path.join(self.directory, 'stats.json')
+        timings.export(export_file)
+        with open(export_file) as f:
+            self.assertEqual(f.read().count('"count"'), 3)
+
+    # A metrics file that cannot be opened is reported by enable, and one that cannot be written to is turned off,
+    # never raising into the code being timed
+    def test_metrics_file_errors(self):
+        timings = Instrumentation()
+        with self.assertRaises(OSError):
+            timings.enable(os.path.join(self.directory, 'missing', 'metrics.jsonl'))
+        self.assertFalse(timings.enabled)
+
+        timings.enable(os.path.join(self.directory, 'metrics.jsonl'))
+        timings.metrics_buffer = 1
+        timings.metrics.close()
+
+        @timings.timed('stage')
+        def function():
+            return 1
+
+        self.assertEqual(function(), 1)
+        self.assertEqual(function(), 1)
+        self.assertIsNone(timings.metrics)
+        self.assertIn('metrics.jsonl', timings.metrics_error)
+        self.assertEqual(timings.get_stats()['stage']['count'], 2)
+
+    # The pipeline's stages are timed through the shared instance
+    def test_pipeline(self):
+        instrumentation.enable()
+        feature_extractor = FeatureExtractor('tests/test.wav', lazy=True)
+        feature_extractor.get_dataset_features(ResultsManager.feature_names)
+
+        recorder = Recorder(SyntheticBackend(np.zeros(44100, dtype=np.int16)))
+        list(recorder.stream(max_seconds=0.5))
+
+        model = SVM()
+        model.load('models/SVM')
+        results_manager = ResultsManager(os.path.join(self.directory, 'results.db'))
+        uid = results_manager.add_results(feature_extractor.get_dataset_features(ResultsManager.feature_names))
+        results_manager.set_status(uid, model.predict(results_manager.get_unpredicted_features(model.feature_names()))[0])
+        results_manager.save()
+        results_manager.storage.close()
+
+        stages = instrumentation.get_stats()
+        for stage in ['FeatureExtractor.pitch', 'FeatureExtractor.pulses', 'FeatureExtractor.voice_measures',
+                      'Classifier.load', 'Classifier.predict', 'ResultsManager.add_results',
+                      'ResultsManager.set_status', 'ResultsManager.save']:
+            self.assertEqual(stages[stage]['count'], 1, stage)
+        # Each 0.25 s chunk is waited for separately
+        self.assertEqual(stages['Recorder.wait']['count'], 2)
+        self.assertNotIn('FeatureExtractor.RPDE', stages)
+
+if __name__ == '__main__':
+    unittest.main()
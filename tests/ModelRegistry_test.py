@@ -0,0 +1,52 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.Classifier import SVM
+from src.ModelRegistry import ModelRegistry
+
+class TestModelRegistry(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        shutil.copy('models/SVM', os.path.join(self.directory, 'SVM'))
+        self.registry = ModelRegistry(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    # The same classifier should be returned until the artifact changes
+    def test_get_cached(self):
+        svm = self.registry.get('SVM')
+        self.assertEqual(type(svm), SVM)
+        self.assertIs(svm, self.registry.get('SVM'))
+
+        stats = self.registry.get_stats()['SVM']
+        self.assertEqual(stats['loads'], 1)
+        self.assertEqual(stats['hits'], 1)
+        self.assertGreater(stats['last_load_seconds'], 0)
+
+    # Touching the file without changing it should not reload, replacing it should
+    def test_reload_on_change(self):
+        path = os.path.join(self.directory, 'SVM')
+        svm = self.registry.get('SVM')
+
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertIs(svm, self.registry.get('SVM'))
+
+        with open(path, 'ab') as f:
+            f.write(b'\0')
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2 * 10**9))
+        reloaded = self.registry.get('SVM')
+        self.assertIsNot(svm, reloaded)
+        self.assertEqual(self.registry.get_stats()['SVM']['loads'], 2)
+
+    def test_get_invalid(self):
+        self.assertIsNone(self.registry.get('NotAModel'))
+        self.assertIsNone(self.registry.get('AdaBoost'))
+
+    def test_invalidate(self):
+        svm = self.registry.get('SVM')
+        self.registry.invalidate('SVM')
+        self.assertIsNot(svm, self.registry.get('SVM'))
@@ -1,6 +1,9 @@
 import unittest
-from src.Recorder import Recorder
+import asyncio
+from src.Recorder import Recorder, SyntheticBackend
 import numpy as np
+import os
+import tempfile
 from os.path import exists
 
 class TestRecorder(unittest.TestCase):
@@ -18,4 +21,58 @@ class TestRecorder(unittest.TestCase):
     def test_play(self):
         recorder = Recorder()
         audio_data = recorder.record(1)
-        recorder.play()
\ No newline at end of file
+        recorder.play()
+
+    # The tests below use a synthetic source instead of the microphone
+    def synthetic_recorder(self, samples, **kwargs):
+        return Recorder(SyntheticBackend(samples, **kwargs))
+
+    def test_stream(self):
+        samples = np.arange(44100, dtype=np.int16)
+        recorder = self.synthetic_recorder(samples)
+        chunks = list(recorder.stream(chunk_seconds=0.25, max_seconds=1))
+        self.assertEqual([chunk.shape for chunk in chunks], [(1, 11025)] * 4)
+        np.testing.assert_array_equal(np.concatenate(chunks, axis=1)[0], samples)
+        # Chunks are views of the preallocated buffer
+        self.assertTrue(all(np.shares_memory(chunk, recorder.audio_data) for chunk in chunks))
+
+    # Stopping early stops capture, leaving only what was recorded
+    def test_stream_stop(self):
+        recorder = self.synthetic_recorder(np.ones(44100 * 5, dtype=np.int16), realtime=True)
+        for i, chunk in enumerate(recorder.stream(chunk_seconds=0.1, max_seconds=5)):
+            if i == 2:
+                break
+        self.assertGreaterEqual(len(recorder.audio_data), 3 * 4410)
+        self.assertLess(len(recorder.audio_data), 44100)
+
+    def test_astream(self):
+        samples = np.arange(22050, dtype=np.int16)
+        recorder = self.synthetic_recorder(samples)
+        async def collect():
+            return [chunk async for chunk in recorder.astream(chunk_seconds=0.1, max_seconds=0.5)]
+        chunks = asyncio.run(collect())
+        self.assertEqual(len(chunks), 5)
+        np.testing.assert_array_equal(np.concatenate(chunks, axis=1)[0], samples)
+
+    # Normalisation should use the largest absolute sample, whatever its sign, and leave silence alone
+    def test_normalise(self):
+        samples = np.array([100, -1000, 500, -32768 // 64], dtype=np.int16)
+        recorder = self.synthetic_recorder(np.tile(samples, 11025))
+        audio_data = recorder.record(1)
+        self.assertEqual(audio_data.dtype, np.int16)
+        self.assertEqual(audio_data.shape, (44100, 1))
+        np.testing.assert_array_equal(audio_data[:4, 0], [3276, -32767, 16383, -16776])
+
+        silent = self.synthetic_recorder(np.zeros(44100, dtype=np.int16))
+        self.assertFalse(silent.record(1).any())
+
+        recorder.play()
+        self.assertIs(recorder.backend.played[0], audio_data)
+
+    def test_synthetic_save(self):
+        recorder = self.synthetic_recorder(np.ones(4410, dtype=np.int16))
+        recorder.record(0.1)
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'test_recorder.wav')
+            recorder.save(filename)
+            self.assertTrue(exists(filename))
@@ -1,3 +1,6 @@
+import os
+import shutil
+import tempfile
 import unittest
 from src.ResultsManager import ResultsManager
 import pandas as pd
@@ -8,7 +11,16 @@ class TestResultsManager(unittest.TestCase):
     'MDVP:Jitter(Abs)': 5.8296e-05, 'MDVP:RAP': 0.0034300000000000003, 'MDVP:PPQ': 0.00345, 'Jitter:DDP': 0.010289999999999999, 
     'MDVP:Shimmer': 0.022639999999999997, 'MDVP:Shimmer(dB)': 0.211, 'Shimmer:APQ3': 0.01098, 'Shimmer:APQ5': 0.01307, 'MDVP:APQ': 0.0181, 
     'Shimmer:DDA': 0.03293, 'NHR': 0.014735, 'HNR': 20.432}
-    results_file = 'tests/test_results.csv'
+    fixture_file = 'tests/test_results.csv'
+
+    # Each test works on a copy of the fixture, so UID counters and saved files stay out of the tree
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.results_file = os.path.join(self.directory, 'test_results.csv')
+        shutil.copy(self.fixture_file, self.results_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
 
     def test_init(self):
         no_results = ResultsManager('randomfile')
@@ -57,6 +69,29 @@ class TestResultsManager(unittest.TestCase):
         results_manager = ResultsManager(self.results_file)
         self.assertEqual(['335','351','385'], results_manager.get_unpredicted())
 
+    def test_get_unpredicted_features(self):
+        results_manager = ResultsManager(self.results_file)
+        features = results_manager.get_unpredicted_features()
+        self.assertEqual(['335','351','385'], list(features.index))
+        self.assertEqual(ResultsManager.feature_names, list(features.columns))
+        self.assertAlmostEqual(features.loc['351', 'HNR'], self.dummy_results['HNR'])
+
+    def test_get_unpredicted_features_skipped(self):
+        results_manager = ResultsManager(os.path.join(self.directory, 'results.csv'))
+        complete = results_manager.add_results(self.dummy_results)
+        incomplete = results_manager.add_results({k: v for k, v in self.dummy_results.items() if k != 'HNR'})
+        features, skipped = results_manager.get_unpredicted_features(return_skipped=True)
+        self.assertEqual([complete], list(features.index))
+        self.assertEqual([incomplete], skipped)
+        self.assertEqual([complete], list(results_manager.get_unpredicted_features().index))
+
+    def test_set_statuses(self):
+        results_manager = ResultsManager(self.results_file)
+        results_manager.set_statuses(['335', '351', '999999'], [1, 0, 1])
+        self.assertEqual(results_manager.get_status('335'), 1)
+        self.assertEqual(results_manager.get_status('351'), 0)
+        self.assertEqual(['385'], results_manager.get_unpredicted())
+
     def test_to_dataframe(self):
         results_manager = ResultsManager(self.results_file)
         df = results_manager.to_dataframe()
@@ -65,8 +100,9 @@ class TestResultsManager(unittest.TestCase):
 
     def test_save(self):
         results_manager = ResultsManager(self.results_file)
-        results_manager.save('tests/new_results.csv')
-        self.assertTrue(exists('tests/new_results.csv'))
-        df = pd.read_csv('tests/new_results.csv', index_col=0).to_dict(orient='index')
+        new_results_file = os.path.join(self.directory, 'new_results.csv')
+        results_manager.save(new_results_file)
+        self.assertTrue(exists(new_results_file))
+        df = pd.read_csv(new_results_file, index_col=0).to_dict(orient='index')
         df = {str(k): v for k, v in df.items()}
         self.assertTrue('335' in df)
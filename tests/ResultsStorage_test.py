@@ -0,0 +1,135 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from src.ResultsManager import ResultsManager
+from src.ResultsStorage import SQLiteStorage
+
+class TestSQLiteStorage(unittest.TestCase):
+    results_file = 'tests/test_results.csv'
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.db_file = os.path.join(self.directory, 'results.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_init(self):
+        results_manager = ResultsManager(self.db_file)
+        self.assertEqual(type(results_manager.storage), SQLiteStorage)
+        self.assertEqual(results_manager.path, self.db_file)
+        self.assertEqual(results_manager.results, {})
+
+    # Imported .csv results should survive a reload, with the same statuses and UIDs
+    def test_import_csv(self):
+        results_manager = ResultsManager(self.db_file)
+        count = results_manager.import_csv(self.results_file)
+        results_manager.save()
+
+        csv_results = ResultsManager(self.results_file)
+        reloaded = ResultsManager(self.db_file)
+        self.assertEqual(count, len(csv_results.results))
+        self.assertEqual(list(csv_results.results), list(reloaded.results))
+        self.assertEqual(reloaded.get_status('454'), 1)
+        self.assertEqual(reloaded.get_status('659'), 0)
+        self.assertAlmostEqual(reloaded.get_features('351')['HNR'], 20.432)
+        self.assertEqual(['335','351','385'], reloaded.get_unpredicted())
+
+    # Managers opening a new database together seed it once, and the one that finds it seeded loads those results
+    def test_seed_csv(self):
+        first = ResultsManager(self.db_file)
+        second = ResultsManager(self.db_file)
+        count = first.seed_csv(self.results_file)
+        self.assertEqual(count, len(ResultsManager(self.results_file).results))
+        self.assertEqual(second.seed_csv(self.results_file), 0)
+        self.assertEqual(list(second.results), list(first.results))
+        self.assertEqual(first.seed_csv(self.results_file), 0)
+
+        reloaded = ResultsManager(self.db_file)
+        self.assertEqual(len(reloaded.results), count)
+        self.assertGreater(int(reloaded.add_results({})), max(int(uid) for uid in first.results))
+        for results_manager in (first, second, reloaded):
+            results_manager.storage.close()
+
+    # Mutations are only persisted once saved
+    def test_mutations(self):
+        results_manager = ResultsManager(self.db_file)
+        results_manager.import_csv(self.results_file)
+        results_manager.save()
+
+        results_manager.set_status('335', 1)
+        results_manager.set_statuses(['351'], [0])
+        results_manager.remove_results('725')
+        uid = results_manager.add_results({'HNR': 19.5})
+        self.assertEqual(['385', uid], results_manager.get_unpredicted())
+
+        unsaved = ResultsManager(self.db_file)
+        self.assertEqual(['335','351','385'], unsaved.get_unpredicted())
+        unsaved.storage.close()
+
+        results_manager.save()
+        reloaded = ResultsManager(self.db_file)
+        self.assertEqual(reloaded.get_status('335'), 1)
+        self.assertEqual(reloaded.get_status('351'), 0)
+        self.assertFalse('725' in reloaded.results)
+        self.assertEqual(reloaded.get_features(uid)['HNR'], 19.5)
+        self.assertEqual(['385', uid], reloaded.get_unpredicted())
+
+    # Results committed by another manager, e.g. a batch import or another app process, are seen by the next read
+    def test_other_connection(self):
+        app = ResultsManager(self.db_file)
+        app.import_csv(self.results_file)
+        app.save()
+        batch = ResultsManager(self.db_file)
+        uid = batch.add_results({name: 1.0 for name in ResultsManager.feature_names})
+        batch.save()
+
+        self.assertEqual(app.get_status(uid), -1)
+        self.assertEqual(app.get_features(uid)['HNR'], 1.0)
+        features, skipped = app.get_unpredicted_features(return_skipped=True)
+        self.assertEqual(list(features.index), ['335', '351', '385', uid])
+        self.assertEqual(skipped, [])
+        self.assertIn(uid, app.to_dataframe().index)
+        for results_manager in (app, batch):
+            results_manager.storage.close()
+
+    # Sessions sharing one manager never get the same UID, and a collision would fail rather than replace a row
+    def test_threads(self):
+        results_manager = ResultsManager(self.db_file)
+        uids = []
+        def add():
+            for _ in range(200):
+                uids.append(results_manager.add_results({'HNR': 1.0}))
+        threads = [threading.Thread(target=add) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        results_manager.save()
+        self.assertEqual(len(set(uids)), 800)
+        self.assertEqual(len(results_manager.storage.load()), 800)
+
+        with self.assertRaises(sqlite3.IntegrityError):
+            results_manager.storage.add(uids[0], {'HNR': 2.0})
+        results_manager.storage.close()
+
+    # A row the storage rejects is not added to the table in memory either
+    def test_add_fails(self):
+        results_manager = ResultsManager(self.db_file)
+        results_manager.storage.connection.execute("INSERT INTO results (uid) VALUES ('1000')")
+        with self.assertRaises(sqlite3.IntegrityError):
+            results_manager.add_results({'HNR': 1.0})
+        self.assertNotIn('1000', results_manager.results)
+        results_manager.storage.close()
+
+    def test_export_csv(self):
+        results_manager = ResultsManager(self.db_file)
+        results_manager.import_csv(self.results_file)
+        output = os.path.join(self.directory, 'export.csv')
+        results_manager.export_csv(output)
+        exported = ResultsManager(output)
+        self.assertEqual(sorted(exported.results), sorted(results_manager.results))
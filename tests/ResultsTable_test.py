@@ -0,0 +1,93 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.ResultsTable import ResultsTable
+
+class TestResultsTable(unittest.TestCase):
+    col_names = ['a', 'b', 'status']
+
+    def make_table(self, n):
+        frame = pd.DataFrame({'a': np.arange(n, dtype=float), 'b': np.arange(n, dtype=float) * 2},
+            index=[str(i) for i in range(n)])
+        return ResultsTable(self.col_names, frame)
+
+    def test_init(self):
+        table = self.make_table(3)
+        self.assertEqual(len(table), 3)
+        self.assertEqual(list(table), ['0', '1', '2'])
+        self.assertEqual(table['1']['b'], 2)
+        self.assertTrue(np.isnan(table['1']['status']))
+        self.assertEqual(ResultsTable(self.col_names), {})
+
+    # Rows should keep their values when the arrays grow past their capacity
+    def test_add(self):
+        table = self.make_table(ResultsTable.initial_capacity)
+        table.add('new', {'a': 5.0, 'status': None})
+        self.assertEqual(table.capacity, 2 * ResultsTable.initial_capacity)
+        self.assertEqual(table.get_value('new', 'a'), 5.0)
+        self.assertEqual(table.get_value('10', 'b'), 20.0)
+        self.assertIsNone(table.get_value('missing', 'a'))
+
+        table.add('new', {'a': 6.0})
+        self.assertEqual(len(table), ResultsTable.initial_capacity + 1)
+        self.assertEqual(table.get_value('new', 'a'), 6.0)
+
+    def test_set_values(self):
+        table = self.make_table(5)
+        table.set_value('0', 'status', 1)
+        table.set_values(['1', '3', 'missing'], 'status', [0, 1, 1])
+        self.assertEqual(table.get_unpredicted(), ['2', '4'])
+        self.assertEqual(table.get_value('3', 'status'), 1)
+
+    # Deleted rows are tombstoned until compaction, and re-added UIDs appear only once
+    def test_remove(self):
+        table = self.make_table(5)
+        table.remove('1')
+        self.assertFalse('1' in table)
+        self.assertEqual(table.deleted, 1)
+        self.assertEqual(table.get_unpredicted(), ['0', '2', '3', '4'])
+
+        table.add('1', {'a': 10.0})
+        self.assertEqual(list(table), ['0', '2', '3', '4', '1'])
+
+        df = table.to_dataframe()
+        self.assertEqual(table.deleted, 0)
+        self.assertEqual(list(df.index), ['0', '2', '3', '4', '1'])
+        self.assertEqual(df.loc['1', 'a'], 10.0)
+        self.assertEqual(table.get_value('4', 'b'), 8.0)
+
+    def test_compaction(self):
+        n = 4 * ResultsTable.compact_min_deleted
+        table = self.make_table(n)
+        for i in range(ResultsTable.compact_min_deleted):
+            table.remove(str(i))
+        self.assertEqual(table.deleted, 0)
+        self.assertEqual(len(table), n - ResultsTable.compact_min_deleted)
+        self.assertEqual(table.get_value(str(n - 1), 'a'), n - 1)
+
+    # The DataFrame should be built from views of the column arrays
+    def test_to_dataframe(self):
+        table = self.make_table(5)
+        df = table.to_dataframe()
+        self.assertEqual(list(df.columns), self.col_names)
+        self.assertTrue(np.shares_memory(df['a'].values, table.columns['a']))
+
+    # Statuses are shown as nullable integers rather than floats
+    def test_to_dataframe_status(self):
+        table = self.make_table(3)
+        table.set_values(['0', '2'], 'status', [1, 0])
+        df = table.to_dataframe()
+        self.assertEqual(df['status'].dtype, 'Int64')
+        self.assertEqual(df['status'].tolist(), [1, pd.NA, 0])
+        self.assertTrue(np.isnan(table.get_value('1', 'status')))
+
+        # A value read back from the status column, <NA> when there is no prediction, can be added again
+        table.add('3', {'status': df['status']['1']})
+        self.assertTrue(np.isnan(table.get_value('3', 'status')))
+
+    def test_to_matrix(self):
+        table = self.make_table(5)
+        matrix = table.to_matrix(['4', '2'], ['b', 'a'])
+        self.assertTrue((matrix == [[8, 4], [4, 2]]).all())
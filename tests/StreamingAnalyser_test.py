@@ -0,0 +1,66 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from src.FeatureExtractor import FeatureExtractor
+from src.StreamingAnalyser import StreamingAnalyser
+from src.VoiceActivityDetector import VoiceActivityDetector
+
+class TestStreamingAnalyser(unittest.TestCase):
+    sound_file = 'tests/test.wav'
+
+    # Chunks of 0.1 s, shaped (channels, samples) as Recorder.stream yields them
+    def chunks(self, samples):
+        for start in range(0, len(samples), 4410):
+            yield samples[np.newaxis, start:start + 4410]
+
+    def setUp(self):
+        self.samples = FeatureExtractor(self.sound_file, lazy=True).get_samples()
+
+    # A steady vowel should settle before the end of the 5 s recording, with estimates close to the whole recording's
+    def test_run(self):
+        analyser = StreamingAnalyser()
+        features = analyser.run(self.chunks(self.samples), ['MDVP:Fo(Hz)', 'HNR'])
+        self.assertTrue(analyser.is_converged())
+        self.assertGreaterEqual(analyser.audio_buffer.duration(), analyser.min_seconds)
+        self.assertLess(analyser.audio_buffer.duration(), 5)
+        self.assertEqual(sorted(features), ['HNR', 'MDVP:Fo(Hz)'])
+
+        reference = FeatureExtractor(self.sound_file, lazy=True).get_dataset_features(StreamingAnalyser.tracked_labels)
+        for label, estimate in analyser.get_estimates().items():
+            self.assertAlmostEqual(estimate, reference[label], delta=0.1 * reference[label])
+
+    # Silence is never analysed as voiced, so it cannot converge
+    def test_silence(self):
+        analyser = StreamingAnalyser(max_seconds=3)
+        analyser.run(self.chunks(np.zeros(5 * 44100)))
+        self.assertFalse(analyser.is_converged())
+        self.assertTrue(analyser.is_done())
+        self.assertEqual(analyser.audio_buffer.duration(), 3)
+        self.assertEqual(analyser.get_estimates()['HNR'], None)
+
+        # Voice after the silence is picked up once it starts
+        analyser = StreamingAnalyser()
+        analyser.run(self.chunks(np.concatenate([np.zeros(44100), self.samples])))
+        self.assertTrue(analyser.is_converged())
+
+    # With voice activity detection, silent windows are skipped and only the voiced segment is analysed at the end
+    def test_voice_activity_detector(self):
+        detector = VoiceActivityDetector()
+        analyser = StreamingAnalyser(voice_activity_detector=detector)
+        recording = np.concatenate([np.zeros(2 * 44100), self.samples])
+        with mock.patch('src.StreamingAnalyser.FeatureExtractor', wraps=FeatureExtractor) as feature_extractor:
+            analyser.run(self.chunks(recording))
+        self.assertTrue(analyser.is_converged())
+
+        # The three windows within the first 2 s are silent
+        windows = (analyser.window_end - analyser.window) // analyser.hop
+        self.assertEqual(len(analyser.history), windows - 3)
+        # One extractor per analysed window, then one for the segment starting after the silence
+        self.assertEqual(feature_extractor.call_count, windows - 3 + 1)
+        segment = feature_extractor.call_args[0][0]
+        self.assertLess(len(segment), len(analyser.audio_buffer) - 2 * 44100)
+
+if __name__ == '__main__':
+    unittest.main()
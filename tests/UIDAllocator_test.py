@@ -0,0 +1,103 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import unittest
+from multiprocessing import Pool, Process
+
+from src.ResultsManager import ResultsManager
+from src.UIDAllocator import FIRST_UID, FileUIDAllocator, SQLiteUIDAllocator
+
+def allocate_from_file(path):
+    allocator = FileUIDAllocator(path)
+    return [allocator.allocate() for _ in range(50)]
+
+# Takes the counter's lock and dies while holding it
+def die_holding_lock(path):
+    FileUIDAllocator(path)._lock().__enter__()
+    os._exit(1)
+
+def allocate_from_sqlite(path):
+    connection = sqlite3.connect(path, timeout=30)
+    allocator = SQLiteUIDAllocator(connection)
+    uids = []
+    for _ in range(50):
+        uids.append(allocator.allocate())
+        connection.commit()
+    return uids
+
+class TestUIDAllocator(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    # The counter should start above the legacy 1-999 range, or above any larger existing UID
+    def test_allocate(self):
+        allocator = FileUIDAllocator(os.path.join(self.directory, 'results.csv.uid'))
+        self.assertEqual(allocator.allocate(['454', '659']), str(FIRST_UID))
+        self.assertEqual(allocator.allocate(['5000']), str(FIRST_UID + 1))
+
+        allocator = SQLiteUIDAllocator(sqlite3.connect(os.path.join(self.directory, 'results.db')))
+        self.assertEqual(allocator.allocate(['454', '5000', 'abc']), '5001')
+        self.assertEqual(allocator.allocate(), '5002')
+
+    def test_reserve(self):
+        allocator = FileUIDAllocator(os.path.join(self.directory, 'results.csv.uid'))
+        allocator.reserve(['2000'])
+        self.assertEqual(allocator.allocate(), '2001')
+        allocator.reserve(['15'])
+        self.assertEqual(allocator.allocate(), '2002')
+
+        allocator = SQLiteUIDAllocator(sqlite3.connect(os.path.join(self.directory, 'results.db')))
+        allocator.reserve(['3000'])
+        self.assertEqual(allocator.allocate(), '3001')
+
+    # Opening a .csv table creates no counter file until a UID is handed out
+    def test_lazy_counter(self):
+        results_file = os.path.join(self.directory, 'results.csv')
+        shutil.copy('tests/test_results.csv', results_file)
+        results_manager = ResultsManager(results_file)
+        results_manager.get_unpredicted()
+        self.assertEqual(os.listdir(self.directory), ['results.csv'])
+        results_manager.add_results({})
+        self.assertEqual(sorted(os.listdir(self.directory)), ['results.csv', 'results.csv.uid', 'results.csv.uid.lock'])
+
+    # A lock held by a live process is waited for, never broken, while one left by a process that died is released
+    # by the OS straight away
+    def test_lock(self):
+        path = os.path.join(self.directory, 'results.csv.uid')
+        allocator = FileUIDAllocator(path)
+        allocator.lock_timeout = 0.1
+        with allocator._lock():
+            with self.assertRaises(TimeoutError):
+                allocator.allocate()
+
+        process = Process(target=die_holding_lock, args=(path,))
+        process.start()
+        process.join()
+        self.assertEqual(process.exitcode, 1)
+        start = time.monotonic()
+        self.assertEqual(allocator.allocate(), str(FIRST_UID))
+        self.assertLess(time.monotonic() - start, allocator.lock_timeout)
+
+    # Processes sharing a counter should never receive the same UID
+    def test_concurrent(self):
+        for worker, name in [(allocate_from_file, 'results.csv.uid'), (allocate_from_sqlite, 'results.db')]:
+            path = os.path.join(self.directory, name)
+            with Pool(4) as pool:
+                uids = [uid for uids in pool.map(worker, [path] * 4) for uid in uids]
+            self.assertEqual(len(set(uids)), 200)
+
+    # More than 999 patients should be supported, without reusing UIDs of removed results
+    def test_results_manager(self):
+        results_manager = ResultsManager(os.path.join(self.directory, 'results.db'))
+        results_manager.import_csv('tests/test_results.csv')
+        uids = [results_manager.add_results({'HNR': 20.0}) for _ in range(1500)]
+        self.assertEqual(len(set(uids)), 1500)
+        self.assertEqual(uids[0], str(FIRST_UID))
+
+        results_manager.remove_results(uids[-1])
+        self.assertEqual(results_manager.add_results({}), str(FIRST_UID + 1500))
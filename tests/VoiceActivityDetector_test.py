@@ -0,0 +1,51 @@
+import unittest
+
+import numpy as np
+
+from src.FeatureExtractor import FeatureExtractor
+from src.VoiceActivityDetector import VoiceActivityDetector, runs
+
+class TestVoiceActivityDetector(unittest.TestCase):
+    sound_file = 'tests/test.wav'
+
+    def setUp(self):
+        self.samples = FeatureExtractor(self.sound_file, lazy=True).get_samples()
+        rng = np.random.default_rng(0)
+        # Quiet room noise, a breath, the vowel, then quiet again
+        self.leading = np.concatenate([rng.normal(0, 0.001, 44100), rng.normal(0, 0.05, 13230)])
+        self.recording = np.concatenate([self.leading, self.samples, rng.normal(0, 0.001, 22050)])
+
+    def test_runs(self):
+        starts, ends = runs(np.array([True, True, False, True, False, False, True]))
+        np.testing.assert_array_equal(starts, [0, 3, 6])
+        np.testing.assert_array_equal(ends, [2, 4, 7])
+
+    # The segment should start just inside the vowel, past the silence and the breath, and end before the trailing silence
+    def test_find_segment(self):
+        detector = VoiceActivityDetector()
+        start, end = detector.find_segment(self.recording, 44100)
+        onset = len(self.leading)
+        self.assertGreaterEqual(start, onset)
+        self.assertLess(start, onset + 0.5 * 44100)
+        self.assertLessEqual(end, onset + len(self.samples))
+        self.assertGreater(end, onset + len(self.samples) - 0.5 * 44100)
+
+        # int16 samples give the same segment
+        int16 = np.round(self.recording * 32767).astype(np.int16)
+        self.assertEqual(detector.find_segment(int16, 44100), (start, end))
+
+        segment = detector.select(self.recording, 44100)
+        self.assertTrue(np.shares_memory(segment, self.recording))
+        self.assertEqual(len(segment), end - start)
+
+    # Without a long enough voiced segment, nothing is selected
+    def test_no_segment(self):
+        detector = VoiceActivityDetector()
+        silence = np.zeros(44100 * 2)
+        self.assertIsNone(detector.find_segment(silence, 44100))
+        self.assertFalse(detector.voiced_frames(silence, 44100).any())
+        self.assertIs(detector.select(silence, 44100), silence)
+        self.assertIsNone(detector.find_segment(self.samples[:44100], 44100))
+
+if __name__ == '__main__':
+    unittest.main()